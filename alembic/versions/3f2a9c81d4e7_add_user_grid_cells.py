@@ -0,0 +1,40 @@
+"""Add user grid cells
+
+Revision ID: 3f2a9c81d4e7
+Revises: b39cb5c128d1
+Create Date: 2026-10-18 10:02:11.204519
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f2a9c81d4e7"
+down_revision: Union[str, None] = "b39cb5c128d1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match src.geo.GRID_CELL_DEGREES at the time of the migration.
+GRID_CELL_DEGREES = 0.1
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("grid_lat", sa.Integer(), nullable=True))
+    op.add_column("users", sa.Column("grid_lon", sa.Integer(), nullable=True))
+    op.execute(
+        f"UPDATE users SET grid_lat = floor(latitude / {GRID_CELL_DEGREES}), "
+        f"grid_lon = floor(longitude / {GRID_CELL_DEGREES})"
+    )
+    op.create_index(
+        "ix_users_grid_cell", "users", ["grid_lat", "grid_lon"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_grid_cell", table_name="users")
+    op.drop_column("users", "grid_lon")
+    op.drop_column("users", "grid_lat")
@@ -0,0 +1,51 @@
+"""Shard order counts
+
+Revision ID: 4b7e1d9c3a58
+Revises: a9e4c2f7d153
+Create Date: 2026-10-18 23:41:27.318204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4b7e1d9c3a58"
+down_revision: Union[str, None] = "a9e4c2f7d153"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing counts stay in shard 0; readers add up the shards.
+    op.add_column(
+        "order_counts",
+        sa.Column("shard", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.alter_column("order_counts", "shard", server_default=None)
+    op.drop_constraint("order_counts_pkey", "order_counts", type_="primary")
+    op.create_primary_key(
+        "order_counts_pkey",
+        "order_counts",
+        ["scope", "owner_id", "status", "category", "shard"],
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "INSERT INTO order_counts (scope, owner_id, status, category, shard, count) "
+        "SELECT scope, owner_id, status, category, 0, sum(count) "
+        "FROM order_counts WHERE shard <> 0 "
+        "GROUP BY scope, owner_id, status, category "
+        "ON CONFLICT (scope, owner_id, status, category, shard) "
+        "DO UPDATE SET count = order_counts.count + excluded.count"
+    )
+    op.execute("DELETE FROM order_counts WHERE shard <> 0")
+    op.drop_constraint("order_counts_pkey", "order_counts", type_="primary")
+    op.create_primary_key(
+        "order_counts_pkey", "order_counts", ["scope", "owner_id", "status", "category"]
+    )
+    op.drop_column("order_counts", "shard")
@@ -0,0 +1,38 @@
+"""Add user unit vectors
+
+Revision ID: 5a7c2e9d1f46
+Revises: e1b8d4a6f073
+Create Date: 2026-10-18 10:41:37.518204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5a7c2e9d1f46"
+down_revision: Union[str, None] = "e1b8d4a6f073"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("unit_x", sa.Float(), nullable=True))
+    op.add_column("users", sa.Column("unit_y", sa.Float(), nullable=True))
+    op.add_column("users", sa.Column("unit_z", sa.Float(), nullable=True))
+    op.execute(
+        "UPDATE users SET "
+        "unit_x = cos(radians(latitude)) * cos(radians(longitude)), "
+        "unit_y = cos(radians(latitude)) * sin(radians(longitude)), "
+        "unit_z = sin(radians(latitude)) "
+        "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "unit_z")
+    op.drop_column("users", "unit_y")
+    op.drop_column("users", "unit_x")
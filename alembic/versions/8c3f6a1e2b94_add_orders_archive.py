@@ -0,0 +1,76 @@
+"""Add orders archive
+
+Revision ID: 8c3f6a1e2b94
+Revises: 5a7c2e9d1f46
+Create Date: 2026-10-18 14:12:05.402761
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c3f6a1e2b94"
+down_revision: Union[str, None] = "5a7c2e9d1f46"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "orders_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column(
+            "category",
+            postgresql.ENUM(
+                "GROCERIES",
+                "PET_WALKING",
+                "CONVERSATION",
+                "OTHER",
+                name="ordercategory",
+                create_type=False,
+            ),
+            nullable=False,
+        ),
+        sa.Column("description", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(), nullable=True),
+        sa.Column("valid_since", sa.TIMESTAMP(), nullable=True),
+        sa.Column("valid_until", sa.TIMESTAMP(), nullable=True),
+        sa.Column(
+            "status",
+            postgresql.ENUM(
+                "PENDING",
+                "ACCEPTED",
+                "COMPLETED",
+                "CANCELLED",
+                name="orderstatus",
+                create_type=False,
+            ),
+            nullable=False,
+        ),
+        sa.Column("senior_id", sa.Integer(), nullable=False),
+        sa.Column("volunteer_id", sa.Integer(), nullable=True),
+        sa.Column("archived_at", sa.TIMESTAMP(), nullable=False),
+        sa.ForeignKeyConstraint(["senior_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["volunteer_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_orders_archive_senior_id", "orders_archive", ["senior_id"], unique=False
+    )
+    op.create_index(
+        "ix_orders_archive_volunteer_id",
+        "orders_archive",
+        ["volunteer_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_orders_archive_volunteer_id", table_name="orders_archive")
+    op.drop_index("ix_orders_archive_senior_id", table_name="orders_archive")
+    op.drop_table("orders_archive")
@@ -0,0 +1,61 @@
+"""Add expired order status
+
+Revision ID: a9e4c2f7d153
+Revises: f3c8a5d2b716
+Create Date: 2026-10-18 21:12:09.554871
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a9e4c2f7d153"
+down_revision: Union[str, None] = "f3c8a5d2b716"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ADD VALUE can't run inside a transaction block before Postgres 12.
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE orderstatus ADD VALUE IF NOT EXISTS 'EXPIRED'")
+    op.create_index(
+        "ix_orders_open_valid_until",
+        "orders",
+        ["status", "valid_until"],
+        unique=False,
+        postgresql_where=sa.text("status IN ('PENDING', 'ACCEPTED')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_orders_open_valid_until", table_name="orders")
+    # Enum values can't be dropped; expired orders become cancelled and the
+    # type is rebuilt without EXPIRED.
+    op.execute("UPDATE orders SET status = 'CANCELLED' WHERE status = 'EXPIRED'")
+    op.execute(
+        "UPDATE orders_archive SET status = 'CANCELLED' WHERE status = 'EXPIRED'"
+    )
+    op.execute(
+        "INSERT INTO order_counts (scope, owner_id, status, category, count) "
+        "SELECT scope, owner_id, 'CANCELLED', category, count FROM order_counts "
+        "WHERE status = 'EXPIRED' "
+        "ON CONFLICT (scope, owner_id, status, category) "
+        "DO UPDATE SET count = order_counts.count + excluded.count"
+    )
+    op.execute("DELETE FROM order_counts WHERE status = 'EXPIRED'")
+    op.execute("ALTER TYPE orderstatus RENAME TO orderstatus_old")
+    op.execute(
+        "CREATE TYPE orderstatus AS ENUM "
+        "('PENDING', 'ACCEPTED', 'COMPLETED', 'CANCELLED')"
+    )
+    for table in ("orders", "orders_archive", "order_counts"):
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN status TYPE orderstatus "
+            "USING status::text::orderstatus"
+        )
+    op.execute("DROP TYPE orderstatus_old")
@@ -0,0 +1,73 @@
+"""Search order items
+
+Revision ID: b6d2e8f4a317
+Revises: 8c3f6a1e2b94
+Create Date: 2026-10-18 15:03:48.271904
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b6d2e8f4a317"
+down_revision: Union[str, None] = "8c3f6a1e2b94"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = {
+    "orders": "ix_orders_items_text",
+    "orders_archive": "ix_orders_archive_items_text",
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION order_items_text(description jsonb) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT coalesce(string_agg(item ->> 'text', ' '), '')
+            FROM jsonb_array_elements(
+                CASE jsonb_typeof(description -> 'data')
+                    WHEN 'array' THEN description -> 'data'
+                    ELSE '[]'
+                END
+            ) AS item
+        $$
+        """
+    )
+    for table, index in TABLES.items():
+        op.alter_column(
+            table,
+            "description",
+            existing_type=sa.JSON(),
+            type_=postgresql.JSONB(),
+            existing_nullable=False,
+            postgresql_using="description::jsonb",
+        )
+        op.create_index(
+            index,
+            table,
+            [sa.text("lower(order_items_text(description)) gin_trgm_ops")],
+            unique=False,
+            postgresql_using="gin",
+        )
+
+
+def downgrade() -> None:
+    for table, index in TABLES.items():
+        op.drop_index(index, table_name=table)
+        op.alter_column(
+            table,
+            "description",
+            existing_type=postgresql.JSONB(),
+            type_=sa.JSON(),
+            existing_nullable=False,
+            postgresql_using="description::json",
+        )
+    op.execute("DROP FUNCTION order_items_text(jsonb)")
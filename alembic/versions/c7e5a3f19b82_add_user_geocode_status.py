@@ -0,0 +1,40 @@
+"""Add user geocode status
+
+Revision ID: c7e5a3f19b82
+Revises: 9d41b7e2c5a0
+Create Date: 2026-10-18 11:20:04.551902
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ENUM
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c7e5a3f19b82"
+down_revision: Union[str, None] = "9d41b7e2c5a0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+geocodestatus_enum = ENUM(
+    "PENDING",
+    "DONE",
+    "FAILED",
+    name="geocodestatus",
+    create_type=False,
+)
+
+
+def upgrade() -> None:
+    geocodestatus_enum.create(op.get_bind(), checkfirst=True)
+    op.add_column(
+        "users", sa.Column("geocode_status", geocodestatus_enum, nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "geocode_status")
+    geocodestatus_enum.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,70 @@
+"""Add order counts
+
+Revision ID: d41a7c9e6b25
+Revises: b6d2e8f4a317
+Create Date: 2026-10-18 16:22:10.836512
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d41a7c9e6b25"
+down_revision: Union[str, None] = "b6d2e8f4a317"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_counts",
+        sa.Column("scope", sa.String(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM(
+                "PENDING",
+                "ACCEPTED",
+                "COMPLETED",
+                "CANCELLED",
+                name="orderstatus",
+                create_type=False,
+            ),
+            nullable=False,
+        ),
+        sa.Column(
+            "category",
+            postgresql.ENUM(
+                "GROCERIES",
+                "PET_WALKING",
+                "CONVERSATION",
+                "OTHER",
+                name="ordercategory",
+                create_type=False,
+            ),
+            nullable=False,
+        ),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("scope", "owner_id", "status", "category"),
+    )
+    op.execute(
+        "INSERT INTO order_counts (scope, owner_id, status, category, count) "
+        "SELECT 'all', 0, status, category, count(*) FROM orders "
+        "GROUP BY status, category "
+        "UNION ALL "
+        "SELECT 'senior', senior_id, status, category, count(*) FROM orders "
+        "GROUP BY senior_id, status, category "
+        "UNION ALL "
+        "SELECT 'volunteer', volunteer_id, status, category, count(*) FROM orders "
+        "WHERE volunteer_id IS NOT NULL "
+        "GROUP BY volunteer_id, status, category"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("order_counts")
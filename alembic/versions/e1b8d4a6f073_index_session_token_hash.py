@@ -0,0 +1,43 @@
+"""Index session token hash
+
+Revision ID: e1b8d4a6f073
+Revises: c7e5a3f19b82
+Create Date: 2026-10-18 11:58:42.930117
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e1b8d4a6f073"
+down_revision: Union[str, None] = "c7e5a3f19b82"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("user_sessions", sa.Column("token_hash", sa.String(), nullable=True))
+    # The same digest as auth.hash_token: SHA-256 of the token's UTF-8 bytes.
+    # (A ::bytea cast would parse backslashes in the token as escapes.)
+    op.execute(
+        "UPDATE user_sessions "
+        "SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex')"
+    )
+    # Duplicate tokens were ambiguous before; keep the newest session for each.
+    op.execute(
+        "DELETE FROM user_sessions a USING user_sessions b "
+        "WHERE a.token_hash = b.token_hash AND a.id < b.id"
+    )
+    op.alter_column("user_sessions", "token_hash", nullable=False)
+    op.create_index(
+        "ix_user_sessions_token_hash", "user_sessions", ["token_hash"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_sessions_token_hash", table_name="user_sessions")
+    op.drop_column("user_sessions", "token_hash")
@@ -0,0 +1,41 @@
+"""Count archived orders
+
+Revision ID: f3c8a5d2b716
+Revises: d41a7c9e6b25
+Create Date: 2026-10-18 19:05:41.207318
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c8a5d2b716"
+down_revision: Union[str, None] = "d41a7c9e6b25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "INSERT INTO order_counts (scope, owner_id, status, category, count) "
+        "SELECT 'archived_all', 0, status, category, count(*) FROM orders_archive "
+        "GROUP BY status, category "
+        "UNION ALL "
+        "SELECT 'archived_senior', senior_id, status, category, count(*) "
+        "FROM orders_archive "
+        "GROUP BY senior_id, status, category "
+        "UNION ALL "
+        "SELECT 'archived_volunteer', volunteer_id, status, category, count(*) "
+        "FROM orders_archive "
+        "WHERE volunteer_id IS NOT NULL "
+        "GROUP BY volunteer_id, status, category"
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "DELETE FROM order_counts "
+        "WHERE scope IN ('archived_all', 'archived_senior', 'archived_volunteer')"
+    )
@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Seed a database with synthetic data and benchmark every "
+        "endpoint in-process.",
+    )
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument(
+        "--async", dest="async_db", action="store_true", help="use DATABASE_ASYNC"
+    )
+    parser.add_argument("--seniors", type=int, default=1000)
+    parser.add_argument("--volunteers", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument(
+        "--sessions", type=int, default=10000, help="stored sessions to log in to"
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--scenario", action="append", help="only run these scenarios (repeatable)"
+    )
+    parser.add_argument(
+        "--reuse", action="store_true", help="keep existing data instead of reseeding"
+    )
+    parser.add_argument("--output", default="benchmark-results.json")
+    return parser.parse_args(argv)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: list[str]) -> None:
+    args = parse_args(argv)
+    # src.database reads its configuration at import time.
+    os.environ["DATABASE_URL"] = args.database_url
+    if args.async_db:
+        os.environ["DATABASE_ASYNC"] = "true"
+
+    from benchmarks import seed
+    from benchmarks.data import DataGenerator
+    from benchmarks.runner import SCENARIOS, Context, run_scenario
+    from src import database, metrics, query_cache
+    from src.main import app
+
+    seed.enable_sqlite_foreign_keys()
+    # Phone numbers must not collide with users created by earlier runs.
+    run_id = f"{int(time.time()) % 10**6:06d}" if args.reuse else ""
+    generator = DataGenerator(seed=args.seed, run_id=run_id)
+    start = time.perf_counter()
+    if args.reuse:
+        senior_ids, volunteer_ids, order_ids = seed.existing_ids()
+    else:
+        senior_ids, volunteer_ids, order_ids = seed.seed_database(
+            generator, args.seniors, args.volunteers, args.orders, args.sessions
+        )
+    seed_seconds = time.perf_counter() - start
+    ctx = Context(generator, senior_ids, volunteer_ids, order_ids)
+    ctx.sessions = seed.session_sample()
+    ctx.pending_order_ids = seed.pending_order_ids()
+    ctx.app = app
+    sessions = seed.session_count()
+
+    scenarios = [
+        scenario
+        for scenario in SCENARIOS
+        if not args.scenario or scenario.name in args.scenario
+    ]
+
+    async def run() -> dict:
+        import httpx
+
+        results = {}
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://benchmark", timeout=None
+            ) as client:
+                for scenario in scenarios:
+                    # ORDERS_QUERY_CACHE_TTL=0 keeps it off for every scenario.
+                    query_cache.orders_query_cache.enabled = (
+                        scenario.query_cache and query_cache.ORDERS_QUERY_CACHE_TTL > 0
+                    )
+                    query_cache.orders_query_cache.invalidate()
+                    result = await run_scenario(
+                        client,
+                        scenario,
+                        ctx,
+                        args.requests,
+                        concurrency=args.concurrency,
+                        warmup=args.warmup,
+                    )
+                    if result is not None:
+                        results[scenario.name] = result
+                        print(
+                            f"{scenario.name:<24} p50 {result['p50_ms']:8.2f} ms  "
+                            f"p99 {result['p99_ms']:8.2f} ms  "
+                            f"{result['throughput_rps']:8.1f} req/s  "
+                            f"{result['statements_per_request']:5.1f} sql/req"
+                            + (
+                                f"  {result['errors']} errors"
+                                if result["errors"]
+                                else ""
+                            )
+                        )
+        return results
+
+    results = asyncio.run(run())
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "dialect": database.engine.dialect.name,
+            "async": database.DATABASE_ASYNC,
+            "metrics": metrics.METRICS_ENABLED,
+            "orders_query_cache_ttl": query_cache.ORDERS_QUERY_CACHE_TTL,
+            "orders_query_cache_scenarios": [
+                scenario.name for scenario in scenarios if scenario.query_cache
+            ],
+            "seniors": len(senior_ids),
+            "volunteers": len(volunteer_ids),
+            "orders": len(order_ids),
+            "sessions": sessions,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed_seconds": seed_seconds,
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+
+async def race(client, strategy, order_ids: list[int], volunteer_ids: list[int]):
+    # Every volunteer keeps grabbing one of the first few orders still shown
+    # as open until none are left, like a list sorted by distance or age.
+    remaining = list(order_ids)
+    wins, requests = [], Counter()
+
+    async def volunteer(volunteer_id: int, rnd: random.Random) -> None:
+        while remaining:
+            order_id = rnd.choice(remaining[:20])
+            if await strategy(client, order_id, volunteer_id, requests):
+                wins.append((order_id, volunteer_id))
+            if order_id in remaining:
+                remaining.remove(order_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            volunteer(volunteer_id, random.Random(volunteer_id))
+            for volunteer_id in volunteer_ids
+        )
+    )
+    return wins, requests, time.perf_counter() - start
+
+
+async def read_then_put(client, order_id, volunteer_id, requests) -> bool:
+    # The old client flow: check the order, then overwrite it.
+    requests["GET"] += 1
+    order = (await client.get(f"/orders/{order_id}")).json()
+    if order["status"] != "pending" or order["volunteer_id"] is not None:
+        return False
+    requests["PUT"] += 1
+    response = await client.put(
+        f"/orders/{order_id}",
+        json={"status": "accepted", "volunteer_id": volunteer_id},
+    )
+    return response.status_code == 200
+
+
+async def accept(client, order_id, volunteer_id, requests) -> bool:
+    requests["POST"] += 1
+    response = await client.post(
+        f"/orders/{order_id}/accept", json={"volunteer_id": volunteer_id}
+    )
+    if response.status_code not in (200, 409):
+        raise RuntimeError(f"Unexpected {response.status_code}: {response.text}")
+    return response.status_code == 200
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.accept",
+        description="Race volunteers for the same orders, accepting through "
+        "GET + PUT and through POST /orders/{id}/accept, and check every order "
+        "went to exactly one volunteer.",
+    )
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument("--async", dest="async_db", action="store_true")
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--volunteers", type=int, default=200)
+    parser.add_argument("--seniors", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    os.environ["DATABASE_URL"] = args.database_url
+    if args.async_db:
+        os.environ["DATABASE_ASYNC"] = "true"
+    os.environ["ARCHIVE_INTERVAL"] = "0"
+    os.environ["EXPIRY_INTERVAL"] = "0"
+
+    import httpx
+    from sqlalchemy import select
+
+    from benchmarks import seed
+    from benchmarks.data import DataGenerator
+    from src import crud, database, order_counts, schemas
+    from src.main import app
+    from src.models import Order
+
+    generator = DataGenerator(seed=args.seed)
+    seed.enable_sqlite_foreign_keys()
+    print("seeding...", file=sys.stderr)
+    senior_ids, volunteer_ids, _ = seed.seed_database(
+        generator, args.seniors, args.volunteers, 0
+    )
+
+    def open_orders() -> list[int]:
+        rows = generator.orders(args.orders, senior_ids, volunteer_ids)
+        with database.SessionLocal() as db:
+            created, _ = crud.bulk_create_orders(
+                db,
+                [
+                    (
+                        index,
+                        schemas.OrderCreate.model_validate(
+                            {**row, "status": "pending", "volunteer_id": None}
+                        ),
+                    )
+                    for index, row in enumerate(rows)
+                ],
+            )
+        return [order_id for _, order_id in created]
+
+    async def run() -> None:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://benchmark", timeout=None
+            ) as client:
+                for name, strategy in (
+                    ("GET + PUT", read_then_put),
+                    ("POST accept", accept),
+                ):
+                    order_ids = open_orders()
+                    wins, requests, elapsed = await race(
+                        client, strategy, order_ids, volunteer_ids
+                    )
+                    with database.SessionLocal() as db:
+                        owners = dict(
+                            db.execute(
+                                select(Order.id, Order.volunteer_id).where(
+                                    Order.id.in_(order_ids)
+                                )
+                            ).all()
+                        )
+                        drift = sum(map(abs, order_counts.drift(db).values()))
+                        order_counts.recompute(db)
+                    won = Counter(order_id for order_id, _ in wins)
+                    doubled = sum(1 for count in won.values() if count > 1)
+                    overwritten = sum(
+                        1
+                        for order_id, volunteer_id in wins
+                        if owners[order_id] != volunteer_id
+                    )
+                    total = sum(requests.values())
+                    print(
+                        f"{name:<12} {len(won):5d}/{len(order_ids)} orders taken  "
+                        f"{len(wins) - len(won):4d} extra wins on {doubled} orders  "
+                        f"{overwritten:4d} winners overwritten  "
+                        f"{drift:4d} counter drift  "
+                        f"{total:6d} requests ({dict(requests)})  "
+                        f"{len(won) / elapsed:8.1f} orders/s  "
+                        f"{total / elapsed:8.1f} req/s"
+                    )
+                    if strategy is accept and (len(wins) != len(won) or drift):
+                        raise RuntimeError("An order was accepted more than once")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,112 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.archive",
+        description="Time pending-order queries against a table full of finished "
+        "orders, then again after moving those to orders_archive.",
+    )
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument("--historical", type=int, default=1000000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["ARCHIVE_INTERVAL"] = "0"
+
+    from sqlalchemy import insert
+
+    from benchmarks import seed
+    from benchmarks.data import DataGenerator
+    from src import archive, crud, database
+    from src.models import Order, OrderCategory, OrderStatus
+
+    generator = DataGenerator(seed=args.seed)
+    seed.enable_sqlite_foreign_keys()
+    print("seeding...", file=sys.stderr)
+    senior_ids, volunteer_ids, _ = seed.seed_database(
+        generator, args.users, args.users, args.orders
+    )
+
+    # History is written straight to the table; a year of finished orders.
+    start = datetime.now() - timedelta(days=30)
+    description = generator.description()
+    with database.SessionLocal() as db:
+        for offset in range(0, args.historical, seed.CHUNK_SIZE * 10):
+            count = min(seed.CHUNK_SIZE * 10, args.historical - offset)
+            rows = []
+            for index in range(offset, offset + count):
+                rows.append(
+                    {
+                        "category": OrderCategory.GROCERIES,
+                        "description": description,
+                        "created_at": start - timedelta(minutes=index % 525600),
+                        "status": (
+                            OrderStatus.CANCELLED
+                            if index % 3 == 0
+                            else OrderStatus.COMPLETED
+                        ),
+                        "senior_id": senior_ids[index % len(senior_ids)],
+                        "volunteer_id": volunteer_ids[index % len(volunteer_ids)],
+                    }
+                )
+            db.execute(insert(Order), rows)
+            db.commit()
+            print(f"  {offset + count} historical orders", file=sys.stderr)
+
+    latitude, longitude = generator.center
+    queries = [
+        (
+            "pending, newest first",
+            dict(status=OrderStatus.PENDING, sort_by="created_at", limit=100),
+        ),
+        (
+            "pending, nearest within 3 km",
+            dict(
+                status=OrderStatus.PENDING,
+                latitude=latitude,
+                longitude=longitude,
+                radius_km=3,
+                sort_by="distance",
+                limit=100,
+            ),
+        ),
+        ("pending, keyset page", dict(status=OrderStatus.PENDING, cursor="")),
+    ]
+
+    def run(label: str, **extra) -> None:
+        with database.SessionLocal() as db:
+            for name, filters in queries:
+                elapsed = best_of(
+                    lambda: crud.get_orders_page(db, **filters, **extra), args.repeat
+                )
+                print(f"{label:<18} {name:<30} {elapsed * 1000:10.2f} ms")
+
+    run("before archiving")
+    began = time.perf_counter()
+    moved = archive.archive_orders(after_hours=24)
+    elapsed = time.perf_counter() - began
+    print(f"archived {moved} orders in {elapsed:.1f} s ({moved / elapsed:.0f}/s)")
+    run("after archiving")
+    run("include_archived", include_archived=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+
+async def one_by_one(client, path: str, rows: list[dict], concurrency: int) -> int:
+    # Every row in its own request, the way clients loaded data before the
+    # bulk endpoints.
+    remaining = iter(rows)
+    failed = 0
+
+    async def worker() -> None:
+        nonlocal failed
+        for row in remaining:
+            response = await client.post(path, json=row)
+            failed += response.status_code != 200
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return failed
+
+
+async def in_bulk(client, path: str, rows: list[dict], batch_size: int) -> int:
+    failed = 0
+    for start in range(0, len(rows), batch_size):
+        response = await client.post(
+            f"{path}/bulk", json=rows[start : start + batch_size]
+        )
+        response.raise_for_status()
+        failed += len(response.json()["errors"])
+    return failed
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bulk_load",
+        description="Load the same users and orders through POST /users and "
+        "POST /orders one row at a time, then through the bulk endpoints, and "
+        "compare the time each takes.",
+    )
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument("--async", dest="async_db", action="store_true")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="for the one-by-one load"
+    )
+    parser.add_argument("--seniors", type=int, default=1000)
+    parser.add_argument("--volunteers", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    os.environ["DATABASE_URL"] = args.database_url
+    if args.async_db:
+        os.environ["DATABASE_ASYNC"] = "true"
+    os.environ["ARCHIVE_INTERVAL"] = "0"
+    os.environ["EXPIRY_INTERVAL"] = "0"
+
+    import httpx
+
+    from benchmarks import seed
+    from benchmarks.data import DataGenerator
+    from src.main import app
+
+    seed.enable_sqlite_foreign_keys()
+
+    def fresh_database() -> tuple[list[int], list[int]]:
+        # Reseeded the same way before each load, so both get the same ids.
+        senior_ids, volunteer_ids, _ = seed.seed_database(
+            DataGenerator(seed=args.seed), args.seniors, args.volunteers, 0
+        )
+        return senior_ids, volunteer_ids
+
+    senior_ids, volunteer_ids = fresh_database()
+    # A different run_id keeps the loaded phone numbers clear of the seeded
+    # ones.
+    generator = DataGenerator(seed=args.seed, run_id="9")
+    users = generator.users(args.rows, "senior")
+    orders = generator.orders(args.rows, senior_ids, volunteer_ids)
+
+    async def run() -> None:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://benchmark", timeout=None
+            ) as client:
+                results = {}
+                for way, load, option in (
+                    ("one by one", one_by_one, args.concurrency),
+                    ("bulk", in_bulk, args.batch_size),
+                ):
+                    fresh_database()
+                    for path, rows in (("/users", users), ("/orders", orders)):
+                        start = time.perf_counter()
+                        failed = await load(client, path, rows, option)
+                        elapsed = time.perf_counter() - start
+                        results[way, path] = elapsed
+                        print(
+                            f"{path:<8} {way:<10} {len(rows):8d} rows  "
+                            f"{elapsed:8.2f} s  {len(rows) / elapsed:9.1f} rows/s"
+                            + (f"  {failed} failed" if failed else "")
+                        )
+                for path in ("/users", "/orders"):
+                    speedup = results["one by one", path] / results["bulk", path]
+                    print(f"{path:<8} bulk is {speedup:.1f}x faster")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,57 @@
+import argparse
+import json
+import sys
+
+# Per-request statement counts are deterministic, so any increase counts.
+STATEMENT_TOLERANCE = 0.01
+
+
+def compare(base: dict, new: dict, metric: str, threshold: float) -> list[dict]:
+    rows = []
+    for name, result in new["results"].items():
+        previous = base["results"].get(name)
+        if previous is None:
+            continue
+        change = (result[metric] - previous[metric]) / previous[metric]
+        statements = (
+            result["statements_per_request"] - previous["statements_per_request"]
+        )
+        rows.append(
+            {
+                "scenario": name,
+                "base": previous[metric],
+                "new": result[metric],
+                "change": change,
+                "statements": statements,
+                "regression": change > threshold or statements > STATEMENT_TOLERANCE,
+            }
+        )
+    return rows
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.compare",
+        description="Compare two benchmark result files and fail on regressions.",
+    )
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--metric", default="p95_ms")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="allowed relative slowdown"
+    )
+    args = parser.parse_args(argv)
+    with open(args.base) as base, open(args.new) as new:
+        rows = compare(json.load(base), json.load(new), args.metric, args.threshold)
+
+    for row in rows:
+        print(
+            f"{row['scenario']:<24} {row['base']:10.2f} -> {row['new']:10.2f} "
+            f"({row['change']:+7.1%}, {row['statements']:+.1f} sql/req)"
+            + ("  REGRESSION" if row["regression"] else "")
+        )
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,116 @@
+import json
+import math
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.geo import KM_PER_DEGREE
+
+TEMPLATES = Path(__file__).resolve().parent.parent / "requests_templates"
+
+STATUS_WEIGHTS = {
+    "pending": 0.5,
+    "accepted": 0.2,
+    "completed": 0.2,
+    "cancelled": 0.1,
+}
+
+
+def load_templates(kind: str) -> list[dict]:
+    return [
+        json.loads(path.read_text(encoding="utf-8"))
+        for path in sorted((TEMPLATES / kind).glob("*.json"))
+    ]
+
+
+class DataGenerator:
+    # Builds users and orders from requests_templates/, scattered around the
+    # seniors in the templates (Kraków) within radius_km.
+    def __init__(self, seed: int = 0, radius_km: float = 15, run_id: str = ""):
+        self.random = random.Random(seed)
+        self.run_id = run_id
+        self.radius_km = radius_km
+        templates = load_templates("users")
+        self.seniors = [user for user in templates if user["type"] == "senior"]
+        self.volunteers = [user for user in templates if user["type"] == "volunteer"]
+        self.center = (
+            sum(user["latitude"] for user in self.seniors) / len(self.seniors),
+            sum(user["longitude"] for user in self.seniors) / len(self.seniors),
+        )
+        self.items = sorted(
+            {
+                item["text"]
+                for order in load_templates("orders")
+                for item in order["description"]["data"]
+            }
+        )
+        self._phone = 0
+
+    def point(self) -> tuple[float, float]:
+        distance = self.radius_km * math.sqrt(self.random.random())
+        bearing = self.random.uniform(0, 2 * math.pi)
+        latitude = self.center[0] + distance * math.cos(bearing) / KM_PER_DEGREE
+        longitude = self.center[1] + distance * math.sin(bearing) / (
+            KM_PER_DEGREE * math.cos(math.radians(latitude))
+        )
+        return latitude, longitude
+
+    def phone_number(self) -> str:
+        self._phone += 1
+        return f"5{self.run_id}{self._phone:08d}"
+
+    def token(self) -> str:
+        return f"{self.random.getrandbits(128):032x}"
+
+    def user(self, type: str) -> dict:
+        template = self.random.choice(
+            self.seniors if type == "senior" else self.volunteers
+        )
+        latitude, longitude = self.point()
+        return {
+            **template,
+            "phone_number": self.phone_number(),
+            "latitude": latitude,
+            "longitude": longitude,
+        }
+
+    def users(self, count: int, type: str) -> list[dict]:
+        return [self.user(type) for _ in range(count)]
+
+    def description(self) -> dict:
+        texts = self.random.sample(
+            self.items, self.random.randint(1, min(6, len(self.items)))
+        )
+        return {
+            "data": [
+                {
+                    "id": self.random.randrange(10**12, 10**13),
+                    "text": text,
+                    "completed": self.random.random() < 0.2,
+                }
+                for text in texts
+            ]
+        }
+
+    def order(self, senior_ids: list[int], volunteer_ids: list[int]) -> dict:
+        status = self.random.choices(
+            list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values())
+        )[0]
+        valid_since = datetime.now() - timedelta(hours=self.random.randint(0, 240))
+        valid_until = valid_since + timedelta(hours=self.random.randint(24, 168))
+        return {
+            "category": "groceries",
+            "description": self.description(),
+            "valid_since": valid_since.isoformat(),
+            "valid_until": valid_until.isoformat(),
+            "status": status,
+            "senior_id": self.random.choice(senior_ids),
+            "volunteer_id": (
+                None if status == "pending" else self.random.choice(volunteer_ids)
+            ),
+        }
+
+    def orders(
+        self, count: int, senior_ids: list[int], volunteer_ids: list[int]
+    ) -> list[dict]:
+        return [self.order(senior_ids, volunteer_ids) for _ in range(count)]
@@ -0,0 +1,96 @@
+import argparse
+import os
+import sys
+import time
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.matching",
+        description="Time the vectorized matcher against a per-order SQL "
+        "nearest-volunteer query.",
+    )
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--volunteers", type=int, default=10000)
+    parser.add_argument("--seniors", type=int, default=5000)
+    parser.add_argument("--radius-km", type=float, default=10)
+    parser.add_argument(
+        "--naive-sample", type=int, default=200, help="orders queried one by one"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    os.environ["DATABASE_URL"] = args.database_url
+
+    import numpy as np
+    from sqlalchemy import func
+
+    from benchmarks import seed
+    from benchmarks.data import DataGenerator
+    from src import database, geo, matching
+    from src.models import User, UserType
+
+    generator = DataGenerator(seed=args.seed)
+
+    def points(count: int) -> matching.Points:
+        coordinates = np.array([generator.point() for _ in range(count)])
+        return matching.Points(
+            np.arange(count, dtype=np.int64), coordinates[:, 0], coordinates[:, 1]
+        )
+
+    orders, volunteers = points(args.orders), points(args.volunteers)
+    start = time.perf_counter()
+    matches = matching.match(orders, volunteers, args.radius_km)
+    print(
+        f"in-memory match   {args.orders} x {args.volunteers}: "
+        f"{time.perf_counter() - start:8.2f} s, {len(matches)} matches"
+    )
+
+    seed.enable_sqlite_foreign_keys()
+    print("seeding...", file=sys.stderr)
+    seed.seed_database(generator, args.seniors, args.volunteers, args.orders)
+
+    with database.SessionLocal() as db:
+        start = time.perf_counter()
+        orders, volunteers = matching.load(db)
+        loaded = time.perf_counter() - start
+        matches = matching.match(orders, volunteers, args.radius_km)
+        total = time.perf_counter() - start
+        print(
+            f"load + match      {len(orders)} x {len(volunteers)}: {total:8.2f} s "
+            f"(load {loaded:.2f} s), {len(matches)} matches"
+        )
+
+        # What a client-driven flow costs: one distance query per order.
+        sample = np.random.default_rng(args.seed).choice(
+            len(orders), min(args.naive_sample, len(orders)), replace=False
+        )
+        start = time.perf_counter()
+        for index in sample:
+            latitude = float(orders.latitudes[index])
+            longitude = float(orders.longitudes[index])
+            distance = (
+                func.acos(
+                    func.sin(func.radians(latitude))
+                    * func.sin(func.radians(User.latitude))
+                    + func.cos(func.radians(latitude))
+                    * func.cos(func.radians(User.latitude))
+                    * func.cos(func.radians(User.longitude) - func.radians(longitude))
+                )
+                * geo.EARTH_RADIUS_KM
+            )
+            db.query(User.id, distance).filter(
+                User.type == UserType.VOLUNTEER,
+                User.latitude.is_not(None),
+                distance <= args.radius_km,
+            ).order_by(distance).limit(matching.MATCHING_CANDIDATES).all()
+        per_order = (time.perf_counter() - start) / len(sample)
+        print(
+            f"naive SQL         {per_order * 1000:8.2f} ms/order, "
+            f"~{per_order * len(orders):.1f} s for {len(orders)} orders "
+            f"(no capacity handling)"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,528 @@
+import asyncio
+import contextvars
+import json
+import math
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlencode
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from benchmarks.data import DataGenerator
+from src.geo import KM_PER_DEGREE
+
+# Statement counter of the request being measured; copied into threadpool
+# workers and session greenlets along with the rest of the context.
+_statements: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar(
+    "benchmark_statements", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _statements.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+@dataclass
+class Context:
+    generator: DataGenerator
+    senior_ids: list[int]
+    volunteer_ids: list[int]
+    order_ids: list[int]
+    created_user_ids: list[int] = field(default_factory=list)
+    created_order_ids: list[int] = field(default_factory=list)
+    # Open orders that the accept and cancel scenarios use up, and accepted
+    # ones left for complete.
+    pending_order_ids: list[int] = field(default_factory=list)
+    accepted_order_ids: list[int] = field(default_factory=list)
+    sessions: list[tuple[str, str]] = field(default_factory=list)
+    etags: dict[str, str] = field(default_factory=dict)
+    cursor: Optional[str] = ""
+    hotspots: list[tuple[float, float]] = field(default_factory=list)
+    # The ASGI app, for requests httpx can't make through ASGITransport.
+    app: Optional[Callable] = None
+
+    def location(self) -> dict:
+        latitude, longitude = self.generator.point()
+        return {"latitude": latitude, "longitude": longitude}
+
+    def nearby_location(self, spots: int = 5, jitter_m: float = 30) -> dict:
+        # Volunteers polling from a few busy neighbourhoods, each reporting
+        # its own GPS position within a few metres of the others.
+        if not self.hotspots:
+            self.hotspots = [self.generator.point() for _ in range(spots)]
+        latitude, longitude = self.generator.random.choice(self.hotspots)
+        jitter = jitter_m / 1000 / KM_PER_DEGREE
+        return {
+            "latitude": latitude + self.generator.random.uniform(-jitter, jitter),
+            "longitude": longitude + self.generator.random.uniform(-jitter, jitter),
+        }
+
+
+@dataclass
+class Scenario:
+    name: str
+    # Returns (method, url, httpx request kwargs), or None to skip the call.
+    build: Optional[Callable[[Context], Optional[tuple[str, str, dict]]]]
+    after: Optional[Callable[[Context, httpx.Response], None]] = None
+    # Replaces build for calls that aren't a single request; returns the
+    # response to check, or None to skip the call.
+    send: Optional[
+        Callable[[httpx.AsyncClient, Context], Awaitable[Optional[httpx.Response]]]
+    ] = None
+    # Fraction of --requests to run, for scenarios that are expensive per call.
+    weight: float = 1.0
+    # GET /orders may answer from the order query cache. Off elsewhere, so
+    # the other scenarios measure their queries rather than cache hits.
+    query_cache: bool = False
+
+
+def _pick(ctx: Context, ids: list):
+    return ctx.generator.random.choice(ids)
+
+
+def _record(attribute: str) -> Callable[[Context, httpx.Response], None]:
+    def after(ctx: Context, response: httpx.Response) -> None:
+        getattr(ctx, attribute).append(response.json()["id"])
+
+    return after
+
+
+def _pop(ids: list[int]) -> Optional[int]:
+    return ids.pop() if ids else None
+
+
+def _register(ctx: Context) -> tuple[str, str, dict]:
+    user = ctx.generator.user("senior")
+    body = {key: user[key] for key in ("phone_number", "first_name", "last_name")}
+    body.update(type="senior", token=uuid.uuid4().hex)
+    return "POST", "/register", {"json": body}
+
+
+def _remember_session(ctx: Context, response: httpx.Response) -> None:
+    body = json.loads(response.request.content)
+    ctx.sessions.append((body["phone_number"], body["token"]))
+
+
+def _login(ctx: Context) -> Optional[tuple[str, str, dict]]:
+    if not ctx.sessions:
+        return None
+    phone_number, token = _pick(ctx, ctx.sessions)
+    return "POST", "/login", {"json": {"phone_number": phone_number, "token": token}}
+
+
+def _cursor_page(ctx: Context) -> tuple[str, str, dict]:
+    params = {"sort_by": "created_at", "limit": 100, "cursor": ctx.cursor or ""}
+    return "GET", "/orders", {"params": params}
+
+
+def _next_cursor(ctx: Context, response: httpx.Response) -> None:
+    ctx.cursor = response.json()["next_cursor"]
+
+
+def _conditional_get(ctx: Context) -> tuple[str, str, dict]:
+    # Polls a small set of orders the way clients do, revalidating with the
+    # ETag from the previous response.
+    url = f"/orders/{_pick(ctx, ctx.order_ids[:20])}"
+    etag = ctx.etags.get(url)
+    return "GET", url, {"headers": {"If-None-Match": etag} if etag else {}}
+
+
+def _remember_etag(ctx: Context, response: httpx.Response) -> None:
+    ctx.etags[response.request.url.path] = response.headers["etag"]
+
+
+def _ids(ctx: Context, ids: list[int], count: int = 50) -> dict:
+    # A screen's worth of ids fetched in one request.
+    chosen = ctx.generator.random.sample(ids, min(count, len(ids)))
+    return {"ids": ",".join(map(str, chosen))}
+
+
+def _delete(path: str, attribute: str):
+    def build(ctx: Context) -> Optional[tuple[str, str, dict]]:
+        entity_id = _pop(getattr(ctx, attribute))
+        return None if entity_id is None else ("DELETE", f"{path}/{entity_id}", {})
+
+    return build
+
+
+def _accept(ctx: Context) -> Optional[tuple[str, str, dict]]:
+    order_id = _pop(ctx.pending_order_ids)
+    if order_id is None:
+        return None
+    body = {"volunteer_id": _pick(ctx, ctx.volunteer_ids)}
+    return "POST", f"/orders/{order_id}/accept", {"json": body}
+
+
+def _transition(action: str, attribute: str):
+    def build(ctx: Context) -> Optional[tuple[str, str, dict]]:
+        order_id = _pop(getattr(ctx, attribute))
+        return (
+            None if order_id is None else ("POST", f"/orders/{order_id}/{action}", {})
+        )
+
+    return build
+
+
+async def _stream_event(
+    client: httpx.AsyncClient, ctx: Context
+) -> Optional[httpx.Response]:
+    # Opens GET /orders/stream, creates an order and waits for its event.
+    # ASGITransport waits for the whole body, which an event stream never
+    # finishes, so the stream is read from the app directly.
+    order = ctx.generator.order(ctx.senior_ids, ctx.volunteer_ids)
+    started, disconnected = asyncio.Event(), asyncio.Event()
+    frames: asyncio.Queue[bytes] = asyncio.Queue()
+    requested = False
+
+    async def receive() -> dict:
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            started.set()
+        elif message["type"] == "http.response.body":
+            frames.put_nowait(message.get("body", b""))
+
+    async def created_event(order_id: int) -> None:
+        while True:
+            frame = (await frames.get()).decode()
+            if not frame.startswith("event: created\n"):
+                continue
+            data = frame.split("data: ", 1)[1]
+            if json.loads(data)["id"] == order_id:
+                return
+
+    query = urlencode({"category": order["category"]})
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("benchmark", 80),
+        "client": ("benchmark", 1),
+        "root_path": "",
+        "path": "/orders/stream",
+        "raw_path": b"/orders/stream",
+        "query_string": query.encode(),
+        "headers": [],
+    }
+    stream = asyncio.create_task(ctx.app(scope, receive, send))
+    try:
+        await started.wait()
+        response = await client.post("/orders", json=order)
+        if response.status_code == 200:
+            try:
+                await asyncio.wait_for(created_event(response.json()["id"]), 10)
+            except asyncio.TimeoutError:
+                # Counted as an error: the event never arrived.
+                return httpx.Response(504, request=response.request)
+        return response
+    finally:
+        disconnected.set()
+        await stream
+
+
+SCENARIOS = [
+    Scenario("root", lambda ctx: ("GET", "/", {})),
+    Scenario("metrics", lambda ctx: ("GET", "/metrics", {}), weight=0.1),
+    Scenario("users_list", lambda ctx: ("GET", "/users", {"params": {"limit": 100}})),
+    Scenario(
+        "users_cursor",
+        lambda ctx: ("GET", "/users", {"params": {"limit": 100, "cursor": ""}}),
+    ),
+    Scenario(
+        "users_by_ids",
+        lambda ctx: (
+            "GET",
+            "/users",
+            {"params": _ids(ctx, ctx.senior_ids + ctx.volunteer_ids)},
+        ),
+    ),
+    Scenario(
+        "user_get", lambda ctx: ("GET", f"/users/{_pick(ctx, ctx.senior_ids)}", {})
+    ),
+    Scenario(
+        "user_create",
+        lambda ctx: ("POST", "/users", {"json": ctx.generator.user("senior")}),
+        after=_record("created_user_ids"),
+    ),
+    Scenario(
+        "user_update",
+        lambda ctx: (
+            "PUT",
+            f"/users/{_pick(ctx, ctx.created_user_ids or ctx.senior_ids)}",
+            {"json": {"description": uuid.uuid4().hex, **ctx.location()}},
+        ),
+    ),
+    Scenario(
+        "users_bulk",
+        lambda ctx: (
+            "POST",
+            "/users/bulk",
+            {"json": ctx.generator.users(100, "senior")},
+        ),
+        weight=0.1,
+    ),
+    Scenario("register", _register, after=_remember_session),
+    Scenario("login", _login),
+    Scenario(
+        "session_get",
+        lambda ctx: (
+            (
+                "GET",
+                "/user-sessions",
+                {"params": {"token": _pick(ctx, ctx.sessions)[1]}},
+            )
+            if ctx.sessions
+            else None
+        ),
+    ),
+    Scenario(
+        "session_create",
+        lambda ctx: (
+            "POST",
+            "/user-sessions",
+            {
+                "json": {
+                    "token": uuid.uuid4().hex,
+                    "user_id": _pick(ctx, ctx.senior_ids),
+                }
+            },
+        ),
+    ),
+    Scenario("orders_list", lambda ctx: ("GET", "/orders", {"params": {"limit": 100}})),
+    Scenario(
+        "orders_filtered",
+        lambda ctx: (
+            "GET",
+            "/orders",
+            {"params": {"status": "pending", "category": "groceries", "limit": 100}},
+        ),
+    ),
+    Scenario(
+        "orders_expanded",
+        lambda ctx: (
+            "GET",
+            "/orders",
+            {"params": {"limit": 100, "expand": "senior,volunteer"}},
+        ),
+    ),
+    Scenario(
+        "orders_expanded_large",
+        lambda ctx: (
+            "GET",
+            "/orders",
+            {"params": {"limit": 1000, "expand": "senior,volunteer"}},
+        ),
+        weight=0.1,
+    ),
+    Scenario(
+        "orders_by_ids",
+        lambda ctx: ("GET", "/orders", {"params": _ids(ctx, ctx.order_ids)}),
+    ),
+    Scenario(
+        "orders_distance",
+        lambda ctx: (
+            "GET",
+            "/orders",
+            {"params": {"sort_by": "distance", "limit": 100, **ctx.location()}},
+        ),
+    ),
+    Scenario(
+        "orders_distance_radius",
+        lambda ctx: (
+            "GET",
+            "/orders",
+            {
+                "params": {
+                    "sort_by": "distance",
+                    "radius_km": 2,
+                    "limit": 100,
+                    **ctx.location(),
+                }
+            },
+        ),
+    ),
+    Scenario(
+        "orders_nearby_poll",
+        lambda ctx: (
+            "GET",
+            "/orders",
+            {
+                "params": {
+                    "status": "pending",
+                    "sort_by": "distance",
+                    "radius_km": 3,
+                    "limit": 50,
+                    **ctx.nearby_location(),
+                }
+            },
+        ),
+        query_cache=True,
+    ),
+    Scenario(
+        "orders_offset_deep",
+        lambda ctx: (
+            "GET",
+            "/orders",
+            {
+                "params": {
+                    "sort_by": "created_at",
+                    "skip": max(len(ctx.order_ids) - 100, 0),
+                    "limit": 100,
+                }
+            },
+        ),
+    ),
+    Scenario("orders_cursor_walk", _cursor_page, after=_next_cursor),
+    Scenario(
+        "orders_export",
+        lambda ctx: (
+            "GET",
+            "/orders/export",
+            {"params": {"fields": "id,status,senior_id,created_at"}},
+        ),
+        weight=0.05,
+    ),
+    Scenario(
+        "order_get", lambda ctx: ("GET", f"/orders/{_pick(ctx, ctx.order_ids)}", {})
+    ),
+    Scenario("order_get_conditional", _conditional_get, after=_remember_etag),
+    Scenario(
+        "order_create",
+        lambda ctx: (
+            "POST",
+            "/orders",
+            {"json": ctx.generator.order(ctx.senior_ids, ctx.volunteer_ids)},
+        ),
+        after=_record("created_order_ids"),
+    ),
+    Scenario(
+        "order_update",
+        lambda ctx: (
+            "PUT",
+            f"/orders/{_pick(ctx, ctx.created_order_ids or ctx.order_ids)}",
+            {"json": {"description": ctx.generator.description()}},
+        ),
+    ),
+    Scenario("order_accept", _accept, after=_record("accepted_order_ids")),
+    Scenario("order_complete", _transition("complete", "accepted_order_ids")),
+    Scenario("order_cancel", _transition("cancel", "pending_order_ids")),
+    Scenario(
+        "orders_matches",
+        lambda ctx: (
+            "GET",
+            "/orders/matches",
+            {"params": {"volunteer_id": _pick(ctx, ctx.volunteer_ids)}},
+        ),
+    ),
+    Scenario(
+        "orders_stream",
+        None,
+        send=_stream_event,
+        after=_record("created_order_ids"),
+    ),
+    Scenario(
+        "user_stats",
+        lambda ctx: ("GET", f"/users/{_pick(ctx, ctx.senior_ids)}/stats", {}),
+    ),
+    Scenario(
+        "orders_bulk",
+        lambda ctx: (
+            "POST",
+            "/orders/bulk",
+            {"json": ctx.generator.orders(100, ctx.senior_ids, ctx.volunteer_ids)},
+        ),
+        weight=0.1,
+    ),
+    Scenario("order_delete", _delete("/orders", "created_order_ids")),
+    Scenario("user_delete", _delete("/users", "created_user_ids")),
+]
+
+
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    ctx: Context,
+    requests: int,
+    concurrency: int = 1,
+    warmup: int = 0,
+) -> Optional[dict]:
+    latencies, statements = [], []
+    errors = 0
+
+    async def call() -> None:
+        nonlocal errors
+        send = scenario.send
+        if send is None:
+            request = scenario.build(ctx)
+            if request is None:
+                return
+            method, url, kwargs = request
+
+            async def send(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+                response = await client.request(method, url, **kwargs)
+                await response.aread()
+                return response
+
+        counter = [0]
+        token = _statements.set(counter)
+        try:
+            start = time.perf_counter()
+            response = await send(client, ctx)
+            elapsed = time.perf_counter() - start
+        finally:
+            _statements.reset(token)
+        if response is None:
+            return
+        if response.status_code >= 400:
+            errors += 1
+        elif scenario.after is not None:
+            scenario.after(ctx, response)
+        latencies.append(elapsed)
+        statements.append(counter[0])
+
+    for _ in range(warmup):
+        await call()
+    latencies.clear()
+    statements.clear()
+    errors = 0
+
+    remaining = iter(range(max(int(requests * scenario.weight), 1)))
+
+    async def worker() -> None:
+        for _ in remaining:
+            await call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+    if not latencies:
+        return None
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_rps": len(latencies) / duration,
+        "statements_per_request": sum(statements) / len(statements),
+    }
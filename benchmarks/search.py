@@ -0,0 +1,114 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Callable
+
+RARE_ITEM = "Szafran"
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.search",
+        description="Time GET /orders?q= item search. On Postgres every query is "
+        "also run with index scans disabled, for the sequential-scan baseline.",
+    )
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--q",
+        action="append",
+        help="search to time (default: a rare item, a "
+        "common item and a two-word search)",
+    )
+    args = parser.parse_args(argv)
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["ARCHIVE_INTERVAL"] = "0"
+
+    from sqlalchemy import insert, text
+
+    from benchmarks import seed
+    from benchmarks.data import DataGenerator
+    from src import crud, database
+    from src.models import Order, OrderCategory, OrderStatus
+
+    generator = DataGenerator(seed=args.seed)
+    seed.enable_sqlite_foreign_keys()
+    print("seeding...", file=sys.stderr)
+    senior_ids, _, _ = seed.seed_database(generator, args.users, args.users, 0)
+
+    # One order in a thousand lists an item no other order has.
+    created_at = datetime.now()
+    statuses = list(OrderStatus)
+    with database.SessionLocal() as db:
+        for offset in range(0, args.orders, seed.CHUNK_SIZE * 10):
+            count = min(seed.CHUNK_SIZE * 10, args.orders - offset)
+            rows = []
+            for index in range(offset, offset + count):
+                description = generator.description()
+                if index % 1000 == 0:
+                    description["data"].append(
+                        {"id": index, "text": RARE_ITEM, "completed": False}
+                    )
+                rows.append(
+                    {
+                        "category": OrderCategory.GROCERIES,
+                        "description": description,
+                        "created_at": created_at,
+                        "status": statuses[index % len(statuses)],
+                        "senior_id": senior_ids[index % len(senior_ids)],
+                    }
+                )
+            db.execute(insert(Order), rows)
+            db.commit()
+            print(f"  {offset + count} orders", file=sys.stderr)
+    postgres = database.engine.dialect.name == "postgresql"
+    if postgres:
+        with database.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as connection:
+            connection.exec_driver_sql("VACUUM ANALYZE orders")
+    searches = args.q or [RARE_ITEM.lower(), "makaron", "marchewka duża"]
+
+    def search(db, q: str, **filters) -> list:
+        orders, _ = crud.get_orders_page(db, q=q, limit=100, **filters)
+        return orders
+
+    print(f"{'':<36} {'planner':>12} {'seq scan':>12}  (ms, first 100 matches)")
+    with database.SessionLocal() as db:
+        for q in searches:
+            for label, filters in [
+                ("", {}),
+                (", pending, newest", {"status": OrderStatus.PENDING}),
+            ]:
+                if filters:
+                    filters["sort_by"] = "created_at"
+                    filters["sort_direction"] = "desc"
+                found = len(search(db, q, **filters))
+                planned = best_of(lambda: search(db, q, **filters), args.repeat)
+                scan = float("nan")
+                if postgres:
+                    db.execute(text("SET enable_bitmapscan = off"))
+                    db.execute(text("SET enable_indexscan = off"))
+                    scan = best_of(lambda: search(db, q, **filters), args.repeat)
+                    db.execute(text("RESET enable_bitmapscan"))
+                    db.execute(text("RESET enable_indexscan"))
+                name = f"{q!r}{label} ({found})"
+                print(f"{name:<36} {planned * 1000:12.2f} {scan * 1000:12.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
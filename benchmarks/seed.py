@@ -0,0 +1,130 @@
+from datetime import datetime
+
+from sqlalchemy import event, func, insert, select
+
+from benchmarks.data import DataGenerator
+from src import auth, crud, database, schemas
+from src.models import Base, Order, OrderStatus, User, UserSession, UserType
+
+CHUNK_SIZE = 5000
+# Stored sessions the login scenario picks from.
+SESSION_SAMPLE_SIZE = 10000
+
+
+def enable_sqlite_foreign_keys() -> None:
+    # ON DELETE CASCADE needs this on SQLite, matching Postgres behaviour.
+    engines = [database.engine]
+    if database.async_engine is not None:
+        engines.append(database.async_engine.sync_engine)
+    for engine in engines:
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", _foreign_keys_on)
+
+
+def _foreign_keys_on(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _bulk_create(create, model, rows: list[dict]) -> list[int]:
+    with database.SessionLocal() as db:
+        created, errors = create(
+            db,
+            [(index, model.model_validate(row)) for index, row in enumerate(rows)],
+            chunk_size=CHUNK_SIZE,
+        )
+    if errors:
+        raise RuntimeError(f"Seeding failed: {errors[:5]}")
+    return [entity_id for _, entity_id in created]
+
+
+def seed_sessions(generator: DataGenerator, user_ids: list[int], count: int) -> None:
+    with database.SessionLocal() as db:
+        for start in range(0, count, CHUNK_SIZE):
+            tokens = [generator.token() for _ in range(min(CHUNK_SIZE, count - start))]
+            db.execute(
+                insert(UserSession),
+                [
+                    {
+                        "token": token,
+                        "token_hash": auth.hash_token(token),
+                        "user_id": generator.random.choice(user_ids),
+                    }
+                    for token in tokens
+                ],
+            )
+            db.commit()
+
+
+def session_sample(size: int = SESSION_SAMPLE_SIZE) -> list[tuple[str, str]]:
+    # (phone number, token) of sessions spread over the whole table, so that
+    # logins don't keep hitting the same index pages or the session cache.
+    with database.SessionLocal() as db:
+        rows = db.execute(
+            select(User.phone_number, UserSession.token)
+            .join(UserSession, UserSession.user_id == User.id)
+            .order_by(func.random())
+            .limit(size)
+        )
+        return [tuple(row) for row in rows]
+
+
+def session_count() -> int:
+    with database.SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(UserSession))
+
+
+def seed_database(
+    generator: DataGenerator,
+    seniors: int,
+    volunteers: int,
+    orders: int,
+    sessions: int = 0,
+) -> tuple[list[int], list[int], list[int]]:
+    Base.metadata.drop_all(database.engine)
+    Base.metadata.create_all(database.engine)
+    senior_ids = _bulk_create(
+        crud.bulk_create_users, schemas.UserCreate, generator.users(seniors, "senior")
+    )
+    volunteer_ids = _bulk_create(
+        crud.bulk_create_users,
+        schemas.UserCreate,
+        generator.users(volunteers, "volunteer"),
+    )
+    seed_sessions(generator, senior_ids + volunteer_ids, sessions)
+    order_ids = []
+    for start in range(0, orders, CHUNK_SIZE):
+        count = min(CHUNK_SIZE, orders - start)
+        order_ids += _bulk_create(
+            crud.bulk_create_orders,
+            schemas.OrderCreate,
+            generator.orders(count, senior_ids, volunteer_ids),
+        )
+    return senior_ids, volunteer_ids, order_ids
+
+
+def existing_ids() -> tuple[list[int], list[int], list[int]]:
+    with database.SessionLocal() as db:
+        senior_ids = list(
+            db.scalars(select(User.id).where(User.type == UserType.SENIOR))
+        )
+        volunteer_ids = list(
+            db.scalars(select(User.id).where(User.type == UserType.VOLUNTEER))
+        )
+        order_ids = list(db.scalars(select(Order.id)))
+    return senior_ids, volunteer_ids, order_ids
+
+
+def pending_order_ids() -> list[int]:
+    # Orders that can still be accepted or cancelled.
+    with database.SessionLocal() as db:
+        return list(
+            db.scalars(
+                select(Order.id).where(
+                    Order.status == OrderStatus.PENDING,
+                    Order.volunteer_id.is_(None),
+                    Order.valid_until > datetime.now(),
+                )
+            )
+        )
@@ -0,0 +1,101 @@
+import argparse
+import os
+import sys
+import time
+from typing import Callable
+
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.serialization",
+        description="Compare the cost of fetching and encoding order lists with "
+        "ORM instances + jsonable_encoder against column rows + orjson.",
+    )
+    parser.add_argument("--database-url", default="sqlite:///:memory:")
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+
+    from benchmarks import seed
+    from benchmarks.data import DataGenerator
+    from src import crud, database
+    from src.models import Order
+
+    generator = DataGenerator()
+    seed.seed_database(generator, 100, 50, args.orders)
+    latitude, longitude = generator.center
+
+    with database.SessionLocal() as db:
+
+        def orm_rows():
+            db.expunge_all()
+            return db.query(Order).limit(args.orders).all()
+
+        def orm_distance_rows():
+            db.expunge_all()
+            query, _ = crud._orders_query(
+                db, Order, [Order], latitude=latitude, longitude=longitude
+            )
+            rows = []
+            for order, distance in query.limit(args.orders):
+                row = order.__dict__
+                row["distance"] = distance
+                rows.append(row)
+            return rows
+
+        def column_rows(**filters):
+            orders, _ = crud.get_orders_page(db, limit=args.orders, **filters)
+            return orders
+
+        legacy = orm_rows()
+        legacy_distance = orm_distance_rows()
+        current = column_rows()
+        current_distance = column_rows(latitude=latitude, longitude=longitude)
+        cases = [
+            (
+                "orm + jsonable_encoder",
+                lambda: JSONResponse(jsonable_encoder(orm_rows())),
+                lambda: JSONResponse(jsonable_encoder(legacy)),
+            ),
+            (
+                "columns + orjson",
+                lambda: ORJSONResponse(column_rows()),
+                lambda: ORJSONResponse(current),
+            ),
+            (
+                "distance, orm + jsonable_encoder",
+                lambda: JSONResponse(jsonable_encoder(orm_distance_rows())),
+                lambda: JSONResponse(jsonable_encoder(legacy_distance)),
+            ),
+            (
+                "distance, columns + orjson",
+                lambda: ORJSONResponse(
+                    column_rows(latitude=latitude, longitude=longitude)
+                ),
+                lambda: ORJSONResponse(current_distance),
+            ),
+        ]
+
+        scale = 1000 / args.orders * 1000
+        print(f"{'':<34} {'fetch+encode':>14} {'encode only':>14}  (ms / 1000 orders)")
+        for name, end_to_end, encode_only in cases:
+            total = measure(end_to_end, args.repeat) * scale
+            encode = measure(encode_only, args.repeat) * scale
+            print(f"{name:<34} {total:14.2f} {encode:14.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
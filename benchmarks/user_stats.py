@@ -0,0 +1,121 @@
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from typing import Callable
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.user_stats",
+        description="Time per-user order statistics from the counters against "
+        "counting the user's orders, for seniors with many orders each.",
+    )
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--orders-per-user", type=int, default=10000)
+    parser.add_argument("--volunteers", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["ARCHIVE_INTERVAL"] = "0"
+
+    from sqlalchemy import func, select
+
+    from benchmarks import seed
+    from benchmarks.data import DataGenerator
+    from src import archive, crud, database, order_counts, schemas
+    from src.models import ArchivedOrder, Order
+
+    generator = DataGenerator(seed=args.seed)
+    seed.enable_sqlite_foreign_keys()
+    print("seeding...", file=sys.stderr)
+    senior_ids, volunteer_ids, _ = seed.seed_database(
+        generator, args.users, args.volunteers, 0
+    )
+    # Orders go through bulk create, which keeps the counters up to date.
+    began = time.perf_counter()
+    with database.SessionLocal() as db:
+        for senior_id in senior_ids:
+            for offset in range(0, args.orders_per_user, seed.CHUNK_SIZE):
+                count = min(seed.CHUNK_SIZE, args.orders_per_user - offset)
+                rows = generator.orders(count, [senior_id], volunteer_ids)
+                crud.bulk_create_orders(
+                    db,
+                    [
+                        (index, schemas.OrderCreate.model_validate(row))
+                        for index, row in enumerate(rows)
+                    ],
+                    chunk_size=seed.CHUNK_SIZE,
+                )
+            print(f"  senior {senior_id} seeded", file=sys.stderr)
+    elapsed = time.perf_counter() - began
+    total = args.users * args.orders_per_user
+    print(f"created {total} orders in {elapsed:.1f} s ({total / elapsed:.0f}/s)")
+    moved = archive.archive_orders(after_hours=0)
+    print(f"archived {moved} finished orders")
+
+    def paged(db, senior_id: int) -> Counter:
+        # What clients do today: fetch every order and count.
+        counts, cursor = Counter(), ""
+        while cursor is not None:
+            orders, cursor = crud.get_orders_page(
+                db,
+                senior_id=senior_id,
+                cursor=cursor,
+                limit=1000,
+                include_archived=True,
+            )
+            counts.update(order["status"].value for order in orders)
+        return counts
+
+    def grouped(db, senior_id: int) -> Counter:
+        counts = Counter()
+        for model in (Order, ArchivedOrder):
+            rows = db.execute(
+                select(model.status, func.count())
+                .where(model.senior_id == senior_id)
+                .group_by(model.status)
+            )
+            counts.update({status.value: count for status, count in rows})
+        return counts
+
+    def counters(db, senior_id: int) -> Counter:
+        stats = crud.get_user_stats(db, [senior_id])[senior_id]["as_senior"]
+        return Counter({status: count for status, count in stats.items() if count})
+
+    with database.SessionLocal() as db:
+        for senior_id in senior_ids:
+            if (
+                not paged(db, senior_id)
+                == grouped(db, senior_id)
+                == counters(db, senior_id)
+            ):
+                raise RuntimeError(f"Counts differ for senior {senior_id}")
+        for name, fn in (
+            ("page through orders", paged),
+            ("COUNT ... GROUP BY status", grouped),
+            ("order_counts", counters),
+        ):
+            elapsed = sum(
+                best_of(lambda: fn(db, senior_id), args.repeat)
+                for senior_id in senior_ids
+            ) / len(senior_ids)
+            print(f"{name:<28} {elapsed * 1000:10.3f} ms per user")
+        elapsed = best_of(lambda: order_counts.recompute(db), 1)
+        print(f"full recompute in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,103 @@
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import TIMESTAMP, delete, insert, literal, or_, select
+from sqlalchemy.orm import Session
+
+from src import database, metrics, order_counts
+from src.jobs import PeriodicJob
+from src.models import ArchivedOrder, Order, OrderStatus
+from src.query_cache import orders_query_cache
+
+# Seconds between archive runs in each API process; 0 switches it off.
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "300"))
+# Finished orders created less than this long ago stay in `orders`.
+ARCHIVE_AFTER_HOURS = float(os.getenv("ARCHIVE_AFTER_HOURS", "24"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
+FINISHED = (OrderStatus.COMPLETED, OrderStatus.CANCELLED, OrderStatus.EXPIRED)
+ORDER_FIELDS = [column.key for column in Order.__table__.columns]
+
+
+def archive_batch(db: Session, before: datetime, batch_size: int) -> int:
+    # SKIP LOCKED lets several workers run the job at once, each moving a
+    # different batch, and keeps a concurrent update of an order from
+    # racing its move.
+    ids = list(
+        db.scalars(
+            select(Order.id)
+            .where(
+                Order.status.in_(FINISHED),
+                or_(Order.created_at.is_(None), Order.created_at < before),
+            )
+            .order_by(Order.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+    )
+    if not ids:
+        return 0
+    # The rows are copied server-side; only the counted fields come back.
+    # Archived orders keep their content, so cached entities stay valid and
+    # no order events are sent; only cached lists of live orders change.
+    db.execute(
+        insert(ArchivedOrder).from_select(
+            ORDER_FIELDS + ["archived_at"],
+            select(*Order.__table__.columns, literal(datetime.now(), TIMESTAMP)).where(
+                Order.id.in_(ids)
+            ),
+        )
+    )
+    table = Order.__table__
+    moved = (
+        db.execute(
+            delete(table)
+            .where(table.c.id.in_(ids))
+            .returning(*(table.c[field] for field in order_counts.COUNTED_FIELDS))
+        )
+        .mappings()
+        .all()
+    )
+    order_counts.apply(db, order_counts.moved_to_archive(moved))
+    db.commit()
+    orders_query_cache.invalidate()
+    metrics.inc("orders_archived_total", len(ids))
+    return len(ids)
+
+
+def archive_orders(
+    after_hours: float = ARCHIVE_AFTER_HOURS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    now: Optional[datetime] = None,
+) -> int:
+    # One transaction per batch keeps locks and WAL bursts short.
+    before = (now or datetime.now()) - timedelta(hours=after_hours)
+    total = 0
+    with database.SessionLocal() as db:
+        while True:
+            moved = archive_batch(db, before, batch_size)
+            total += moved
+            if moved < batch_size:
+                return total
+
+
+archive_job = PeriodicJob("order-archive", ARCHIVE_INTERVAL, archive_orders)
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.archive",
+        description="Move completed, cancelled and expired orders to "
+        "orders_archive.",
+    )
+    parser.add_argument("--after-hours", type=float, default=ARCHIVE_AFTER_HOURS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    print(archive_orders(args.after_hours, args.batch_size))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,19 @@
+import hashlib
+import os
+
+from src.cache import TTLCache
+
+# token hash -> (session id, user id)
+session_cache = TTLCache(
+    "user_sessions",
+    maxsize=int(os.getenv("SESSION_CACHE_SIZE", "100000")),
+    ttl=float(os.getenv("SESSION_CACHE_TTL", "300")),
+)
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def invalidate_user(user_id: int) -> None:
+    session_cache.pop_where(lambda value: value[1] == user_id)
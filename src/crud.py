@@ -1,136 +1,563 @@
+import os
 from datetime import datetime
-from typing import Optional, Type
+from typing import Iterator, Optional, Type, Union
 
 from fastapi import HTTPException
-from sqlalchemy import func
-from sqlalchemy.orm import Session
-
-from src.models import Order, OrderCategory, OrderStatus, User, UserSession
+from sqlalchemy import (Table, delete, exists, func, insert, or_, select,
+                        union_all, update)
+from sqlalchemy.orm import Session, aliased, selectinload
+
+from src import auth, geo, geocoding, order_counts, pagination, schemas
+from src.cache import MISSING
+from src.entity_cache import order_cache, user_cache
+from src.events import OrderEvent, order_events
+from src.models import (ArchivedOrder, GeocodeStatus, Order, OrderCategory,
+                        OrderStatus, User, UserSession, UserType,
+                        order_items_text)
+from src.query_cache import orders_query_cache
 from src.schemas import (CreateUserSession, LoginRequest, OrderCreate,
                          OrderUpdate, RegisterRequest, UserCreate, UserUpdate)
 
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_FIELDS = [column.key for column in Order.__table__.columns]
+# Users that GET /orders can embed in each order.
+EXPANDABLE = ("senior", "volunteer")
+
+# List endpoints select exactly the response fields, in response order, and
+# return plain dicts instead of ORM instances.
+USER_COLUMNS = [getattr(User, name) for name in schemas.User.model_fields]
+ORDER_COLUMNS = [getattr(Order, name) for name in schemas.Order.model_fields]
+
+# Live orders and the archive, as one selectable mapped like Order.
+ALL_ORDERS = aliased(
+    Order,
+    union_all(
+        select(*Order.__table__.columns),
+        select(*(ArchivedOrder.__table__.c[field] for field in EXPORT_FIELDS)),
+    ).subquery("all_orders"),
+)
+
+
+def get_users(db: Session, skip: int = 0, limit: int = 100) -> list[dict]:
+    query = db.query(*USER_COLUMNS).offset(skip).limit(limit)
+    return [row._asdict() for row in query]
+
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> list[Type[User]]:
-    return db.query(User).offset(skip).limit(limit).all()
+def get_users_page(
+    db: Session, cursor: str = "", limit: int = 100
+) -> tuple[list[dict], Optional[str]]:
+    query = db.query(*USER_COLUMNS).order_by(User.id.asc())
+    if cursor:
+        _, last_id = pagination.decode_cursor(cursor, None)
+        query = query.filter(User.id > last_id)
+    users = [row._asdict() for row in query.limit(limit + 1)]
+    if len(users) <= limit:
+        return users, None
+    users = users[:limit]
+    return users, pagination.encode_cursor(None, None, users[-1]["id"])
+
+
+def get_users_by_ids(db: Session, ids: list[int]) -> list[dict]:
+    query = db.query(*USER_COLUMNS).filter(User.id.in_(ids)).order_by(User.id.asc())
+    return [row._asdict() for row in query]
 
 
 def get_user(db: Session, user_id: int) -> Optional[Type[User]]:
     return db.query(User).filter(User.id == user_id).first()
 
 
+def get_user_entry(db: Session, user_id: int) -> Optional[tuple[str, bytes]]:
+    return user_cache.load(user_id, lambda: get_user(db, user_id))
+
+
+def user_exists(db: Session, user_id: int) -> bool:
+    # Bypasses user_cache, which must not be filled from a replica.
+    return db.scalar(select(exists().where(User.id == user_id)))
+
+
+def get_user_stats(db: Session, user_ids: list[int]) -> dict[int, dict]:
+    return order_counts.user_stats(db, user_ids)
+
+
 def get_user_by_phone_number(db: Session, phone_number: str) -> Optional[Type[User]]:
     return db.query(User).filter(User.phone_number == phone_number).first()
 
 
-def create_user(db: Session, user: UserCreate) -> User:
-    db_user = User(**user.model_dump())
+def create_user(
+    db: Session, user: UserCreate, geocode_status: GeocodeStatus = None
+) -> User:
+    db_user = User(
+        **user.model_dump(),
+        **geo.location_columns(user.latitude, user.longitude),
+        geocode_status=geocode_status,
+    )
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
 
-def update_user(
-    db: Session, user_update: UserUpdate, db_user: Type[User]
-) -> Type[User]:
-    update_data = user_update.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_user, key, value)
+def bulk_create_users(
+    db: Session, users: list[tuple[int, UserCreate]], chunk_size: int = BULK_CHUNK_SIZE
+) -> tuple[list[tuple[int, int]], list[tuple[int, str]]]:
+    created, errors = [], []
+    seen = set()
+    for start in range(0, len(users), chunk_size):
+        chunk = users[start : start + chunk_size]
+        phones = {user.phone_number for _, user in chunk}
+        registered = set(
+            db.scalars(select(User.phone_number).where(User.phone_number.in_(phones)))
+        )
+        indexes, rows = [], []
+        for index, user in chunk:
+            if user.phone_number in registered:
+                errors.append((index, "Phone number already registered"))
+            elif user.phone_number in seen:
+                errors.append((index, "Duplicate phone number in request"))
+            else:
+                seen.add(user.phone_number)
+                indexes.append(index)
+                rows.append(
+                    {
+                        **user.model_dump(),
+                        **geo.location_columns(user.latitude, user.longitude),
+                    }
+                )
+        if rows:
+            ids = db.scalars(
+                insert(User).returning(User.id, sort_by_parameter_order=True), rows
+            )
+            created.extend(zip(indexes, ids))
     db.commit()
-    db.refresh(db_user)
+    return created, errors
+
+
+def _update_returning(
+    db: Session, table: Table, row_id: int, values: dict
+) -> Optional[dict]:
+    # Writes are a single statement that returns the changed row; no row
+    # means the id doesn't exist.
+    if values:
+        statement = (
+            update(table).where(table.c.id == row_id).values(values).returning(*table.c)
+        )
+    else:
+        statement = select(*table.c).where(table.c.id == row_id)
+    row = db.execute(statement).mappings().first()
+    return dict(row) if row is not None else None
+
+
+def _delete_returning(db: Session, table: Table, row_id: int) -> Optional[dict]:
+    statement = delete(table).where(table.c.id == row_id).returning(*table.c)
+    row = db.execute(statement).mappings().first()
+    return dict(row) if row is not None else None
+
+
+def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[dict]:
+    values = user_update.model_dump(exclude_unset=True)
+    moved = "latitude" in values or "longitude" in values
+    if moved:
+        latitude, longitude = values.get("latitude"), values.get("longitude")
+        if "latitude" not in values or "longitude" not in values:
+            # The unit vector needs both coordinates.
+            current = (
+                db.query(User.latitude, User.longitude)
+                .filter(User.id == user_id)
+                .first()
+            )
+            if current is None:
+                return None
+            latitude = values.get("latitude", current.latitude)
+            longitude = values.get("longitude", current.longitude)
+        values.update(geo.location_columns(latitude, longitude))
+    db_user = _update_returning(db, User.__table__, user_id, values)
+    db.commit()
+    user_cache.invalidate(user_id)
+    if moved:
+        orders_query_cache.invalidate()
+    return db_user
+
+
+def delete_user(db: Session, user_id: int) -> Optional[dict]:
+    order_counts.apply(db, order_counts.removed_with_user(db, user_id))
+    order_counts.forget_user(db, user_id)
+    if order_events.enabled:
+        _publish_removed_with_user(db, user_id)
+    db_user = _delete_returning(db, User.__table__, user_id)
+    db.commit()
+    if db_user is not None:
+        auth.invalidate_user(user_id)
+        user_cache.invalidate(user_id)
+        # Their orders went with them through ON DELETE CASCADE.
+        order_cache.invalidate()
+        orders_query_cache.invalidate()
     return db_user
 
 
+def _publish_removed_with_user(db: Session, user_id: int) -> None:
+    # Subscribers see the orders ON DELETE CASCADE takes with the user as
+    # deleted, like any other deleted order.
+    removed = []
+    for model in (Order, ArchivedOrder):
+        rows = db.execute(
+            select(*model.__table__.c, User.latitude, User.longitude)
+            .join(User, User.id == model.senior_id)
+            .where(or_(model.senior_id == user_id, model.volunteer_id == user_id))
+        ).mappings()
+        removed += [
+            OrderEvent(
+                "deleted",
+                {name: row[name] for name in schemas.Order.model_fields},
+                row["latitude"],
+                row["longitude"],
+            )
+            for row in rows
+        ]
+    if removed:
+        order_events.publish(db, removed)
+
+
 def create_user_session(db: Session, user_session: CreateUserSession) -> UserSession:
-    db_user_session = UserSession(**user_session.model_dump())
+    db_user_session = UserSession(
+        **user_session.model_dump(), token_hash=auth.hash_token(user_session.token)
+    )
     db.add(db_user_session)
     db.commit()
     db.refresh(db_user_session)
     return db_user_session
 
 
-def get_user_session(db: Session, token: str) -> UserSession:
-    return db.query(UserSession).filter(UserSession.token == token).first()
+def get_user_session(db: Session, token: str) -> Optional[UserSession]:
+    token_hash = auth.hash_token(token)
+    cached = auth.session_cache.get(token_hash)
+    if cached is not MISSING:
+        session_id, user_id = cached
+        return UserSession(id=session_id, token=token, user_id=user_id)
+
+    db_user_session = (
+        db.query(UserSession).filter(UserSession.token_hash == token_hash).first()
+    )
+    if db_user_session is not None:
+        auth.session_cache.set(
+            token_hash, (db_user_session.id, db_user_session.user_id)
+        )
+    return db_user_session
+
+
+def get_orders(db: Session, **filters) -> list:
+    orders, _ = get_orders_page(db, **filters)
+    return orders
+
+
+def _order_source(include_archived: bool):
+    return ALL_ORDERS if include_archived else Order
+
+
+# Trigram indexes can't answer a LIKE on anything shorter.
+SEARCH_MIN_WORD_LENGTH = 3
+
+
+def _items_filters(description, q: str) -> list:
+    # Every word has to appear in some item. A LIKE on the lowercased item
+    # text is what the trigram indexes answer.
+    items_text = func.lower(order_items_text(description))
+    filters = []
+    for word in q.lower().split():
+        word = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        filters.append(items_text.like(f"%{word}%", escape="\\"))
+    return filters
 
 
-def get_orders(
+def _orders_query(
     db: Session,
+    source,
+    entities: list,
     category: OrderCategory = None,
     valid_since: datetime = None,
     valid_until: datetime = None,
     status: OrderStatus = None,
     senior_id: int = None,
     volunteer_id: int = None,
-    skip: int = 0,
-    limit: int = 100,
-    sort_by: str = None,
-    sort_direction: str = "asc",
     latitude: str = None,
     longitude: str = None,
-) -> list:
-    if latitude is None and longitude is None:
-        query = db.query(Order)
-    else:
-        query = db.query(Order).join(User, Order.senior_id == User.id)
+    radius_km: float = None,
+    q: str = None,
+    ids: list[int] = None,
+):
+    query = db.query(*entities).select_from(source)
+    if latitude is not None or longitude is not None:
+        query = query.join(User, source.senior_id == User.id)
 
     if category:
-        query = query.filter(Order.category == category)
+        query = query.filter(source.category == category)
     if valid_since:
-        query = query.filter(Order.valid_since >= valid_since)
+        query = query.filter(source.valid_since >= valid_since)
     if valid_until:
-        query = query.filter(Order.valid_until <= valid_until)
+        query = query.filter(source.valid_until <= valid_until)
     if status:
-        query = query.filter(Order.status == status)
+        query = query.filter(source.status == status)
     if senior_id:
-        query = query.filter(Order.senior_id == senior_id)
+        query = query.filter(source.senior_id == senior_id)
     if volunteer_id:
-        query = query.filter(Order.volunteer_id == volunteer_id)
+        query = query.filter(source.volunteer_id == volunteer_id)
+    if q:
+        query = query.filter(*_items_filters(source.description, q))
+    if ids is not None:
+        query = query.filter(source.id.in_(ids))
 
+    distance = None
     if latitude is not None and longitude is not None:
-        latitude = float(latitude) if latitude else None
-        longitude = float(longitude) if longitude else None
-
-        distance = (
-            func.acos(
-                func.sin(func.radians(latitude)) * func.sin(func.radians(User.latitude))
-                + func.cos(func.radians(latitude))
-                * func.cos(func.radians(User.latitude))
-                * func.cos(func.radians(User.longitude) - func.radians(longitude))
-            )
-            * 6371
-        )  # Radius of Earth in kilometers
+        latitude = float(latitude) if latitude != "" else None
+        longitude = float(longitude) if longitude != "" else None
+
+        # Ranking key, not kilometres: 1 - dot product of unit vectors.
+        # Callers convert the returned page with geo.key_to_km.
+        x, y, z = geo.unit_vector(latitude, longitude) or (None, None, None)
+        distance = 1 - (User.unit_x * x + User.unit_y * y + User.unit_z * z)
         query = query.add_columns(distance.label("distance"))
 
-    if sort_by:
-        if sort_by == "distance" and latitude is not None and longitude is not None:
-            if sort_direction == "desc":
-                query = query.order_by(distance.desc())
-            else:
-                query = query.order_by(distance.asc())
-        else:
-            if sort_direction == "desc":
-                query = query.order_by(getattr(Order, sort_by).desc())
-            else:
-                query = query.order_by(getattr(Order, sort_by).asc())
+        if radius_km is not None:
+            # Narrow candidates with the indexed grid cells and a bounding box
+            # before the exact distance has to be computed.
+            min_lat, max_lat, min_lon, max_lon = geo.bounding_box(
+                latitude, longitude, radius_km
+            )
+            query = query.filter(
+                User.grid_lat.between(geo.grid_cell(min_lat), geo.grid_cell(max_lat)),
+                User.latitude.between(min_lat, max_lat),
+            )
+            if min_lon is not None:
+                query = query.filter(
+                    User.grid_lon.between(
+                        geo.grid_cell(min_lon), geo.grid_cell(max_lon)
+                    ),
+                    User.longitude.between(min_lon, max_lon),
+                )
+            query = query.filter(distance <= geo.distance_key(radius_km))
 
-    results = query.offset(skip).limit(limit).all()
+    return query, distance
 
-    if latitude is None or longitude is None:
-        return results
 
-    orders_with_distance = []
-    for result in results:
-        order = result[0]
-        order_dict = order.__dict__
-        if len(result) > 1:
-            order_dict["distance"] = result[1]
-        orders_with_distance.append(order_dict)
+def _sort_key(source, sort_by: Optional[str], distance) -> tuple:
+    if not sort_by:
+        return None, None
+    if sort_by == "distance" and distance is not None:
+        return distance, float
+    sort_key = getattr(source, sort_by)
+    return sort_key, sort_key.type.python_type
 
-    return orders_with_distance
+
+def get_orders_page(
+    db: Session,
+    category: OrderCategory = None,
+    valid_since: datetime = None,
+    valid_until: datetime = None,
+    status: OrderStatus = None,
+    senior_id: int = None,
+    volunteer_id: int = None,
+    skip: int = 0,
+    limit: int = 100,
+    sort_by: str = None,
+    sort_direction: str = "asc",
+    latitude: str = None,
+    longitude: str = None,
+    radius_km: float = None,
+    cursor: str = None,
+    include_archived: bool = False,
+    q: str = None,
+    ids: list[int] = None,
+) -> tuple[list, Optional[str]]:
+    source = _order_source(include_archived)
+    columns = ORDER_COLUMNS
+    if include_archived:
+        columns = [getattr(source, name) for name in schemas.Order.model_fields]
+    query, distance = _orders_query(
+        db,
+        source,
+        columns,
+        category=category,
+        valid_since=valid_since,
+        valid_until=valid_until,
+        status=status,
+        senior_id=senior_id,
+        volunteer_id=volunteer_id,
+        latitude=latitude,
+        longitude=longitude,
+        radius_km=radius_km,
+        q=q,
+        ids=ids,
+    )
+    sort_key, sort_type = _sort_key(source, sort_by, distance)
+    descending = sort_direction == "desc"
+
+    if sort_key is not None:
+        query = query.order_by(*pagination.order_by(sort_key, source.id, descending))
+    elif cursor is not None:
+        query = query.order_by(source.id.asc())
+
+    if cursor is None:
+        query = query.offset(skip).limit(limit)
+    else:
+        # Keyset mode: continue after the (sort key, id) of the previous page
+        # instead of counting past skipped rows.
+        if cursor and sort_key is None:
+            _, last_id = pagination.decode_cursor(cursor, sort_by)
+            query = query.filter(source.id > last_id)
+        elif cursor:
+            key, last_id = pagination.decode_cursor(cursor, sort_by, sort_type)
+            query = query.filter(
+                pagination.keyset_filter(sort_key, source.id, key, last_id, descending)
+            )
+        query = query.limit(limit + 1)
+
+    orders = [row._asdict() for row in query]
+    next_cursor = None
+    if cursor is not None and len(orders) > limit:
+        orders = orders[:limit]
+        last = orders[-1]
+        if sort_key is not None and sort_key is distance:
+            key = last["distance"]
+        else:
+            key = last[sort_by] if sort_by else None
+        next_cursor = pagination.encode_cursor(sort_by, key, last["id"])
+    if distance is not None:
+        for order in orders:
+            order["distance"] = geo.key_to_km(order["distance"])
+    return orders, next_cursor
+
+
+def count_orders(db: Session, **filters) -> tuple[Optional[int], bool]:
+    # Returns (total, exact). Filters the counters can't answer get the
+    # planner's estimate on Postgres and a COUNT elsewhere.
+    if order_counts.countable(**filters):
+        return order_counts.exact_total(db, **filters), True
+    include_archived = filters.pop("include_archived", False)
+    source = _order_source(include_archived)
+    query, _ = _orders_query(db, source, [source.id], **filters)
+    total = order_counts.estimated_total(db, query.statement)
+    if total is not None:
+        return total, False
+    return query.order_by(None).count(), True
+
+
+def iter_orders(
+    db: Session,
+    fields: list[str],
+    sort_by: str = None,
+    sort_direction: str = "asc",
+    include_archived: bool = False,
+    **filters,
+) -> Iterator[dict]:
+    source = _order_source(include_archived)
+    columns = [getattr(source, field) for field in fields]
+    query, distance = _orders_query(db, source, columns, **filters)
+    sort_key, _ = _sort_key(source, sort_by, distance)
+    if sort_key is not None:
+        query = query.order_by(
+            *pagination.order_by(sort_key, source.id, sort_direction == "desc")
+        )
+    # yield_per streams rows through a server-side cursor in fixed-size
+    # batches instead of loading the whole result.
+    for row in query.yield_per(EXPORT_BATCH_SIZE):
+        row = row._asdict()
+        if distance is not None:
+            row["distance"] = geo.key_to_km(row["distance"])
+        yield row
+
+
+def get_order(db: Session, order_id: int) -> Optional[Union[Order, ArchivedOrder]]:
+    db_order = db.query(Order).filter(Order.id == order_id).first()
+    if db_order is None:
+        db_order = db.query(ArchivedOrder).filter(ArchivedOrder.id == order_id).first()
+    return db_order
 
 
-def get_order(db: Session, order_id: int) -> Optional[Type[Order]]:
-    return db.query(Order).filter(Order.id == order_id).first()
+def get_order_expanded(db: Session, order_id: int, expand: list[str]) -> Optional[dict]:
+    # Each expanded relationship is loaded by one more SELECT ... IN.
+    for model in (Order, ArchivedOrder):
+        db_order = db.scalars(
+            select(model)
+            .where(model.id == order_id)
+            .options(*(selectinload(getattr(model, name)) for name in expand))
+        ).first()
+        if db_order is not None:
+            order = schemas.Order.model_validate(db_order).model_dump()
+            for name in expand:
+                user = getattr(db_order, name)
+                order[name] = (
+                    None
+                    if user is None
+                    else schemas.User.model_validate(user).model_dump()
+                )
+            return order
+    return None
+
+
+def embed_users(db: Session, orders: list[dict], expand: list[str]) -> list[dict]:
+    # The related users of a whole page come from one query, whatever its
+    # size.
+    user_ids = {order[f"{name}_id"] for order in orders for name in expand}
+    user_ids.discard(None)
+    users = {user["id"]: user for user in get_users_by_ids(db, list(user_ids))}
+    for order in orders:
+        for name in expand:
+            order[name] = users.get(order[f"{name}_id"])
+    return orders
+
+
+def get_order_entry(db: Session, order_id: int) -> Optional[tuple[str, bytes]]:
+    return order_cache.load(order_id, lambda: get_order(db, order_id))
+
+
+def _after_order_write(
+    db: Session,
+    event_type: str,
+    orders: list[dict],
+    previous: list[dict] = (),
+    archived: bool = False,
+) -> None:
+    # Runs inside the writing transaction, before its commit. `previous`
+    # holds the counted fields of updated orders before the update, and is
+    # empty when none of them changed.
+    if not orders:
+        return
+    if event_type == "created":
+        added, removed = orders, ()
+    elif event_type == "deleted":
+        added, removed = (), orders
+    else:
+        added, removed = (orders, previous) if previous else ((), ())
+    order_counts.apply(db, order_counts.changes(added, removed, archived))
+    # Cached order lists near the orders' seniors are dropped on commit; with
+    # nothing cached only in-flight queries need to be told.
+    cached = len(orders_query_cache.entries) > 0
+    if not order_events.enabled and not cached:
+        orders_query_cache.invalidate_after_commit(db, [])
+        return
+    senior_ids = {order["senior_id"] for order in orders}
+    locations = {
+        row.id: (row.latitude, row.longitude)
+        for row in db.query(User.id, User.latitude, User.longitude).filter(
+            User.id.in_(senior_ids)
+        )
+    }
+    orders_query_cache.invalidate_after_commit(
+        db, [locations.get(order["senior_id"]) for order in orders]
+    )
+    if not order_events.enabled:
+        return
+    order_events.publish(
+        db,
+        [
+            OrderEvent(
+                event_type,
+                {name: order[name] for name in schemas.Order.model_fields},
+                *locations.get(order["senior_id"], (None, None)),
+            )
+            for order in orders
+        ],
+    )
 
 
 def create_order(db: Session, order: OrderCreate) -> Order:
@@ -138,32 +565,305 @@ def create_order(db: Session, order: OrderCreate) -> Order:
     order["created_at"] = datetime.now()
     db_order = Order(**order)
     db.add(db_order)
+    db.flush()
+    _after_order_write(
+        db,
+        "created",
+        [{column.key: getattr(db_order, column.key) for column in Order.__table__.c}],
+    )
     db.commit()
     db.refresh(db_order)
     return db_order
 
 
+def bulk_create_orders(
+    db: Session,
+    orders: list[tuple[int, OrderCreate]],
+    chunk_size: int = BULK_CHUNK_SIZE,
+) -> tuple[list[tuple[int, int]], list[tuple[int, str]]]:
+    created, errors = [], []
+    created_at = datetime.now()
+    for start in range(0, len(orders), chunk_size):
+        chunk = orders[start : start + chunk_size]
+        user_ids = {order.senior_id for _, order in chunk} | {
+            order.volunteer_id for _, order in chunk if order.volunteer_id is not None
+        }
+        existing = set(db.scalars(select(User.id).where(User.id.in_(user_ids))))
+        indexes, rows = [], []
+        for index, order in chunk:
+            if order.senior_id not in existing:
+                errors.append((index, "Senior not found"))
+            elif order.volunteer_id is not None and order.volunteer_id not in existing:
+                errors.append((index, "Volunteer not found"))
+            else:
+                indexes.append(index)
+                rows.append({**order.model_dump(), "created_at": created_at})
+        if rows:
+            ids = list(
+                db.scalars(
+                    insert(Order).returning(Order.id, sort_by_parameter_order=True),
+                    rows,
+                )
+            )
+            created.extend(zip(indexes, ids))
+            _after_order_write(
+                db,
+                "created",
+                [{**row, "id": order_id} for row, order_id in zip(rows, ids)],
+            )
+    db.commit()
+    return created, errors
+
+
 def update_order(
-    db: Session, order_update: OrderUpdate, db_order: Type[Order]
-) -> Type[Order]:
-    update_data = order_update.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_order, key, value)
+    db: Session, order_id: int, order_update: OrderUpdate
+) -> Optional[dict]:
+    values = order_update.model_dump(exclude_unset=True)
+    previous = []
+    if set(values) & set(order_counts.COUNTED_FIELDS):
+        # Locked so that concurrent updates count from each other's result.
+        previous = (
+            db.execute(
+                select(
+                    *(getattr(Order, field) for field in order_counts.COUNTED_FIELDS)
+                )
+                .where(Order.id == order_id)
+                .with_for_update()
+            )
+            .mappings()
+            .all()
+        )
+    db_order = _update_returning(db, Order.__table__, order_id, values)
+    if db_order is None and db.get(ArchivedOrder, order_id) is not None:
+        raise HTTPException(status_code=409, detail="Archived orders are read-only")
+    if "senior_id" in values:
+        # The order moved along with its senior; its old area is unknown here.
+        orders_query_cache.invalidate_after_commit(db, None)
+    if db_order is not None and values:
+        _after_order_write(db, "updated", [db_order], previous)
     db.commit()
-    db.refresh(db_order)
+    order_cache.invalidate(order_id)
     return db_order
 
 
+def _transition(
+    db: Session,
+    order_id: int,
+    status: OrderStatus,
+    values: dict,
+    *conditions,
+    previous: dict = None,
+) -> Optional[dict]:
+    # A single conditional UPDATE: of two concurrent transitions out of the
+    # same state only one still matches, and the other finds no row instead
+    # of overwriting the first. `previous` holds what `conditions` imply the
+    # changed fields were.
+    table = Order.__table__
+    row = (
+        db.execute(
+            update(table)
+            .where(table.c.id == order_id, table.c.status == status, *conditions)
+            .values(values)
+            .returning(*table.c)
+        )
+        .mappings()
+        .first()
+    )
+    if row is None:
+        return None
+    order = dict(row)
+    _after_order_write(
+        db, "updated", [order], [{**order, "status": status, **(previous or {})}]
+    )
+    db.commit()
+    order_cache.invalidate(order_id)
+    return order
+
+
+def _current_state(db: Session, order_id: int):
+    # Only read after a transition failed, to say why.
+    for model in (Order, ArchivedOrder):
+        row = db.execute(
+            select(model.status, model.volunteer_id).where(model.id == order_id)
+        ).first()
+        if row is not None:
+            return row
+    return None
+
+
+def accept_order(db: Session, order_id: int, volunteer_id: int) -> Optional[dict]:
+    is_volunteer = exists().where(
+        User.id == volunteer_id, User.type == UserType.VOLUNTEER
+    )
+    db_order = _transition(
+        db,
+        order_id,
+        OrderStatus.PENDING,
+        {"status": OrderStatus.ACCEPTED, "volunteer_id": volunteer_id},
+        Order.__table__.c.volunteer_id.is_(None),
+        is_volunteer,
+        previous={"volunteer_id": None},
+    )
+    if db_order is not None:
+        return db_order
+    current = _current_state(db, order_id)
+    if current is None:
+        return None
+    if current.status == OrderStatus.PENDING and current.volunteer_id is None:
+        raise HTTPException(status_code=404, detail="Volunteer not found")
+    if current.volunteer_id is not None:
+        raise HTTPException(status_code=409, detail="Order already taken")
+    raise HTTPException(status_code=409, detail=f"Order is {current.status.value}")
+
+
+def complete_order(db: Session, order_id: int) -> Optional[dict]:
+    db_order = _transition(
+        db, order_id, OrderStatus.ACCEPTED, {"status": OrderStatus.COMPLETED}
+    )
+    if db_order is not None:
+        return db_order
+    current = _current_state(db, order_id)
+    if current is None:
+        return None
+    raise HTTPException(status_code=409, detail=f"Order is {current.status.value}")
+
+
+def cancel_order(db: Session, order_id: int) -> Optional[dict]:
+    # Tried from each open state in turn; an order accepted between the two
+    # statements is still cancelled by the second.
+    for status in (OrderStatus.PENDING, OrderStatus.ACCEPTED):
+        db_order = _transition(db, order_id, status, {"status": OrderStatus.CANCELLED})
+        if db_order is not None:
+            return db_order
+    current = _current_state(db, order_id)
+    if current is None:
+        return None
+    raise HTTPException(status_code=409, detail=f"Order is {current.status.value}")
+
+
+def delete_order(db: Session, order_id: int) -> Optional[dict]:
+    db_order = _delete_returning(db, Order.__table__, order_id)
+    archived = db_order is None
+    if archived:
+        db_order = _delete_returning(db, ArchivedOrder.__table__, order_id)
+    if db_order is not None:
+        _after_order_write(db, "deleted", [db_order], archived=archived)
+    db.commit()
+    order_cache.invalidate(order_id)
+    return db_order
+
+
+def expire_orders_batch(db: Session, now: datetime, batch_size: int) -> list[dict]:
+    # Pending and accepted orders past valid_until become EXPIRED, up to
+    # batch_size in one short transaction. Returns their counted fields from
+    # before. SKIP LOCKED leaves orders being updated for the next batch.
+    table = Order.__table__
+    previous = (
+        db.execute(
+            select(*(table.c[field] for field in order_counts.COUNTED_FIELDS))
+            .where(
+                table.c.status.in_((OrderStatus.PENDING, OrderStatus.ACCEPTED)),
+                table.c.valid_until < now,
+            )
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        .mappings()
+        .all()
+    )
+    if not previous:
+        return []
+    orders = [
+        dict(row)
+        for row in db.execute(
+            update(table)
+            .where(table.c.id.in_([row["id"] for row in previous]))
+            .values(status=OrderStatus.EXPIRED)
+            .returning(*table.c)
+        ).mappings()
+    ]
+    _after_order_write(db, "updated", orders, previous)
+    db.commit()
+    for order in orders:
+        order_cache.invalidate(order["id"])
+    return previous
+
+
+def get_users_pending_geocoding(db: Session) -> list[tuple[int, str]]:
+    return (
+        db.query(User.id, User.address)
+        .filter(User.geocode_status == GeocodeStatus.PENDING)
+        .order_by(User.id)
+        .all()
+    )
+
+
+def set_geocoded_coordinates(
+    db: Session, results: dict[int, tuple[Optional[tuple], GeocodeStatus]]
+) -> None:
+    if not results:
+        return
+    for db_user in db.query(User).filter(User.id.in_(results)):
+        coordinates, geocode_status = results[db_user.id]
+        if coordinates is not None:
+            db_user.latitude, db_user.longitude = coordinates
+            for key, value in geo.location_columns(*coordinates).items():
+                setattr(db_user, key, value)
+        db_user.geocode_status = geocode_status
+    db.commit()
+    for user_id in results:
+        user_cache.invalidate(user_id)
+    orders_query_cache.invalidate()
+
+
 def register_user(db: Session, request: RegisterRequest) -> User:
-    db_user = create_user(db, request.to_user_create())
+    if get_user_session(db, request.token) is not None:
+        raise HTTPException(status_code=400, detail="Session token already registered")
+    # The user is stored right away; addresses not already in the in-memory
+    # geocode cache are resolved by the background geocoding queue.
+    coordinates = None
+    geocode_status = None
+    if request.address:
+        coordinates = geocoding.cached(request.address)
+        if coordinates is MISSING:
+            coordinates = None
+            geocode_status = GeocodeStatus.PENDING
+        elif coordinates is None:
+            geocode_status = GeocodeStatus.FAILED
+        else:
+            geocode_status = GeocodeStatus.DONE
+    db_user = create_user(
+        db, request.to_user_create(coordinates), geocode_status=geocode_status
+    )
     user_session = CreateUserSession(user_id=db_user.id, token=request.token)
     create_user_session(db, user_session)
     return db_user
 
 
 def login_user(db: Session, request: LoginRequest) -> Type[User]:
-    db_user = get_user_by_phone_number(db, request.phone_number)
-    user_session = get_user_session(db, request.token)
-    if db_user is None or user_session is None or user_session.user_id != db_user.id:
+    token_hash = auth.hash_token(request.token)
+    cached = auth.session_cache.get(token_hash)
+    if cached is not MISSING:
+        _, user_id = cached
+        db_user = (
+            db.query(User)
+            .filter(User.id == user_id, User.phone_number == request.phone_number)
+            .first()
+        )
+    else:
+        result = (
+            db.query(User, UserSession.id)
+            .join(UserSession, UserSession.user_id == User.id)
+            .filter(
+                User.phone_number == request.phone_number,
+                UserSession.token_hash == token_hash,
+            )
+            .first()
+        )
+        db_user = None
+        if result is not None:
+            db_user, session_id = result
+            auth.session_cache.set(token_hash, (session_id, db_user.id))
+    if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
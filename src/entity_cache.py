@@ -0,0 +1,67 @@
+import hashlib
+import os
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+from pydantic import BaseModel
+
+from src import schemas
+from src.cache import TTLCache
+
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "10000"))
+# Invalidation only reaches the process that handled the write; other
+# workers may serve a stale entity for at most this long.
+ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL", "30"))
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in tags
+
+
+class EntityCache:
+    # Caches the serialized response body and its ETag per entity id.
+    def __init__(self, name: str, schema: type[BaseModel]):
+        self.schema = schema
+        self.entries = TTLCache(name, ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL)
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        return self.entries.get(key)
+
+    def load(
+        self, key: Hashable, fetch: Callable[[], Any]
+    ) -> Optional[tuple[str, bytes]]:
+        # A write that commits while the row is being read bumps the
+        # generation, so the possibly stale row is returned but not cached.
+        generation = self.generation
+        row = fetch()
+        if row is None:
+            return None
+        body = self.schema.model_validate(row).model_dump_json().encode()
+        entry = (make_etag(body), body)
+        with self._lock:
+            if generation == self.generation:
+                self.entries.set(key, entry)
+        return entry
+
+    def invalidate(self, key: Hashable = None) -> None:
+        with self._lock:
+            self.generation += 1
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key)
+
+
+user_cache = EntityCache("users", schemas.User)
+order_cache = EntityCache("orders", schemas.Order)
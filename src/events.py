@@ -0,0 +1,300 @@
+import asyncio
+import enum
+import os
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Optional
+
+import orjson
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from src import database, geo, metrics
+from src.models import OrderCategory, OrderStatus
+
+ORDER_EVENTS_BACKEND = os.getenv(
+    "ORDER_EVENTS_BACKEND",
+    "postgres" if database.engine.dialect.name == "postgresql" else "memory",
+)
+ORDER_EVENTS_CHANNEL = os.getenv("ORDER_EVENTS_CHANNEL", "order_events")
+ORDER_EVENTS_QUEUE_SIZE = int(os.getenv("ORDER_EVENTS_QUEUE_SIZE", "100"))
+# Backoff between attempts to reopen a dropped LISTEN connection.
+ORDER_EVENTS_RECONNECT_DELAY = float(os.getenv("ORDER_EVENTS_RECONNECT_DELAY", "0.5"))
+ORDER_EVENTS_RECONNECT_MAX_DELAY = float(
+    os.getenv("ORDER_EVENTS_RECONNECT_MAX_DELAY", "30")
+)
+# NOTIFY payloads are limited to 8000 bytes.
+NOTIFY_PAYLOAD_LIMIT = 7900
+NOTIFY_FIELDS = ("id", "category", "status", "senior_id", "volunteer_id")
+
+RESYNC_FRAME = "event: resync\ndata: {}\n\n"
+
+_PENDING = "pending_order_events"
+
+
+def _plain(value):
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+@dataclass
+class OrderEvent:
+    type: str
+    order: dict
+    # Coordinates of the order's senior, for location filters.
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+    @cached_property
+    def frame(self) -> str:
+        # Rendered once and shared by every subscriber that receives it.
+        return f"event: {self.type}\ndata: {orjson.dumps(self.order).decode()}\n\n"
+
+    def notify_payload(self) -> str:
+        payload = orjson.dumps(
+            {
+                "type": self.type,
+                "order": self.order,
+                "latitude": self.latitude,
+                "longitude": self.longitude,
+            }
+        )
+        if len(payload) > NOTIFY_PAYLOAD_LIMIT:
+            # Large descriptions don't fit; subscribers get the identifying
+            # fields and refetch the order.
+            order = {key: self.order[key] for key in NOTIFY_FIELDS}
+            payload = orjson.dumps(
+                {
+                    "type": self.type,
+                    "order": order,
+                    "latitude": self.latitude,
+                    "longitude": self.longitude,
+                }
+            )
+        return payload.decode()
+
+
+@dataclass
+class OrderEventFilter:
+    category: Optional[OrderCategory] = None
+    status: Optional[OrderStatus] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius_km: Optional[float] = None
+
+    def matches(self, order_event: OrderEvent) -> bool:
+        order = order_event.order
+        if self.category is not None and _plain(order["category"]) != (
+            self.category.value
+        ):
+            return False
+        # Updates and deletes pass the status filter so clients see orders
+        # leave it, e.g. a pending order being accepted.
+        if (
+            self.status is not None
+            and order_event.type == "created"
+            and _plain(order["status"]) != self.status.value
+        ):
+            return False
+        if (
+            self.radius_km is not None
+            and self.latitude is not None
+            and self.longitude is not None
+        ):
+            if order_event.latitude is None or order_event.longitude is None:
+                return False
+            distance = geo.distance_km(
+                self.latitude,
+                self.longitude,
+                order_event.latitude,
+                order_event.longitude,
+            )
+            if distance > self.radius_km:
+                return False
+        return True
+
+
+class Subscription:
+    def __init__(self, order_filter: OrderEventFilter, maxsize: int):
+        self.filter = order_filter
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def offer(self, frame: str) -> None:
+        # A slow client never holds up the broker: its backlog is replaced by
+        # a resync event telling it to refetch, and delivery continues.
+        if self.queue.full():
+            self.resync()
+        self.queue.put_nowait(frame)
+
+    def resync(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.dropped += 1
+            metrics.inc("order_events_dropped_total")
+        self.queue.put_nowait(RESYNC_FRAME)
+
+
+class MemoryBackend:
+    # Delivers events committed by this process only.
+    always_publish = False
+
+    async def start(self, broker: "OrderEventBroker") -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def publish(self, db: Session, events: list[OrderEvent]) -> None:
+        db.info.setdefault(_PENDING, []).extend(events)
+
+
+class PostgresBackend:
+    # Events are sent with NOTIFY inside the writing transaction, so they
+    # reach every process's broker exactly when the write commits.
+    always_publish = True
+
+    def __init__(self, url: str, channel: str):
+        self.dsn = make_url(url).set(drivername="postgresql")
+        self.channel = channel
+        self.connection = None
+        self.closed: Optional[asyncio.Event] = None
+        self.broker = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self, broker: "OrderEventBroker") -> None:
+        self.broker = broker
+        await self._connect()
+        self.task = asyncio.create_task(self._reconnect())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        closed = asyncio.Event()
+        connection = await asyncpg.connect(
+            self.dsn.render_as_string(hide_password=False)
+        )
+        connection.add_termination_listener(lambda connection: closed.set())
+        try:
+            await connection.add_listener(self.channel, self._on_notify)
+        except BaseException:
+            connection.terminate()
+            raise
+        self.connection, self.closed = connection, closed
+
+    async def _reconnect(self) -> None:
+        import asyncpg
+
+        # Runs for as long as the backend does: whenever the LISTEN connection
+        # drops, it is reopened with exponential backoff. Notifications sent
+        # in between are lost, so subscribers are then told to resync.
+        while True:
+            await self.closed.wait()
+            self.connection = None
+            delay = ORDER_EVENTS_RECONNECT_DELAY
+            while self.connection is None:
+                await asyncio.sleep(delay)
+                try:
+                    await self._connect()
+                except (
+                    OSError,
+                    asyncio.TimeoutError,
+                    asyncpg.PostgresError,
+                    asyncpg.InterfaceError,
+                ):
+                    metrics.inc("order_events_reconnect_failures_total")
+                    delay = min(delay * 2, ORDER_EVENTS_RECONNECT_MAX_DELAY)
+            metrics.inc("order_events_reconnects_total")
+            self.broker.resync()
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        self.broker.dispatch([OrderEvent(**orjson.loads(payload))])
+
+    def publish(self, db: Session, events: list[OrderEvent]) -> None:
+        db.execute(
+            text(
+                "SELECT pg_notify(:channel, payload) "
+                "FROM unnest(CAST(:payloads AS text[])) AS payload"
+            ),
+            {
+                "channel": self.channel,
+                "payloads": [order_event.notify_payload() for order_event in events],
+            },
+        )
+
+
+class OrderEventBroker:
+    def __init__(self, backend):
+        self.backend = backend
+        self.subscriptions: set[Subscription] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend.always_publish or bool(self.subscriptions)
+
+    async def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        await self.backend.start(self)
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+        self.loop = None
+
+    def subscribe(self, order_filter: OrderEventFilter) -> Subscription:
+        subscription = Subscription(order_filter, ORDER_EVENTS_QUEUE_SIZE)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscriptions.discard(subscription)
+
+    def publish(self, db: Session, events: list[OrderEvent]) -> None:
+        self.backend.publish(db, events)
+
+    def deliver(self, events: list[OrderEvent]) -> None:
+        # Called from threadpool workers as well as the event loop.
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.dispatch, events)
+
+    def resync(self) -> None:
+        for subscription in list(self.subscriptions):
+            subscription.resync()
+
+    def dispatch(self, events: list[OrderEvent]) -> None:
+        for order_event in events:
+            for subscription in list(self.subscriptions):
+                if subscription.filter.matches(order_event):
+                    subscription.offer(order_event.frame)
+
+
+if ORDER_EVENTS_BACKEND == "postgres":
+    order_events = OrderEventBroker(
+        PostgresBackend(database.DATABASE_URL, ORDER_EVENTS_CHANNEL)
+    )
+else:
+    order_events = OrderEventBroker(MemoryBackend())
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_pending(session: Session) -> None:
+    events = session.info.pop(_PENDING, None)
+    if events:
+        order_events.deliver(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
@@ -0,0 +1,45 @@
+import argparse
+import os
+import sys
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from src import crud, database, metrics
+from src.jobs import PeriodicJob
+
+# Seconds between expiry sweeps in each API process; 0 switches it off.
+EXPIRY_INTERVAL = float(os.getenv("EXPIRY_INTERVAL", "60"))
+EXPIRY_BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", "1000"))
+
+
+def expire_orders(
+    batch_size: int = EXPIRY_BATCH_SIZE, now: Optional[datetime] = None
+) -> int:
+    now = now or datetime.now()
+    total = 0
+    with database.SessionLocal() as db:
+        while True:
+            expired = crud.expire_orders_batch(db, now, batch_size)
+            for status, count in Counter(row["status"] for row in expired).items():
+                metrics.inc("orders_expired_total", count, status=status.value)
+            total += len(expired)
+            if len(expired) < batch_size:
+                return total
+
+
+expiry_job = PeriodicJob("order-expiry", EXPIRY_INTERVAL, expire_orders)
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.expiry",
+        description="Mark pending and accepted orders past valid_until as expired.",
+    )
+    parser.add_argument("--batch-size", type=int, default=EXPIRY_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    print(expire_orders(args.batch_size))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,49 @@
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def chunks(lines: Iterable[str], size: int) -> Iterator[str]:
+    # StreamingResponse pulls each item from a sync iterator through the
+    # threadpool and sends it as its own message; per line that costs more
+    # than encoding the row.
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield "".join(chunk)
+            chunk.clear()
+    if chunk:
+        yield "".join(chunk)
+
+
+def ndjson_lines(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps({key: _value(value) for key, value in row.items()}) + "\n"
+
+
+def csv_lines(rows: Iterable[dict], fields: list[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(
+            {
+                key: json.dumps(value) if isinstance(value, dict) else _value(value)
+                for key, value in row.items()
+            }
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
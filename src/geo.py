@@ -0,0 +1,80 @@
+import math
+from typing import Optional
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Size of a grid cell in degrees (~11 km of latitude). Changing it requires
+# recomputing users.grid_lat / users.grid_lon for every row.
+GRID_CELL_DEGREES = 0.1
+
+
+def grid_cell(degrees: Optional[float]) -> Optional[int]:
+    if degrees is None:
+        return None
+    return math.floor(degrees / GRID_CELL_DEGREES)
+
+
+def grid_columns(latitude: Optional[float], longitude: Optional[float]) -> dict:
+    return {"grid_lat": grid_cell(latitude), "grid_lon": grid_cell(longitude)}
+
+
+def unit_vector(
+    latitude: Optional[float], longitude: Optional[float]
+) -> Optional[tuple[float, float, float]]:
+    if latitude is None or longitude is None:
+        return None
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)
+
+
+def location_columns(latitude: Optional[float], longitude: Optional[float]) -> dict:
+    # Everything users store alongside latitude/longitude.
+    x, y, z = unit_vector(latitude, longitude) or (None, None, None)
+    return {**grid_columns(latitude, longitude), "unit_x": x, "unit_y": y, "unit_z": z}
+
+
+# Distance queries rank by 1 - (dot product of unit vectors), which grows
+# with distance and needs no trigonometry per row.
+def distance_key(radius_km: float) -> float:
+    return 1 - math.cos(min(radius_km / EARTH_RADIUS_KM, math.pi))
+
+
+def key_to_km(key: Optional[float]) -> Optional[float]:
+    if key is None:
+        return None
+    return EARTH_RADIUS_KM * math.acos(min(max(1 - key, -1.0), 1.0))
+
+
+def bounding_box(
+    latitude: float, longitude: float, radius_km: float
+) -> tuple[float, float, Optional[float], Optional[float]]:
+    # Longitude bounds are None when the box touches a pole or crosses the
+    # antimeridian; only latitude can narrow the search then.
+    lat_delta = radius_km / KM_PER_DEGREE
+    min_lat = max(latitude - lat_delta, -90.0)
+    max_lat = min(latitude + lat_delta, 90.0)
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, max_lat, None, None
+
+    # Degrees of longitude shrink towards the poles, so size the box for the
+    # edge closest to one.
+    lon_delta = lat_delta / math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    min_lon = longitude - lon_delta
+    max_lon = longitude + lon_delta
+    if min_lon < -180.0 or max_lon > 180.0:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def distance_km(
+    latitude: float, longitude: float, other_latitude: float, other_longitude: float
+) -> float:
+    lat1, lat2 = math.radians(latitude), math.radians(other_latitude)
+    half_dlat = (lat2 - lat1) / 2
+    half_dlon = math.radians(other_longitude - longitude) / 2
+    a = (
+        math.sin(half_dlat) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin(half_dlon) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(math.sqrt(a), 1.0))
@@ -0,0 +1,90 @@
+import os
+import re
+import unicodedata
+from datetime import datetime
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src import metrics
+from src.cache import MISSING, TTLCache
+from src.models import GeocodeCache
+
+GEOCODE_URL = os.getenv("GEOCODE_URL", "https://geocode.maps.co/search")
+GEOCODE_CONNECT_TIMEOUT = float(os.getenv("GEOCODE_CONNECT_TIMEOUT", "3"))
+GEOCODE_READ_TIMEOUT = float(os.getenv("GEOCODE_READ_TIMEOUT", "10"))
+GEOCODE_POOL_SIZE = int(os.getenv("GEOCODE_POOL_SIZE", "10"))
+
+memory_cache = TTLCache(
+    "geocode",
+    maxsize=int(os.getenv("GEOCODE_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("GEOCODE_CACHE_TTL", "86400")),
+)
+
+http = requests.Session()
+_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=GEOCODE_POOL_SIZE)
+http.mount("https://", _adapter)
+http.mount("http://", _adapter)
+
+
+def normalize_address(address: str) -> str:
+    address = unicodedata.normalize("NFKC", address).casefold()
+    address = re.sub(r"\s*,\s*", ", ", address)
+    return " ".join(address.split()).strip(" ,")
+
+
+def cached(address: str) -> Any:
+    # Memory-only check that never blocks; returns MISSING when unknown.
+    return memory_cache.get(normalize_address(address))
+
+
+def lookup(address: str) -> Optional[tuple[float, float]]:
+    response = http.get(
+        GEOCODE_URL,
+        params={"q": address, "api_key": os.getenv("GEOCODE_API_KEY")},
+        timeout=(GEOCODE_CONNECT_TIMEOUT, GEOCODE_READ_TIMEOUT),
+    )
+    response.raise_for_status()
+    results = response.json()
+    if not results:
+        return None
+    return float(results[0]["lat"]), float(results[0]["lon"])
+
+
+def geocode(db: Session, address: str) -> Optional[tuple[float, float]]:
+    key = normalize_address(address)
+    coordinates = memory_cache.get(key)
+    if coordinates is not MISSING:
+        return coordinates
+
+    row = db.get(GeocodeCache, key)
+    if row is not None:
+        metrics.inc("geocode_db_hits_total")
+        coordinates = (row.latitude, row.longitude)
+        memory_cache.set(key, coordinates)
+        return coordinates
+
+    metrics.inc("geocode_lookups_total")
+    coordinates = lookup(address)
+    if coordinates is not None:
+        # Stored in a savepoint so a concurrent lookup of the same address
+        # doesn't fail the caller's transaction.
+        try:
+            with db.begin_nested():
+                db.add(
+                    GeocodeCache(
+                        address_key=key,
+                        latitude=coordinates[0],
+                        longitude=coordinates[1],
+                        created_at=datetime.now(),
+                    )
+                )
+        except IntegrityError:
+            pass
+    # Unknown addresses are only remembered in memory, so they are retried
+    # once the TTL passes.
+    memory_cache.set(key, coordinates)
+    return coordinates
@@ -0,0 +1,135 @@
+import logging
+import os
+import queue
+import threading
+from typing import Optional
+
+from src import crud, database, geocoding
+from src.models import GeocodeStatus
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_BATCH_SIZE = int(os.getenv("GEOCODE_BATCH_SIZE", "20"))
+GEOCODE_MAX_ATTEMPTS = int(os.getenv("GEOCODE_MAX_ATTEMPTS", "5"))
+GEOCODE_RETRY_BACKOFF = float(os.getenv("GEOCODE_RETRY_BACKOFF", "1"))
+
+
+class GeocodingQueue:
+    def __init__(
+        self,
+        batch_size: int = GEOCODE_BATCH_SIZE,
+        max_attempts: int = GEOCODE_MAX_ATTEMPTS,
+        retry_backoff: float = GEOCODE_RETRY_BACKOFF,
+    ):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._queue: queue.Queue = queue.Queue()
+        self._unfinished = 0
+        self._idle = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="geocoding-queue", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def enqueue(self, user_id: int, address: str) -> None:
+        with self._idle:
+            self._unfinished += 1
+        self._queue.put((user_id, address, 1))
+
+    def requeue_pending(self) -> int:
+        # The queue only lives in memory; users a crash or a failed write
+        # left pending are queued again on startup.
+        with database.SessionLocal() as db:
+            pending = crud.get_users_pending_geocoding(db)
+        for user_id, address in pending:
+            self.enqueue(user_id, address)
+        return len(pending)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        # Waits until every queued address, including scheduled retries, has
+        # been resolved or given up on.
+        with self._idle:
+            return self._idle.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def _done(self, count: int) -> None:
+        with self._idle:
+            self._unfinished -= count
+            self._idle.notify_all()
+
+    def _retry_later(self, job: tuple) -> None:
+        user_id, address, attempt = job
+        delay = self.retry_backoff * 2 ** (attempt - 1)
+        timer = threading.Timer(
+            delay, self._queue.put, ((user_id, address, attempt + 1),)
+        )
+        timer.daemon = True
+        timer.start()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: list[tuple]) -> None:
+        results, resolved = {}, []
+        with database.SessionLocal() as db:
+            # Users registering at the same address share one lookup.
+            lookups = {}
+            for job in batch:
+                user_id, address, attempt = job
+                key = geocoding.normalize_address(address)
+                if key not in lookups:
+                    try:
+                        lookups[key] = geocoding.geocode(db, address)
+                    except Exception as exc:
+                        db.rollback()
+                        lookups[key] = exc
+                coordinates = lookups[key]
+                if isinstance(coordinates, Exception):
+                    if attempt < self.max_attempts:
+                        self._retry_later(job)
+                        continue
+                    logger.warning("Geocoding %r failed: %s", address, coordinates)
+                    results[user_id] = (None, GeocodeStatus.FAILED)
+                elif coordinates is None:
+                    results[user_id] = (None, GeocodeStatus.FAILED)
+                else:
+                    results[user_id] = (coordinates, GeocodeStatus.DONE)
+                resolved.append(job)
+            try:
+                crud.set_geocoded_coordinates(db, results)
+            except Exception:
+                logger.exception("Storing geocoding results failed")
+                db.rollback()
+                # The lookups are cached by now, so a retry only redoes the
+                # write.
+                for job in resolved:
+                    if job[2] < self.max_attempts:
+                        self._retry_later(job)
+                resolved = [job for job in resolved if job[2] >= self.max_attempts]
+        self._done(len(resolved))
+
+
+geocoding_queue = GeocodingQueue()
@@ -1,15 +1,51 @@
+import asyncio
+import json
 import os
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Optional, Union
 
-from fastapi import Depends, FastAPI, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 from starlette.middleware.cors import CORSMiddleware
 
-from src import crud, database, schemas
-from src.models import OrderCategory, OrderStatus, UserSession
+from src import (archive, crud, database, expiry, export, matching, metrics,
+                 schemas)
+from src.cache import MISSING
+from src.entity_cache import etag_matches, order_cache, user_cache
+from src.events import OrderEventFilter, order_events
+from src.geocoding_queue import geocoding_queue
+from src.models import GeocodeStatus, OrderCategory, OrderStatus, UserSession
+from src.query_cache import orders_query_cache
 from src.schemas import CreateUserSession
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    geocoding_queue.start()
+    await run_in_threadpool(geocoding_queue.requeue_pending)
+    await order_events.start()
+    archive.archive_job.start()
+    expiry.expiry_job.start()
+    matching.matching_job.start()
+    yield
+    await run_in_threadpool(matching.matching_job.stop)
+    await run_in_threadpool(expiry.expiry_job.stop)
+    await run_in_threadpool(archive.archive_job.stop)
+    await order_events.stop()
+    await run_in_threadpool(geocoding_queue.drain, 10)
+    geocoding_queue.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+ORDER_STREAM_KEEPALIVE = float(os.getenv("ORDER_STREAM_KEEPALIVE", "15"))
+# Most ids one `?ids=` lookup accepts.
+MAX_LOOKUP_IDS = int(os.getenv("MAX_LOOKUP_IDS", "500"))
 
 
 @app.get("/")
@@ -25,68 +61,292 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if database.replicas:
+    app.add_middleware(database.ReadYourWritesMiddleware)
+
+if metrics.METRICS_ENABLED:
+    metrics.install()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    return metrics.metrics_response()
+
+
+def parse_ids(ids: Optional[str]) -> Optional[list[int]]:
+    if ids is None:
+        return None
+    try:
+        parsed = sorted({int(value) for value in ids.split(",") if value.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+    if len(parsed) > MAX_LOOKUP_IDS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_LOOKUP_IDS} ids per request"
+        )
+    return parsed
+
+
+def parse_expand(expand: Optional[str]) -> tuple[str, ...]:
+    names = set(expand.split(",")) if expand else set()
+    unknown = names - set(crud.EXPANDABLE)
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown expand: {', '.join(sorted(unknown))}"
+        )
+    return tuple(name for name in crud.EXPANDABLE if name in names)
+
+
+def check_search(q: Optional[str]) -> Optional[str]:
+    # A short word would make the item search scan every order.
+    short = [
+        word for word in (q or "").split() if len(word) < crud.SEARCH_MIN_WORD_LENGTH
+    ]
+    if short:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Search words need at least {crud.SEARCH_MIN_WORD_LENGTH} "
+            f"characters: {', '.join(short)}",
+        )
+    return q
+
+
+def check_location(
+    latitude: Optional[str], longitude: Optional[str], radius_km: Optional[float]
+) -> None:
+    # Empty coordinates are accepted and mean no location, but a radius needs
+    # one to be measured from.
+    for name, value in (("latitude", latitude), ("longitude", longitude)):
+        try:
+            if value not in (None, ""):
+                float(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"{name} must be a number")
+    if radius_km is not None and "" in (latitude or "", longitude or ""):
+        raise HTTPException(
+            status_code=400, detail="radius_km needs latitude and longitude"
+        )
+
+
+def check_sort(
+    sort_by: Optional[str], latitude: Optional[str], longitude: Optional[str]
+) -> None:
+    if sort_by == "distance" and (latitude is None or longitude is None):
+        raise HTTPException(
+            status_code=400, detail="sort_by=distance needs latitude and longitude"
+        )
+    if sort_by and sort_by != "distance" and sort_by not in crud.EXPORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort_by: {sort_by}")
+
+
+async def parse_bulk_body(
+    request: Request, model: type[BaseModel]
+) -> tuple[list[tuple[int, BaseModel]], list[schemas.BulkError]]:
+    # Accepts a JSON array or NDJSON (one object per line) and validates every
+    # row, collecting errors instead of rejecting the whole payload.
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        lines = [line for line in body.splitlines() if line.strip()]
+    else:
+        try:
+            lines = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(lines, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array")
+
+    rows, errors = [], []
+    for index, line in enumerate(lines):
+        try:
+            if isinstance(line, bytes):
+                rows.append((index, model.model_validate_json(line)))
+            else:
+                rows.append((index, model.model_validate(line)))
+        except ValidationError as exc:
+            detail = jsonable_encoder(exc.errors(include_url=False))
+            errors.append(schemas.BulkError(index=index, detail=detail))
+    return rows, errors
+
+
+def entity_response(request: Request, entry: tuple[str, bytes]) -> Response:
+    # The body is cached already serialized; a matching ETag is answered
+    # without touching it.
+    etag, body = entry
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+
+def bulk_create_result(
+    created: list[tuple[int, int]],
+    errors: list[tuple[int, str]],
+    validation_errors: list[schemas.BulkError],
+) -> schemas.BulkCreateResult:
+    errors = validation_errors + [
+        schemas.BulkError(index=index, detail=detail) for index, detail in errors
+    ]
+    return schemas.BulkCreateResult(
+        created=[schemas.BulkCreated(index=index, id=id) for index, id in created],
+        errors=sorted(errors, key=lambda error: error.index),
+    )
+
 
-@app.get("/users")
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db)):
-    users = crud.get_users(db, skip=skip, limit=limit)
+async def add_stats(db: database.AnySession, users: list[dict]) -> list[dict]:
+    stats = await database.run(
+        db, crud.get_user_stats, user_ids=[user["id"] for user in users]
+    )
+    for user in users:
+        user["stats"] = stats[user["id"]]
     return users
 
 
-@app.get("/users/{user_id}", response_model=schemas.User)
-def read_user(user_id: int, db: Session = Depends(database.get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
-    if db_user is None:
+@app.get(
+    "/users",
+    response_model=Union[
+        list[schemas.User], list[schemas.UserWithStats], schemas.UserPage
+    ],
+)
+async def read_users(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str = None,
+    with_stats: bool = False,
+    ids: str = None,
+    db: database.AnySession = Depends(database.get_read_session),
+):
+    lookup = parse_ids(ids)
+    if lookup is not None:
+        users = await database.run(db, crud.get_users_by_ids, ids=lookup)
+        if with_stats:
+            users = await add_stats(db, users)
+        return ORJSONResponse(users)
+    if cursor is not None:
+        users, next_cursor = await database.run(
+            db, crud.get_users_page, cursor=cursor, limit=limit
+        )
+        if with_stats:
+            users = await add_stats(db, users)
+        return ORJSONResponse({"items": users, "next_cursor": next_cursor})
+    users = await database.run(db, crud.get_users, skip=skip, limit=limit)
+    if with_stats:
+        users = await add_stats(db, users)
+    return ORJSONResponse(users)
+
+
+async def user_entry(db: database.AnySession, user_id: int) -> tuple[str, bytes]:
+    entry = user_cache.get(user_id)
+    if entry is MISSING:
+        entry = await database.run(db, crud.get_user_entry, user_id=user_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return db_user
+    return entry
+
+
+@app.get("/users/{user_id}", response_model=Union[schemas.User, schemas.UserWithStats])
+async def read_user(
+    user_id: int,
+    request: Request,
+    with_stats: bool = False,
+    db: database.AnySession = Depends(database.get_session),
+):
+    entry = await user_entry(db, user_id)
+    if with_stats:
+        # Counts change with every order, so these skip the cached body's
+        # ETag.
+        (user,) = await add_stats(db, [json.loads(entry[1])])
+        return ORJSONResponse(user)
+    return entity_response(request, entry)
+
+
+@app.get("/users/{user_id}/stats", response_model=schemas.UserStats)
+async def read_user_stats(
+    user_id: int, db: database.AnySession = Depends(database.get_read_session)
+):
+    if not await database.run(db, crud.user_exists, user_id=user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    stats = await database.run(db, crud.get_user_stats, user_ids=[user_id])
+    return ORJSONResponse(stats[user_id])
 
 
 @app.post("/users", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    db_user = crud.get_user_by_phone_number(db, phone_number=user.phone_number)
+async def create_user(
+    user: schemas.UserCreate, db: database.AnySession = Depends(database.get_session)
+):
+    db_user = await database.run(
+        db, crud.get_user_by_phone_number, phone_number=user.phone_number
+    )
     if db_user:
         raise HTTPException(status_code=400, detail="Phone number already registered")
-    return crud.create_user(db=db, user=user)
+    return await database.run(db, crud.create_user, user=user)
+
+
+@app.post("/users/bulk", response_model=schemas.BulkCreateResult)
+async def bulk_create_users(
+    request: Request,
+    chunk_size: int = Query(crud.BULK_CHUNK_SIZE, gt=0),
+    db: database.AnySession = Depends(database.get_session),
+):
+    users, validation_errors = await parse_bulk_body(request, schemas.UserCreate)
+    created, errors = await database.run(
+        db, crud.bulk_create_users, users=users, chunk_size=chunk_size
+    )
+    return bulk_create_result(created, errors, validation_errors)
 
 
 @app.put("/users/{user_id}", response_model=schemas.User)
-def partial_update_user(
+async def partial_update_user(
     user_id: int,
     user_update: schemas.UserUpdate,
-    db: Session = Depends(database.get_db),
+    db: database.AnySession = Depends(database.get_session),
 ):
-    db_user = crud.get_user(db, user_id=user_id)
+    db_user = await database.run(
+        db, crud.update_user, user_id=user_id, user_update=user_update
+    )
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return crud.update_user(db=db, user_update=user_update, db_user=db_user)
+    return db_user
 
 
-@app.delete("/users/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(database.get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
+@app.delete("/users/{user_id}", response_model=schemas.User)
+async def delete_user(
+    user_id: int, db: database.AnySession = Depends(database.get_session)
+):
+    db_user = await database.run(db, crud.delete_user, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    db.delete(db_user)
-    db.commit()
     return db_user
 
 
 @app.post("/user-sessions", response_model=schemas.UserSession)
-def create_user_session(
-    user_session: CreateUserSession, db: Session = Depends(database.get_db)
+async def create_user_session(
+    user_session: CreateUserSession,
+    db: database.AnySession = Depends(database.get_session),
 ) -> UserSession:
-    return crud.create_user_session(db, user_session=user_session)
+    db_user_session = await database.run(db, crud.get_user_session, user_session.token)
+    if db_user_session:
+        raise HTTPException(status_code=400, detail="Session token already registered")
+    return await database.run(db, crud.create_user_session, user_session=user_session)
 
 
 @app.get("/user-sessions", response_model=schemas.UserSession)
-def get_user_session(token: str, db: Session = Depends(database.get_db)) -> UserSession:
-    db_user_session = crud.get_user_session(db, token)
+async def get_user_session(
+    token: str, db: database.AnySession = Depends(database.get_session)
+) -> UserSession:
+    db_user_session = await database.run(db, crud.get_user_session, token)
     if db_user_session is None:
         raise HTTPException(status_code=404, detail="User session not found")
     return db_user_session
 
 
-@app.get("/orders")
-def read_orders(
+@app.get(
+    "/orders",
+    response_model=Union[
+        list[schemas.OrderWithDistance], list[schemas.OrderExpanded], schemas.OrderPage
+    ],
+)
+async def read_orders(
+    request: Request,
     category: OrderCategory = None,
     valid_since: datetime = None,
     valid_until: datetime = None,
@@ -99,71 +359,333 @@ def read_orders(
     limit: int = 100,
     latitude: str = None,
     longitude: str = None,
-    db: Session = Depends(database.get_db),
+    radius_km: float = None,
+    cursor: str = None,
+    include_archived: bool = False,
+    q: str = Query(None, min_length=3),
+    with_total: bool = False,
+    ids: str = None,
+    expand: str = None,
+    db: database.AnySession = Depends(database.get_read_session),
 ):
-    orders = crud.get_orders(
-        db,
+    expanded = parse_expand(expand)
+    check_location(latitude, longitude, radius_km)
+    check_sort(sort_by, latitude, longitude)
+    # Clients that just wrote skip the cache along with the replicas.
+    cached = orders_query_cache.enabled and not database.pinned_to_primary(request)
+    if cached:
+        latitude = orders_query_cache.snap(latitude)
+        longitude = orders_query_cache.snap(longitude)
+    filters = dict(
         category=category,
         valid_since=valid_since,
         valid_until=valid_until,
-        skip=skip,
         status=status,
         senior_id=senior_id,
         volunteer_id=volunteer_id,
-        limit=limit,
-        sort_by=sort_by,
-        sort_direction=sort_direction,
         latitude=latitude,
         longitude=longitude,
+        radius_km=radius_km,
+        include_archived=include_archived,
+        q=check_search(q),
+        ids=parse_ids(ids),
+    )
+    page = dict(
+        skip=skip,
+        limit=limit,
+        sort_by=sort_by,
+        sort_direction="desc" if sort_direction == "desc" else "asc",
+        cursor=cursor,
+    )
+
+    async def fetch() -> bytes:
+        if with_total and cursor is None:
+            # One row past the page tells whether another page follows.
+            orders, next_cursor = await database.run(
+                db, crud.get_orders_page, **filters, **{**page, "limit": limit + 1}
+            )
+            has_more = len(orders) > limit
+            orders = orders[:limit]
+        else:
+            orders, next_cursor = await database.run(
+                db, crud.get_orders_page, **filters, **page
+            )
+            has_more = next_cursor is not None
+        if expanded:
+            orders = await database.run(
+                db, crud.embed_users, orders=orders, expand=expanded
+            )
+
+        # Rows are already plain dicts in response shape, so they go straight
+        # to orjson instead of through jsonable_encoder.
+        if not with_total:
+            if cursor is not None:
+                return ORJSONResponse(
+                    {"items": orders, "next_cursor": next_cursor}
+                ).body
+            return ORJSONResponse(orders).body
+        total, total_exact = await database.run(db, crud.count_orders, **filters)
+        return ORJSONResponse(
+            {
+                "items": orders,
+                "next_cursor": next_cursor,
+                "total": total,
+                "total_exact": total_exact,
+                "has_more": has_more,
+            }
+        ).body
+
+    if not cached:
+        body = await fetch()
+    else:
+        # Embedded users may be up to the cache TTL old, like the orders.
+        key = {**filters, **page, "with_total": with_total, "expand": expanded}
+        body = await orders_query_cache.load(key, fetch)
+    return Response(body, media_type="application/json")
+
+
+@app.get("/orders/export")
+async def export_orders(
+    request: Request,
+    category: OrderCategory = None,
+    valid_since: datetime = None,
+    valid_until: datetime = None,
+    status: OrderStatus = None,
+    senior_id: int = None,
+    volunteer_id: int = None,
+    sort_by: str = None,
+    sort_direction: str = None,
+    latitude: str = None,
+    longitude: str = None,
+    radius_km: float = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: str = None,
+    include_archived: bool = False,
+    q: str = Query(None, min_length=3),
+):
+    selected = fields.split(",") if fields else crud.EXPORT_FIELDS
+    unknown = set(selected) - set(crud.EXPORT_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    # Checked before the stream starts; once the headers are sent an error
+    # can only cut the body short.
+    check_search(q)
+    check_location(latitude, longitude, radius_km)
+    check_sort(sort_by, latitude, longitude)
+    located = latitude is not None and longitude is not None
+
+    primary = database.pinned_to_primary(request)
+
+    def rows():
+        # The response outlives request dependencies, so the stream owns its
+        # session.
+        with database.read_session(primary) as db:
+            yield from crud.iter_orders(
+                db,
+                selected,
+                sort_by=sort_by,
+                sort_direction=sort_direction,
+                include_archived=include_archived,
+                category=category,
+                valid_since=valid_since,
+                valid_until=valid_until,
+                status=status,
+                senior_id=senior_id,
+                volunteer_id=volunteer_id,
+                latitude=latitude,
+                longitude=longitude,
+                radius_km=radius_km,
+                q=q,
+            )
+
+    if format == "csv":
+        header = selected
+        if located:
+            header = selected + ["distance"]
+        return StreamingResponse(
+            export.chunks(export.csv_lines(rows(), header), crud.EXPORT_BATCH_SIZE),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=orders.csv"},
+        )
+    return StreamingResponse(
+        export.chunks(export.ndjson_lines(rows()), crud.EXPORT_BATCH_SIZE),
+        media_type="application/x-ndjson",
     )
-    return orders
 
 
-@app.get("/orders/{order_id}", response_model=schemas.Order)
-def read_order(order_id: int, db: Session = Depends(database.get_db)):
-    db_order = crud.get_order(db, order_id=order_id)
-    if db_order is None:
+@app.get("/orders/matches", response_model=list[schemas.Match])
+async def read_order_matches(
+    radius_km: float = Query(
+        matching.MATCHING_MAX_RADIUS_KM, gt=0, le=matching.MATCHING_MAX_RADIUS_KM
+    ),
+    volunteer_id: int = None,
+):
+    # Served from the last matching of the background job, which runs with
+    # MATCHING_MAX_RADIUS_KM and MATCHING_CAPACITY.
+    computed_at, matches, by_volunteer = await run_in_threadpool(
+        matching.latest_matches.get
+    )
+    if volunteer_id is not None:
+        matches = by_volunteer.get(volunteer_id, [])
+    if radius_km < matching.MATCHING_MAX_RADIUS_KM:
+        matches = [match for match in matches if match["distance_km"] <= radius_km]
+    age = max(0, int(time.time() - computed_at))
+    return ORJSONResponse(matches, headers={"Age": str(age)})
+
+
+@app.get("/orders/stream")
+async def stream_orders(
+    category: OrderCategory = None,
+    status: OrderStatus = None,
+    latitude: float = None,
+    longitude: float = None,
+    radius_km: float = None,
+):
+    subscription = order_events.subscribe(
+        OrderEventFilter(category, status, latitude, longitude, radius_km)
+    )
+
+    async def frames():
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(
+                        subscription.queue.get(), ORDER_STREAM_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            order_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get(
+    "/orders/{order_id}", response_model=Union[schemas.Order, schemas.OrderExpanded]
+)
+async def read_order(
+    order_id: int,
+    request: Request,
+    expand: str = None,
+    db: database.AnySession = Depends(database.get_session),
+):
+    expanded = parse_expand(expand)
+    if expanded:
+        db_order = await database.run(
+            db, crud.get_order_expanded, order_id=order_id, expand=expanded
+        )
+        if db_order is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        return ORJSONResponse(db_order)
+    entry = order_cache.get(order_id)
+    if entry is MISSING:
+        entry = await database.run(db, crud.get_order_entry, order_id=order_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Order not found")
-    return db_order
+    return entity_response(request, entry)
 
 
 @app.put("/orders/{order_id}", response_model=schemas.Order)
-def partial_update_order(
+async def partial_update_order(
     order_id: int,
     order_update: schemas.OrderUpdate,
-    db: Session = Depends(database.get_db),
+    db: database.AnySession = Depends(database.get_session),
 ):
-    db_order = crud.get_order(db, order_id=order_id)
+    db_order = await database.run(
+        db, crud.update_order, order_id=order_id, order_update=order_update
+    )
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
-    return crud.update_order(db=db, order_update=order_update, db_order=db_order)
+    return db_order
 
 
-@app.delete("/orders/{order_id}")
-def delete_order(order_id: int, db: Session = Depends(database.get_db)):
-    db_order = crud.get_order(db, order_id=order_id)
+@app.post("/orders/{order_id}/accept", response_model=schemas.Order)
+async def accept_order(
+    order_id: int,
+    acceptance: schemas.OrderAccept,
+    db: database.AnySession = Depends(database.get_session),
+):
+    db_order = await database.run(
+        db, crud.accept_order, order_id=order_id, volunteer_id=acceptance.volunteer_id
+    )
+    if db_order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return db_order
+
+
+@app.post("/orders/{order_id}/complete", response_model=schemas.Order)
+async def complete_order(
+    order_id: int, db: database.AnySession = Depends(database.get_session)
+):
+    db_order = await database.run(db, crud.complete_order, order_id=order_id)
+    if db_order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return db_order
+
+
+@app.post("/orders/{order_id}/cancel", response_model=schemas.Order)
+async def cancel_order(
+    order_id: int, db: database.AnySession = Depends(database.get_session)
+):
+    db_order = await database.run(db, crud.cancel_order, order_id=order_id)
+    if db_order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return db_order
+
+
+@app.delete("/orders/{order_id}", response_model=schemas.Order)
+async def delete_order(
+    order_id: int, db: database.AnySession = Depends(database.get_session)
+):
+    db_order = await database.run(db, crud.delete_order, order_id=order_id)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
-    db.delete(db_order)
-    db.commit()
     return db_order
 
 
 @app.post("/orders", response_model=schemas.Order)
-def create_order(order: schemas.OrderCreate, db: Session = Depends(database.get_db)):
-    return crud.create_order(db=db, order=order)
+async def create_order(
+    order: schemas.OrderCreate, db: database.AnySession = Depends(database.get_session)
+):
+    return await database.run(db, crud.create_order, order=order)
+
+
+@app.post("/orders/bulk", response_model=schemas.BulkCreateResult)
+async def bulk_create_orders(
+    request: Request,
+    chunk_size: int = Query(crud.BULK_CHUNK_SIZE, gt=0),
+    db: database.AnySession = Depends(database.get_session),
+):
+    orders, validation_errors = await parse_bulk_body(request, schemas.OrderCreate)
+    created, errors = await database.run(
+        db, crud.bulk_create_orders, orders=orders, chunk_size=chunk_size
+    )
+    return bulk_create_result(created, errors, validation_errors)
 
 
 @app.post("/register", response_model=schemas.User)
-def register_user(
-    request: schemas.RegisterRequest, db: Session = Depends(database.get_db)
+async def register_user(
+    request: schemas.RegisterRequest,
+    db: database.AnySession = Depends(database.get_session),
 ):
-    return crud.register_user(db=db, request=request)
+    db_user = await database.run(db, crud.register_user, request=request)
+    if db_user.geocode_status == GeocodeStatus.PENDING:
+        geocoding_queue.enqueue(db_user.id, db_user.address)
+    return db_user
 
 
 @app.post("/login", response_model=schemas.User)
-def login_user(request: schemas.LoginRequest, db: Session = Depends(database.get_db)):
-    return crud.login_user(db=db, request=request)
+async def login_user(
+    request: schemas.LoginRequest,
+    db: database.AnySession = Depends(database.get_session),
+):
+    return await database.run(db, crud.login_user, request=request)
 
 
 if __name__ == "__main__":
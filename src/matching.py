@@ -0,0 +1,234 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import orjson
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from src import database, geo
+from src.jobs import PeriodicJob
+from src.models import Order, OrderStatus, User, UserType
+
+MATCHING_MAX_RADIUS_KM = float(os.getenv("MATCHING_MAX_RADIUS_KM", "10"))
+MATCHING_CAPACITY = int(os.getenv("MATCHING_CAPACITY", "1"))
+# Nearest volunteers kept per order before the greedy assignment.
+MATCHING_CANDIDATES = int(os.getenv("MATCHING_CANDIDATES", "8"))
+# Orders per distance-matrix block; memory is chunk size x volunteers in band.
+MATCHING_CHUNK_SIZE = int(os.getenv("MATCHING_CHUNK_SIZE", "512"))
+# Seconds between recomputations of the matches GET /orders/matches serves;
+# 0 switches the job off and every request computes its own.
+MATCHING_INTERVAL = float(os.getenv("MATCHING_INTERVAL", "60"))
+
+
+@dataclass
+class Points:
+    ids: np.ndarray
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: list) -> "Points":
+        data = np.array(rows, dtype=np.float64).reshape(-1, 3)
+        return cls(data[:, 0].astype(np.int64), data[:, 1], data[:, 2])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def load(db: Session, now: Optional[datetime] = None) -> tuple[Points, Points]:
+    # Unassigned pending orders valid at `now`, located at their senior, and
+    # every volunteer with coordinates.
+    now = now or datetime.now()
+    orders = (
+        db.query(Order.id, User.latitude, User.longitude)
+        .join(User, Order.senior_id == User.id)
+        .filter(
+            Order.status == OrderStatus.PENDING,
+            Order.volunteer_id.is_(None),
+            or_(Order.valid_since.is_(None), Order.valid_since <= now),
+            or_(Order.valid_until.is_(None), Order.valid_until >= now),
+            User.latitude.is_not(None),
+            User.longitude.is_not(None),
+        )
+        .all()
+    )
+    volunteers = (
+        db.query(User.id, User.latitude, User.longitude)
+        .filter(
+            User.type == UserType.VOLUNTEER,
+            User.latitude.is_not(None),
+            User.longitude.is_not(None),
+        )
+        .all()
+    )
+    return Points.from_rows(orders), Points.from_rows(volunteers)
+
+
+def unit_vectors(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    lat, lon = np.radians(latitudes), np.radians(longitudes)
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def candidates(
+    orders: Points,
+    volunteers: Points,
+    max_radius_km: float,
+    k: int = MATCHING_CANDIDATES,
+    chunk_size: int = MATCHING_CHUNK_SIZE,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Returns (distance, order index, volunteer index) of up to k volunteers
+    # within max_radius_km of each order.
+    empty = np.empty(0, dtype=np.int64)
+    if not len(orders) or not len(volunteers):
+        return np.empty(0), empty, empty
+
+    # On unit vectors the great-circle distance is R * acos(dot product), so
+    # a block of distances is one matrix product and the nearest volunteers
+    # are the largest dot products. acos is only taken for the k kept.
+    min_dot = np.cos(min(max_radius_km / geo.EARTH_RADIUS_KM, np.pi))
+    # Sorting both sides by latitude lets each chunk of orders skip the
+    # volunteers outside its latitude band.
+    order_rank = np.argsort(orders.latitudes, kind="stable")
+    volunteer_rank = np.argsort(volunteers.latitudes, kind="stable")
+    volunteer_lat = volunteers.latitudes[volunteer_rank]
+    volunteer_vectors = unit_vectors(
+        volunteer_lat, volunteers.longitudes[volunteer_rank]
+    )
+    order_vectors = unit_vectors(orders.latitudes, orders.longitudes)
+    lat_delta = max_radius_km / geo.KM_PER_DEGREE
+
+    distances, order_indexes, volunteer_indexes = [], [], []
+    for start in range(0, len(orders), chunk_size):
+        chunk = order_rank[start : start + chunk_size]
+        low, high = np.searchsorted(
+            volunteer_lat,
+            [
+                orders.latitudes[chunk[0]] - lat_delta,
+                orders.latitudes[chunk[-1]] + lat_delta,
+            ],
+        )
+        if low == high:
+            continue
+        dots = order_vectors[chunk] @ volunteer_vectors[low:high].T
+        kk = min(k, high - low)
+        nearest = np.argpartition(dots, -kk, axis=1)[:, -kk:]
+        nearest_dots = np.take_along_axis(dots, nearest, axis=1)
+        within = nearest_dots >= min_dot
+        rows = np.nonzero(within)[0]
+        distances.append(
+            geo.EARTH_RADIUS_KM * np.arccos(np.clip(nearest_dots[within], -1.0, 1.0))
+        )
+        order_indexes.append(chunk[rows])
+        volunteer_indexes.append(volunteer_rank[low + nearest[within]])
+
+    if not distances:
+        return np.empty(0), empty, empty
+    return (
+        np.concatenate(distances),
+        np.concatenate(order_indexes),
+        np.concatenate(volunteer_indexes),
+    )
+
+
+def match(
+    orders: Points,
+    volunteers: Points,
+    max_radius_km: float = MATCHING_MAX_RADIUS_KM,
+    capacity: int = MATCHING_CAPACITY,
+) -> list[dict]:
+    distance, order_index, volunteer_index = candidates(
+        orders, volunteers, max_radius_km
+    )
+    # Greedy: shortest pairs first, each order once, each volunteer up to
+    # `capacity` times.
+    order_by_distance = np.argsort(distance, kind="stable")
+    assigned = [False] * len(orders)
+    load_count = [0] * len(volunteers)
+    order_ids, volunteer_ids = orders.ids.tolist(), volunteers.ids.tolist()
+    matches = []
+    for o, v, d in zip(
+        order_index[order_by_distance].tolist(),
+        volunteer_index[order_by_distance].tolist(),
+        distance[order_by_distance].tolist(),
+    ):
+        if assigned[o] or load_count[v] >= capacity:
+            continue
+        assigned[o] = True
+        load_count[v] += 1
+        matches.append(
+            {
+                "order_id": order_ids[o],
+                "volunteer_id": volunteer_ids[v],
+                "distance_km": d,
+            }
+        )
+    return matches
+
+
+class LatestMatches:
+    # The last full matching, by volunteer. Computing one takes seconds for
+    # large areas, so requests share the job's result instead.
+    def __init__(
+        self,
+        radius_km: float = MATCHING_MAX_RADIUS_KM,
+        capacity: int = MATCHING_CAPACITY,
+    ):
+        self.radius_km = radius_km
+        self.capacity = capacity
+        # (computed at, matches, matches by volunteer), replaced as a whole.
+        self._result: Optional[tuple[float, list[dict], dict]] = None
+        self._lock = threading.Lock()
+
+    def refresh(self, if_missing: bool = False) -> tuple[float, list[dict], dict]:
+        with self._lock:
+            if if_missing and self._result is not None:
+                return self._result
+            with database.read_session() as db:
+                orders, volunteers = load(db)
+            matches = match(orders, volunteers, self.radius_km, self.capacity)
+            by_volunteer = defaultdict(list)
+            for suggestion in matches:
+                by_volunteer[suggestion["volunteer_id"]].append(suggestion)
+            self._result = (time.time(), matches, dict(by_volunteer))
+            return self._result
+
+    def get(self) -> tuple[float, list[dict], dict]:
+        if MATCHING_INTERVAL <= 0:
+            return self.refresh()
+        # Requests only compute the matching before the job's first run.
+        return self._result or self.refresh(if_missing=True)
+
+    def clear(self) -> None:
+        self._result = None
+
+
+latest_matches = LatestMatches()
+matching_job = PeriodicJob("order-matching", MATCHING_INTERVAL, latest_matches.refresh)
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.matching",
+        description="Suggest volunteers for pending orders; writes NDJSON.",
+    )
+    parser.add_argument("--radius-km", type=float, default=MATCHING_MAX_RADIUS_KM)
+    parser.add_argument("--capacity", type=int, default=MATCHING_CAPACITY)
+    args = parser.parse_args(argv)
+
+    with database.SessionLocal() as db:
+        orders, volunteers = load(db)
+    for suggestion in match(orders, volunteers, args.radius_km, args.capacity):
+        sys.stdout.buffer.write(orjson.dumps(suggestion) + b"\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
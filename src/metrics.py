@@ -0,0 +1,189 @@
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+
+from src.cache import CACHES
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    __slots__ = ("statements", "db_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.statements} queries", '
+            f"total;dur={total_seconds * 1000:.1f}"
+        )
+
+
+class Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+# Stats of the request being served. Threadpool workers and session
+# greenlets run with a copy of the context, so they update the same object.
+current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "request_stats", default=None
+)
+
+_lock = threading.Lock()
+_latency: dict[tuple, Histogram] = defaultdict(Histogram)
+_statements: dict[tuple, int] = defaultdict(int)
+_db_seconds: dict[tuple, float] = defaultdict(float)
+_counters: dict[tuple, float] = defaultdict(float)
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    with _lock:
+        _counters[(name, tuple(sorted(labels.items())))] += amount
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which goes away with the statement even
+    # when it raises and the after event never fires.
+    if current.get() is not None:
+        context.metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current.get()
+    start = getattr(context, "metrics_start", None)
+    if stats is not None and start is not None:
+        stats.statements += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+def install() -> None:
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", stats.server_timing(time.perf_counter() - start)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - start
+            current.reset(token)
+            route = scope.get("route")
+            path = route.path if route is not None else "<unmatched>"
+            with _lock:
+                _latency[(scope["method"], path, str(status))].observe(elapsed)
+                _statements[(scope["method"], path)] += stats.statements
+                _db_seconds[(scope["method"], path)] += stats.db_seconds
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render() -> str:
+    lines = [
+        "# HELP http_request_duration_seconds Request latency by route and status.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    with _lock:
+        for (method, path, status), histogram in sorted(_latency.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.buckets):
+                cumulative += count
+                labels = _labels(method=method, route=path, status=status, le=bound)
+                lines.append(
+                    f"http_request_duration_seconds_bucket{labels} {cumulative}"
+                )
+            labels = _labels(method=method, route=path, status=status, le="+Inf")
+            lines.append(
+                f"http_request_duration_seconds_bucket{labels} {histogram.count}"
+            )
+            labels = _labels(method=method, route=path, status=status)
+            lines.append(f"http_request_duration_seconds_sum{labels} {histogram.sum}")
+            lines.append(
+                f"http_request_duration_seconds_count{labels} {histogram.count}"
+            )
+
+        lines.append("# HELP db_statements_total SQL statements executed by route.")
+        lines.append("# TYPE db_statements_total counter")
+        for (method, path), count in sorted(_statements.items()):
+            lines.append(
+                f"db_statements_total{_labels(method=method, route=path)} {count}"
+            )
+        lines.append("# HELP db_duration_seconds_total Time spent in SQL by route.")
+        lines.append("# TYPE db_duration_seconds_total counter")
+        for (method, path), seconds in sorted(_db_seconds.items()):
+            lines.append(
+                f"db_duration_seconds_total{_labels(method=method, route=path)} {seconds}"
+            )
+
+        for name in sorted({name for name, _ in _counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (counter, labels), value in sorted(_counters.items()):
+                if counter == name:
+                    lines.append(f"{name}{_labels(**dict(labels))} {value}")
+
+    lines.append("# TYPE cache_hits_total counter")
+    lines.extend(f"cache_hits_total{_labels(cache=c.name)} {c.hits}" for c in CACHES)
+    lines.append("# TYPE cache_misses_total counter")
+    lines.extend(
+        f"cache_misses_total{_labels(cache=c.name)} {c.misses}" for c in CACHES
+    )
+    lines.append("# TYPE cache_entries gauge")
+    lines.extend(f"cache_entries{_labels(cache=c.name)} {len(c)}" for c in CACHES)
+    return "\n".join(lines) + "\n"
+
+
+def metrics_response() -> Response:
+    return Response(render(), media_type="text/plain; version=0.0.4")
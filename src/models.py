@@ -1,11 +1,67 @@
 import enum
 
-from sqlalchemy import (JSON, TIMESTAMP, Column, Enum, Float, ForeignKey,
-                        Integer, String)
+from sqlalchemy import (DDL, JSON, TIMESTAMP, Column, Enum, Float, ForeignKey,
+                        Index, Integer, String, event, func)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql.functions import GenericFunction
 
 Base = declarative_base()
 
+# Shopping lists are JSONB on Postgres, so item text can be indexed.
+Description = JSON().with_variant(JSONB(), "postgresql")
+
+
+class order_items_text(GenericFunction):
+    # The `text` of every shopping-list item, space separated. On Postgres an
+    # IMMUTABLE SQL function, so the trigram indexes can be built on it.
+    type = String()
+    inherit_cache = True
+
+
+@compiles(order_items_text, "sqlite")
+def _sqlite_order_items_text(element, compiler, **kw):
+    return (
+        "(SELECT group_concat(json_extract(value, '$.text'), ' ') "
+        f"FROM json_each({compiler.process(element.clauses, **kw)}, '$.data'))"
+    )
+
+
+ORDER_ITEMS_TEXT_FUNCTION = """
+CREATE OR REPLACE FUNCTION order_items_text(description jsonb) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT coalesce(string_agg(item ->> 'text', ' '), '')
+    FROM jsonb_array_elements(
+        CASE jsonb_typeof(description -> 'data')
+            WHEN 'array' THEN description -> 'data'
+            ELSE '[]'
+        END
+    ) AS item
+$$
+"""
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL(ORDER_ITEMS_TEXT_FUNCTION).execute_if(dialect="postgresql"),
+)
+
+
+def items_text_index(name: str, description: Column) -> Index:
+    return Index(
+        name,
+        func.lower(order_items_text(description)).label("items_text"),
+        postgresql_using="gin",
+        postgresql_ops={"items_text": "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
+
 
 class UserType(enum.Enum):
     SENIOR = "senior"
@@ -24,6 +80,13 @@ class OrderStatus(enum.Enum):
     ACCEPTED = "accepted"
     COMPLETED = "completed"
     CANCELLED = "cancelled"
+    EXPIRED = "expired"
+
+
+class GeocodeStatus(enum.Enum):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
 
 
 class User(Base):
@@ -36,27 +99,38 @@ class User(Base):
     address = Column(String, nullable=True)
     longitude = Column(Float, nullable=True)
     latitude = Column(Float, nullable=True)
+    grid_lat = Column(Integer, nullable=True)
+    grid_lon = Column(Integer, nullable=True)
+    unit_x = Column(Float, nullable=True)
+    unit_y = Column(Float, nullable=True)
+    unit_z = Column(Float, nullable=True)
+    geocode_status = Column(Enum(GeocodeStatus), nullable=True)
     type = Column(Enum(UserType), nullable=False)
     image_url = Column(String, nullable=True)
     description = Column(String, nullable=True)
 
+    __table_args__ = (Index("ix_users_grid_cell", "grid_lat", "grid_lon"),)
+
 
 class UserSession(Base):
     __tablename__ = "user_sessions"
 
     id = Column(Integer, primary_key=True, index=True)
     token = Column(String, nullable=False)
+    token_hash = Column(String, nullable=False)
     user_id = Column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
 
+    __table_args__ = (Index("ix_user_sessions_token_hash", "token_hash", unique=True),)
+
 
 class Order(Base):
     __tablename__ = "orders"
 
     id = Column(Integer, primary_key=True, index=True)
     category = Column(Enum(OrderCategory), nullable=False)
-    description = Column(JSON, nullable=False, default=dict)
+    description = Column(Description, nullable=False, default=dict)
     created_at = Column(TIMESTAMP, nullable=True)
     valid_since = Column(TIMESTAMP, nullable=True)
     valid_until = Column(TIMESTAMP, nullable=True)
@@ -67,3 +141,72 @@ class Order(Base):
     volunteer_id = Column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True
     )
+    # Only loaded on request, with selectinload; a lazy load would be a query
+    # per order.
+    senior = relationship(User, foreign_keys=[senior_id], lazy="raise")
+    volunteer = relationship(User, foreign_keys=[volunteer_id], lazy="raise")
+
+    __table_args__ = (
+        items_text_index("ix_orders_items_text", description),
+        # Only open orders can expire; the expiry sweep scans just those.
+        Index(
+            "ix_orders_open_valid_until",
+            "status",
+            "valid_until",
+            postgresql_where=status.in_([OrderStatus.PENDING, OrderStatus.ACCEPTED]),
+            sqlite_where=status.in_([OrderStatus.PENDING, OrderStatus.ACCEPTED]),
+        ),
+    )
+
+
+class ArchivedOrder(Base):
+    # Completed, cancelled and expired orders moved out of `orders` by
+    # src.archive.
+    __tablename__ = "orders_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    category = Column(Enum(OrderCategory), nullable=False)
+    description = Column(Description, nullable=False, default=dict)
+    created_at = Column(TIMESTAMP, nullable=True)
+    valid_since = Column(TIMESTAMP, nullable=True)
+    valid_until = Column(TIMESTAMP, nullable=True)
+    status = Column(Enum(OrderStatus), nullable=False)
+    senior_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    volunteer_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True
+    )
+    archived_at = Column(TIMESTAMP, nullable=False)
+    senior = relationship(User, foreign_keys=[senior_id], lazy="raise")
+    volunteer = relationship(User, foreign_keys=[volunteer_id], lazy="raise")
+
+    # Deleting a user cascades here; without these that is a full scan.
+    __table_args__ = (
+        Index("ix_orders_archive_senior_id", "senior_id"),
+        Index("ix_orders_archive_volunteer_id", "volunteer_id"),
+        items_text_index("ix_orders_archive_items_text", description),
+    )
+
+
+class OrderCount(Base):
+    # Orders per status and category: across all orders (owner_id 0, split
+    # into shards), and per senior and per volunteer, with archived orders
+    # under their own scopes. Maintained by src.order_counts.
+    __tablename__ = "order_counts"
+
+    scope = Column(String, primary_key=True)
+    owner_id = Column(Integer, primary_key=True)
+    status = Column(Enum(OrderStatus), primary_key=True)
+    category = Column(Enum(OrderCategory), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class GeocodeCache(Base):
+    __tablename__ = "geocode_cache"
+
+    address_key = Column(String, primary_key=True)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    created_at = Column(TIMESTAMP, nullable=False)
@@ -0,0 +1,296 @@
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, or_, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from src import database
+from src.models import (ArchivedOrder, Order, OrderCategory, OrderCount,
+                        OrderStatus)
+
+ALL, SENIOR, VOLUNTEER = "all", "senior", "volunteer"
+# Prefixes the scopes of orders counted in orders_archive.
+ARCHIVED = "archived_"
+USER_SCOPES = (SENIOR, VOLUNTEER, ARCHIVED + SENIOR, ARCHIVED + VOLUNTEER)
+# Order columns the counters depend on; the id picks the shard.
+COUNTED_FIELDS = ("id", "status", "category", "senior_id", "volunteer_id")
+APPLY_CHUNK_SIZE = 1000
+# The all-orders counts are spread over this many rows per status and
+# category, by order id, so concurrent writes to different orders rarely
+# wait for the same row. Readers sum the shards, so it can be changed at
+# any time.
+ORDER_COUNT_SHARDS = int(os.getenv("ORDER_COUNT_SHARDS", "16"))
+
+table = OrderCount.__table__
+
+
+def _keys(order, shard: int, archived: bool = False) -> list[tuple]:
+    # Per-user counts stay in shard 0; one user's orders rarely race.
+    prefix = ARCHIVED if archived else ""
+    status, category = OrderStatus(order["status"]), OrderCategory(order["category"])
+    keys = [
+        (prefix + ALL, 0, status, category, shard),
+        (prefix + SENIOR, order["senior_id"], status, category, 0),
+    ]
+    if order["volunteer_id"] is not None:
+        keys.append((prefix + VOLUNTEER, order["volunteer_id"], status, category, 0))
+    return keys
+
+
+def changes(
+    added: Iterable[dict] = (), removed: Iterable[dict] = (), archived: bool = False
+) -> Counter:
+    deltas = Counter()
+    for order in added:
+        for key in _keys(order, order["id"] % ORDER_COUNT_SHARDS, archived):
+            deltas[key] += 1
+    for order in removed:
+        for key in _keys(order, order["id"] % ORDER_COUNT_SHARDS, archived):
+            deltas[key] -= 1
+    return deltas
+
+
+def moved_to_archive(orders: list[dict]) -> Counter:
+    deltas = changes(removed=orders)
+    deltas.update(changes(added=orders, archived=True))
+    return deltas
+
+
+def _lock_order(key: tuple) -> tuple:
+    scope, owner_id, status, category, *shard = key
+    return scope, owner_id, status.value, category.value, *shard
+
+
+def apply(db: Session, deltas: Counter) -> None:
+    # Upserted in the writing transaction. Rows are always written in the
+    # same order, so two writers touching the same counters queue up
+    # instead of deadlocking.
+    rows = [
+        {
+            "scope": scope,
+            "owner_id": owner_id,
+            "status": status,
+            "category": category,
+            "shard": shard,
+            "count": count,
+        }
+        for (scope, owner_id, status, category, shard), count in sorted(
+            deltas.items(), key=lambda item: _lock_order(item[0])
+        )
+        if count
+    ]
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    for start in range(0, len(rows), APPLY_CHUNK_SIZE):
+        statement = insert(table).values(rows[start : start + APPLY_CHUNK_SIZE])
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=list(table.primary_key.columns),
+                set_={"count": table.c.count + statement.excluded.count},
+            )
+        )
+
+
+def _counted(db: Session, user_id: int = None) -> Counter:
+    # Counts straight from both order tables, optionally only the orders of
+    # one user.
+    counts = Counter()
+    for model, archived in ((Order, False), (ArchivedOrder, True)):
+        shard = model.id % ORDER_COUNT_SHARDS
+        query = select(
+            model.status,
+            model.category,
+            model.senior_id,
+            model.volunteer_id,
+            shard,
+            func.count(),
+        ).group_by(
+            model.status, model.category, model.senior_id, model.volunteer_id, shard
+        )
+        if user_id is not None:
+            query = query.where(
+                or_(model.senior_id == user_id, model.volunteer_id == user_id)
+            )
+        for status, category, senior_id, volunteer_id, shard, count in db.execute(
+            query
+        ):
+            order = {
+                "status": status,
+                "category": category,
+                "senior_id": senior_id,
+                "volunteer_id": volunteer_id,
+            }
+            for key in _keys(order, shard, archived):
+                counts[key] += count
+    return counts
+
+
+def _summed(counts: Counter) -> Counter:
+    # Adds up the shards of each count.
+    summed = Counter()
+    for (scope, owner_id, status, category, _), count in counts.items():
+        summed[scope, owner_id, status, category] += count
+    return summed
+
+
+def removed_with_user(db: Session, user_id: int) -> Counter:
+    # Orders that ON DELETE CASCADE will remove along with the user.
+    return Counter({key: -count for key, count in _counted(db, user_id).items()})
+
+
+def forget_user(db: Session, user_id: int) -> None:
+    db.execute(
+        delete(table).where(table.c.scope.in_(USER_SCOPES), table.c.owner_id == user_id)
+    )
+
+
+def countable(
+    senior_id: int = None,
+    volunteer_id: int = None,
+    valid_since=None,
+    valid_until=None,
+    radius_km: float = None,
+    q: str = None,
+    ids: list[int] = None,
+    **filters,
+) -> bool:
+    # Counters cover status and category, alone or for one senior or one
+    # volunteer. Coordinates without a radius only add the distance.
+    return not (
+        (senior_id and volunteer_id)
+        or valid_since
+        or valid_until
+        or radius_km is not None
+        or q
+        or ids is not None
+    )
+
+
+def exact_total(
+    db: Session,
+    status: OrderStatus = None,
+    category: OrderCategory = None,
+    senior_id: int = None,
+    volunteer_id: int = None,
+    include_archived: bool = False,
+    **filters,
+) -> int:
+    if senior_id:
+        scope, owner_id = SENIOR, senior_id
+    elif volunteer_id:
+        scope, owner_id = VOLUNTEER, volunteer_id
+    else:
+        scope, owner_id = ALL, 0
+    scopes = (scope, ARCHIVED + scope) if include_archived else (scope,)
+    query = select(func.coalesce(func.sum(table.c.count), 0)).where(
+        table.c.scope.in_(scopes), table.c.owner_id == owner_id
+    )
+    if status:
+        query = query.where(table.c.status == status)
+    if category:
+        query = query.where(table.c.category == category)
+    return db.scalar(query)
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def estimated_total(db: Session, statement) -> Optional[int]:
+    # The planner's row estimate for the query, from table statistics; only
+    # available on Postgres.
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    plan = db.execute(Explain(statement)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def user_stats(db: Session, user_ids: list[int]) -> dict[int, dict]:
+    # Orders per status each user placed and took on, archived ones
+    # included; a few primary key lookups per user.
+    stats = {
+        user_id: {
+            "as_senior": {status.value: 0 for status in OrderStatus},
+            "as_volunteer": {status.value: 0 for status in OrderStatus},
+        }
+        for user_id in user_ids
+    }
+    rows = db.execute(
+        select(table.c.scope, table.c.owner_id, table.c.status, func.sum(table.c.count))
+        .where(table.c.scope.in_(USER_SCOPES), table.c.owner_id.in_(user_ids))
+        .group_by(table.c.scope, table.c.owner_id, table.c.status)
+    )
+    for scope, owner_id, status, count in rows:
+        role = "as_senior" if scope.endswith(SENIOR) else "as_volunteer"
+        stats[owner_id][role][status.value] += count
+    return stats
+
+
+def stored(db: Session) -> Counter:
+    return Counter(
+        {
+            (row.scope, row.owner_id, row.status, row.category, row.shard): row.count
+            for row in db.execute(select(table)).mappings()
+            if row.count
+        }
+    )
+
+
+def drift(db: Session) -> Counter:
+    # Compared shards summed: after ORDER_COUNT_SHARDS changes, an order's
+    # later writes count in another shard than its earlier ones.
+    difference = _summed(stored(db))
+    difference.subtract(_summed(_counted(db)))
+    return Counter({key: count for key, count in difference.items() if count})
+
+
+def recompute(db: Session) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        # Order writes wait for the rebuild instead of updating counters
+        # that are about to be replaced.
+        db.execute(text("LOCK TABLE orders, orders_archive IN SHARE MODE"))
+    db.execute(delete(table))
+    apply(db, _counted(db))
+    db.commit()
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.order_counts",
+        description="Check the order counters against the orders table, or "
+        "rebuild them.",
+    )
+    parser.add_argument("--recompute", action="store_true")
+    args = parser.parse_args(argv)
+
+    with database.SessionLocal() as db:
+        if args.recompute:
+            recompute(db)
+            return
+        difference = drift(db)
+    for (scope, owner_id, status, category), count in sorted(
+        difference.items(), key=lambda item: _lock_order(item[0])
+    ):
+        print(f"{scope} {owner_id} {status.value} {category.value}: {count:+d}")
+    sys.exit(1 if difference else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,59 @@
+import base64
+import enum
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(sort_by: Optional[str], key: Any, last_id: int) -> str:
+    if isinstance(key, enum.Enum):
+        key = key.name
+    elif isinstance(key, datetime):
+        key = key.isoformat()
+    payload = json.dumps([sort_by, key, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, sort_by: Optional[str], python_type: type = int
+) -> tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort_by, key, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort_by != sort_by or not isinstance(last_id, int):
+            raise ValueError
+        if key is not None:
+            if issubclass(python_type, enum.Enum):
+                key = python_type[key]
+            elif python_type is datetime:
+                key = datetime.fromisoformat(key)
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key, last_id
+
+
+def order_by(sort_key, id_column, descending: bool) -> tuple:
+    # NULL placement is spelled out so keyset_filter agrees with the ordering
+    # on every backend (Postgres defaults, made explicit for SQLite).
+    if descending:
+        return sort_key.desc().nulls_first(), id_column.desc()
+    return sort_key.asc().nulls_last(), id_column.asc()
+
+
+def keyset_filter(sort_key, id_column, key: Any, last_id: int, descending: bool):
+    if descending:
+        if key is None:
+            return or_(
+                sort_key.is_not(None), and_(sort_key.is_(None), id_column < last_id)
+            )
+        return or_(sort_key < key, and_(sort_key == key, id_column < last_id))
+    if key is None:
+        return and_(sort_key.is_(None), id_column > last_id)
+    return or_(
+        sort_key > key,
+        and_(sort_key == key, id_column > last_id),
+        sort_key.is_(None),
+    )
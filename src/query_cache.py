@@ -0,0 +1,159 @@
+import asyncio
+import enum
+import os
+import threading
+from typing import Awaitable, Callable, Hashable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src import geo, metrics
+from src.cache import MISSING, TTLCache
+
+# Identical GET /orders queries within this many seconds share one result;
+# 0 switches the cache off.
+ORDERS_QUERY_CACHE_TTL = float(os.getenv("ORDERS_QUERY_CACHE_TTL", "2"))
+ORDERS_QUERY_CACHE_SIZE = int(os.getenv("ORDERS_QUERY_CACHE_SIZE", "1000"))
+# Query coordinates are snapped to a grid this fine, so clients a few metres
+# apart make the same query; distances are then measured from the grid point.
+ORDERS_QUERY_GRID_METERS = float(os.getenv("ORDERS_QUERY_GRID_METERS", "100"))
+
+_PENDING = "pending_query_invalidations"
+EVERYWHERE = None
+
+
+class LoadFailed(Exception):
+    pass
+
+
+def _normalize(name: str, value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if name == "q":
+        return " ".join(value.lower().split())
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+class QueryCache:
+    # Caches encoded responses by their normalized filters. Concurrent misses
+    # on one key wait for the first request's query instead of running
+    # their own.
+    def __init__(self, name: str, ttl: float, maxsize: int, grid_meters: float):
+        self.enabled = ttl > 0
+        self.entries = TTLCache(name, maxsize, ttl)
+        self.grid_degrees = grid_meters / 1000 / geo.KM_PER_DEGREE
+        self.generation = 0
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def snap(self, degrees) -> Optional[float]:
+        if degrees in (None, "") or self.grid_degrees <= 0:
+            return degrees
+        return round(round(float(degrees) / self.grid_degrees) * self.grid_degrees, 7)
+
+    def key(self, filters: dict) -> tuple:
+        return tuple(
+            sorted(
+                (name, _normalize(name, value))
+                for name, value in filters.items()
+                if value is not None
+            )
+        )
+
+    @staticmethod
+    def area(filters: dict) -> Optional[tuple]:
+        # Results of a radius query can only change when an order inside
+        # its bounding box does; anything else may change with any order.
+        latitude, longitude = filters.get("latitude"), filters.get("longitude")
+        radius_km = filters.get("radius_km")
+        if latitude is None or longitude is None or radius_km is None:
+            return EVERYWHERE
+        return geo.bounding_box(float(latitude), float(longitude), radius_km)
+
+    async def load(self, filters: dict, fetch: Callable[[], Awaitable[bytes]]) -> bytes:
+        key = self.key(filters)
+        entry = self.entries.get(key)
+        if entry is not MISSING:
+            return entry[1]
+
+        waiting = self._inflight.get(key)
+        if waiting is not None:
+            metrics.inc("orders_query_coalesced_total")
+            try:
+                # Shielded so a disconnecting waiter can't cancel the query
+                # the others are waiting for.
+                return await asyncio.shield(waiting)
+            except LoadFailed:
+                return await fetch()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self.generation
+        try:
+            body = await fetch()
+        except BaseException:
+            future.set_exception(LoadFailed())
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        future.set_result(body)
+        # An order write committed while the query ran bumps the generation,
+        # so the possibly stale result is returned but not cached.
+        with self._lock:
+            if generation == self.generation:
+                self.entries.set(key, (self.area(filters), body))
+        return body
+
+    def invalidate(self, points: Optional[list] = EVERYWHERE) -> None:
+        # `points` are the locations of changed orders, None where unknown.
+        with self._lock:
+            self.generation += 1
+            if points is EVERYWHERE:
+                self.entries.clear()
+                return
+            located = [point for point in points if point and None not in point]
+            self.entries.pop_where(
+                lambda entry: entry[0] is EVERYWHERE
+                or any(_inside(entry[0], *point) for point in located)
+            )
+
+    def invalidate_after_commit(self, db: Session, points: Optional[list]) -> None:
+        pending = db.info.setdefault(_PENDING, [])
+        if points is EVERYWHERE or EVERYWHERE in pending:
+            pending[:] = [EVERYWHERE]
+        else:
+            pending.append(points)
+
+
+def _inside(area: tuple, latitude: float, longitude: float) -> bool:
+    min_lat, max_lat, min_lon, max_lon = area
+    if not min_lat <= latitude <= max_lat:
+        return False
+    return min_lon is None or min_lon <= longitude <= max_lon
+
+
+orders_query_cache = QueryCache(
+    "orders_query",
+    ORDERS_QUERY_CACHE_TTL,
+    ORDERS_QUERY_CACHE_SIZE,
+    ORDERS_QUERY_GRID_METERS,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_pending(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if pending is None:
+        return
+    if EVERYWHERE in pending:
+        orders_query_cache.invalidate()
+    else:
+        orders_query_cache.invalidate([point for points in pending for point in points])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
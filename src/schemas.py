@@ -1,12 +1,9 @@
-import os
-import urllib.parse
 from datetime import datetime
-from typing import Dict
+from typing import Any, Dict
 
-import requests
 from pydantic import BaseModel
 
-from src.models import OrderCategory, OrderStatus, UserType
+from src.models import GeocodeStatus, OrderCategory, OrderStatus, UserType
 
 
 class UserBase(BaseModel):
@@ -25,13 +22,24 @@ class UserCreate(UserBase):
     pass
 
 
+class UserStats(BaseModel):
+    # Orders per status, archived ones included.
+    as_senior: dict[OrderStatus, int]
+    as_volunteer: dict[OrderStatus, int]
+
+
 class User(UserBase):
     id: int
+    geocode_status: GeocodeStatus | None = None
 
     class Config:
         from_attributes = True
 
 
+class UserWithStats(User):
+    stats: UserStats
+
+
 class UserUpdate(BaseModel):
     phone_number: str | None = None
     first_name: str | None = None
@@ -93,6 +101,10 @@ class OrderUpdate(BaseModel):
         from_attributes = True
 
 
+class OrderAccept(BaseModel):
+    volunteer_id: int
+
+
 class OrderFilter(BaseModel):
     category: OrderCategory | None = None
     valid_since: datetime | None = None
@@ -110,6 +122,36 @@ class Order(OrderBase):
         from_attributes = True
 
 
+class OrderWithDistance(Order):
+    distance: float | None = None
+
+
+class OrderExpanded(OrderWithDistance):
+    # With expand=senior,volunteer.
+    senior: User | None = None
+    volunteer: User | None = None
+
+
+class OrderPage(BaseModel):
+    items: list[OrderWithDistance]
+    next_cursor: str | None = None
+    # With with_total=true. The total is an estimate when total_exact is false.
+    total: int | None = None
+    total_exact: bool | None = None
+    has_more: bool | None = None
+
+
+class UserPage(BaseModel):
+    items: list[User]
+    next_cursor: str | None = None
+
+
+class Match(BaseModel):
+    order_id: int
+    volunteer_id: int
+    distance_km: float
+
+
 class RegisterRequest(BaseModel):
     phone_number: str
     first_name: str
@@ -120,28 +162,16 @@ class RegisterRequest(BaseModel):
     description: str | None = None
     token: str
 
-    def get_geocode(self, address: str):
-        base_url = "https://geocode.maps.co/search"
-        api_key = os.getenv("GEOCODE_API_KEY")
-        encoded_address = urllib.parse.quote(address)
-        url = f"{base_url}?q={encoded_address}&api_key={api_key}"
-
-        response = requests.get(url)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            response.raise_for_status()
-
-    def to_user_create(self) -> UserCreate:
-        geo_data = self.get_geocode(self.address) if self.address else None
-
+    def to_user_create(
+        self, coordinates: tuple[float, float] | None = None
+    ) -> UserCreate:
         return UserCreate(
             phone_number=self.phone_number,
             first_name=self.first_name,
             last_name=self.last_name,
             address=self.address,
-            longitude=float(geo_data[0].get("lon")) if geo_data else None,
-            latitude=float(geo_data[0].get("lat")) if geo_data else None,
+            longitude=coordinates[1] if coordinates else None,
+            latitude=coordinates[0] if coordinates else None,
             type=self.type,
             image_url=self.image_url,
             description=self.description,
@@ -157,3 +187,18 @@ class LoginRequest(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class BulkCreated(BaseModel):
+    index: int
+    id: int
+
+
+class BulkError(BaseModel):
+    index: int
+    detail: Any
+
+
+class BulkCreateResult(BaseModel):
+    created: list[BulkCreated] = []
+    errors: list[BulkError] = []
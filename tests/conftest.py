@@ -0,0 +1,116 @@
+import os
+import tempfile
+
+# The app reads its configuration at import, so this comes first. Background
+# jobs and the order query cache are left off; tests turn them on by hand.
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+)
+os.environ.setdefault("ARCHIVE_INTERVAL", "0")
+os.environ.setdefault("EXPIRY_INTERVAL", "0")
+os.environ.setdefault("ORDERS_QUERY_CACHE_TTL", "0")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from src import database, matching, models
+from src.cache import CACHES
+
+
+def _foreign_keys_on(dbapi_connection, connection_record) -> None:
+    # ON DELETE CASCADE needs this on SQLite, matching Postgres behaviour.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+for engine in (database.engine, database.async_engine):
+    if engine is not None and engine.dialect.name == "sqlite":
+        event.listen(
+            getattr(engine, "sync_engine", engine), "connect", _foreign_keys_on
+        )
+
+
+@pytest.fixture
+def empty_database():
+    for cache in CACHES:
+        cache.clear()
+    matching.latest_matches.clear()
+    if database.async_engine is not None:
+        # asyncpg connections belong to the event loop that opened them, and
+        # each TestClient runs its own.
+        database.async_engine.sync_engine.dispose(close=False)
+    models.Base.metadata.drop_all(database.engine)
+    models.Base.metadata.create_all(database.engine)
+
+
+@pytest.fixture
+def client(empty_database):
+    from src.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def statements():
+    # (statement, parameters) of the SQL run while the test body does; with
+    # the order query cache off, each request reaches the database.
+    engine = database.async_engine or database.engine
+    engine = getattr(engine, "sync_engine", engine)
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(engine, "before_cursor_execute", count)
+
+
+@pytest.fixture
+def make_user(client):
+    count = 0
+
+    def make_user(latitude=50.06, longitude=19.94, type="senior", **fields):
+        nonlocal count
+        count += 1
+        response = client.post(
+            "/users",
+            json={
+                "phone_number": f"+48 500 000 {count:03d}",
+                "first_name": "Anna",
+                "last_name": "Nowak",
+                "latitude": latitude,
+                "longitude": longitude,
+                "type": type,
+                **fields,
+            },
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return make_user
+
+
+@pytest.fixture
+def make_order(client):
+    def make_order(senior_id, **fields):
+        response = client.post(
+            "/orders",
+            json={
+                "category": "groceries",
+                "senior_id": senior_id,
+                "description": {
+                    "data": [{"id": 1, "text": "Chleb i mleko", "completed": False}]
+                },
+                "valid_since": "2024-12-15T00:00:00",
+                "valid_until": "2030-12-16T00:00:00",
+                **fields,
+            },
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return make_order
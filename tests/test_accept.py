@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from src import archive, database, order_counts
+from src.cache import MISSING
+from src.entity_cache import order_cache
+
+
+def accept(client, order_id, volunteer_id):
+    return client.post(
+        f"/orders/{order_id}/accept", json={"volunteer_id": volunteer_id}
+    )
+
+
+def totals(client):
+    totals = {}
+    for status in ("pending", "accepted"):
+        response = client.get("/orders", params={"with_total": True, "status": status})
+        totals[status] = response.json()["total"]
+    return totals
+
+
+def test_one_of_two_concurrent_accepts_wins(client, make_user, make_order):
+    senior = make_user()
+    volunteers = [make_user(type="volunteer")["id"] for _ in range(2)]
+    for _ in range(5):
+        order = make_order(senior["id"])
+        start = threading.Barrier(2)
+        responses = {}
+
+        def race(volunteer_id):
+            start.wait()
+            responses[volunteer_id] = accept(client, order["id"], volunteer_id)
+
+        threads = [threading.Thread(target=race, args=(v,)) for v in volunteers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        codes = {v: response.status_code for v, response in responses.items()}
+        assert sorted(codes.values()) == [200, 409]
+        winner = next(v for v, code in codes.items() if code == 200)
+        loser = responses[next(v for v in volunteers if v != winner)]
+        assert loser.json()["detail"] == "Order already taken"
+        assert client.get(f"/orders/{order['id']}").json()["volunteer_id"] == winner
+
+    assert totals(client) == {"pending": 0, "accepted": 5}
+    with database.SessionLocal() as db:
+        assert not order_counts.drift(db)
+
+
+def test_losing_accept_changes_nothing(client, make_user, make_order):
+    senior = make_user()
+    first, second = make_user(type="volunteer"), make_user(type="volunteer")
+    order = make_order(senior["id"])
+    accepted = accept(client, order["id"], first["id"])
+    assert accepted.status_code == 200
+    cached = client.get(f"/orders/{order['id']}")
+    assert order_cache.get(order["id"]) is not MISSING
+
+    assert accept(client, order["id"], second["id"]).status_code == 409
+    response = client.get(f"/orders/{order['id']}")
+    assert response.json() == accepted.json()
+    assert response.headers["etag"] == cached.headers["etag"]
+    assert totals(client) == {"pending": 0, "accepted": 1}
+    with database.SessionLocal() as db:
+        assert not order_counts.drift(db)
+
+
+@pytest.mark.parametrize("status", ["completed", "cancelled", "expired"])
+def test_accepting_a_finished_order(client, make_user, make_order, status):
+    volunteer = make_user(type="volunteer")
+    order = make_order(make_user()["id"], status=status)
+    response = accept(client, order["id"], volunteer["id"])
+    assert response.status_code == 409
+    assert response.json()["detail"] == f"Order is {status}"
+    assert client.get(f"/orders/{order['id']}").json() == order
+
+
+def test_accepting_an_archived_order(client, make_user, make_order):
+    volunteer = make_user(type="volunteer")
+    order = make_order(make_user()["id"], status="cancelled")
+    assert archive.archive_orders(after_hours=0) == 1
+    response = accept(client, order["id"], volunteer["id"])
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Order is cancelled"
+
+
+def test_accepting_with_someone_who_is_not_a_volunteer(client, make_user, make_order):
+    senior = make_user()
+    order = make_order(senior["id"])
+    client.get(f"/orders/{order['id']}")
+    for volunteer_id in (0, senior["id"]):
+        response = accept(client, order["id"], volunteer_id)
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Volunteer not found"
+    assert client.get(f"/orders/{order['id']}").json() == order
+    assert totals(client) == {"pending": 1, "accepted": 0}
+
+    volunteer = make_user(type="volunteer")
+    assert accept(client, 0, volunteer["id"]).status_code == 404
@@ -0,0 +1,68 @@
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+
+from src import archive, database, order_counts
+from src.models import ArchivedOrder, Order
+
+
+def stored_ids():
+    with database.SessionLocal() as db:
+        return (
+            set(db.scalars(select(Order.id))),
+            set(db.scalars(select(ArchivedOrder.id))),
+        )
+
+
+def test_only_finished_orders_older_than_the_cutoff_move(client, make_user, make_order):
+    senior = make_user()["id"]
+    volunteer = make_user(type="volunteer")["id"]
+    finished = [
+        make_order(senior, status="completed", volunteer_id=volunteer),
+        make_order(senior, status="cancelled"),
+        make_order(senior, status="expired"),
+    ]
+    still_open = [
+        make_order(senior),
+        make_order(senior, status="accepted", volunteer_id=volunteer),
+    ]
+    time.sleep(0.01)
+    cutoff = datetime.now()
+    time.sleep(0.01)
+    recent = [make_order(senior, status="completed", volunteer_id=volunteer)]
+
+    with database.SessionLocal() as db:
+        assert archive.archive_batch(db, cutoff, 2) == 2
+        assert archive.archive_batch(db, cutoff, 2) == 1
+    live, archived = stored_ids()
+    assert archived == {order["id"] for order in finished}
+    assert live == {order["id"] for order in still_open + recent}
+    with database.SessionLocal() as db:
+        assert not order_counts.drift(db)
+
+
+def test_archiving_again_moves_nothing(client, make_user, make_order):
+    senior = make_user()["id"]
+    for status in ("completed", "cancelled", "pending"):
+        make_order(senior, status=status)
+    assert archive.archive_orders(after_hours=0) == 2
+    stored = stored_ids()
+
+    assert archive.archive_orders(after_hours=0) == 0
+    with database.SessionLocal() as db:
+        assert archive.archive_batch(db, datetime.now(), 10) == 0
+    assert stored_ids() == stored
+    with database.SessionLocal() as db:
+        assert not order_counts.drift(db)
+
+
+def test_archived_order_is_still_served(client, make_user, make_order):
+    order = make_order(make_user()["id"], status="cancelled")
+    assert archive.archive_orders(after_hours=0) == 1
+
+    response = client.get(f"/orders/{order['id']}")
+    assert response.status_code == 200
+    assert response.json() == order
+    assert client.get("/orders").json() == []
+    assert client.get("/orders", params={"include_archived": True}).json() == [order]
@@ -0,0 +1,107 @@
+import math
+import random
+
+import pytest
+
+from src import geo
+
+# Allowed disagreement with the acos formula (1 m); both lose precision
+# near 0 and 180 degrees, to well under a metre.
+TOLERANCE_KM = 1e-3
+
+
+def acos_km(latitude, longitude, other_latitude, other_longitude):
+    # The spherical law of cosines the distance queries used before ranking
+    # by unit vectors.
+    lat1, lat2 = math.radians(latitude), math.radians(other_latitude)
+    cosine = math.sin(lat1) * math.sin(lat2) + math.cos(lat1) * math.cos(
+        lat2
+    ) * math.cos(math.radians(other_longitude - longitude))
+    return geo.EARTH_RADIUS_KM * math.acos(min(max(cosine, -1.0), 1.0))
+
+
+def unit_vector_km(latitude, longitude, other_latitude, other_longitude):
+    a = geo.unit_vector(latitude, longitude)
+    b = geo.unit_vector(other_latitude, other_longitude)
+    return geo.key_to_km(1 - sum(p * q for p, q in zip(a, b)))
+
+
+POINTS = [
+    (50.06, 19.94, 50.06, 19.94),
+    (50.06, 19.94, 50.0601, 19.9401),
+    (50.06, 19.94, 52.23, 21.01),
+    (0.0, 179.99, 0.0, -179.99),
+    (89.9, 0.0, 89.9, 180.0),
+    (-33.87, 151.21, 51.51, -0.13),
+    (10.0, 20.0, -10.0, -160.0),
+]
+
+
+@pytest.mark.parametrize("points", POINTS)
+def test_unit_vectors_match_acos(points):
+    assert unit_vector_km(*points) == pytest.approx(acos_km(*points), abs=TOLERANCE_KM)
+    assert geo.distance_km(*points) == pytest.approx(acos_km(*points), abs=TOLERANCE_KM)
+
+
+def test_radius_key_and_bounding_box_keep_every_point_inside():
+    rnd = random.Random(0)
+    for _ in range(2000):
+        latitude, longitude = rnd.uniform(-80, 80), rnd.uniform(-179, 179)
+        radius_km = rnd.choice([0.5, 5, 50, 500])
+        other = (
+            latitude + rnd.uniform(-5, 5),
+            longitude + rnd.uniform(-5, 5),
+        )
+        if not -90 <= other[0] <= 90:
+            continue
+        exact = acos_km(latitude, longitude, *other)
+        if abs(exact - radius_km) < TOLERANCE_KM:
+            continue
+        x, y, z = geo.unit_vector(latitude, longitude)
+        ox, oy, oz = geo.unit_vector(*other)
+        within = 1 - (x * ox + y * oy + z * oz) <= geo.distance_key(radius_km)
+        assert within == (exact <= radius_km)
+        if within:
+            min_lat, max_lat, min_lon, max_lon = geo.bounding_box(
+                latitude, longitude, radius_km
+            )
+            assert min_lat <= other[0] <= max_lat
+            if min_lon is not None:
+                assert min_lon <= other[1] <= max_lon
+
+
+def test_orders_by_distance_match_acos(client, make_user, make_order):
+    rnd = random.Random(1)
+    seniors = {}
+    for _ in range(40):
+        senior = make_user(50 + rnd.uniform(-0.3, 0.3), 20 + rnd.uniform(-0.3, 0.3))
+        seniors[senior["id"]] = senior
+        make_order(senior["id"])
+    latitude, longitude = 50.05, 20.01
+
+    def expected_km(order):
+        senior = seniors[order["senior_id"]]
+        return acos_km(latitude, longitude, senior["latitude"], senior["longitude"])
+
+    orders = client.get(
+        "/orders",
+        params={
+            "latitude": latitude,
+            "longitude": longitude,
+            "sort_by": "distance",
+            "limit": 100,
+        },
+    ).json()
+    assert len(orders) == 40
+    for order in orders:
+        assert order["distance"] == pytest.approx(expected_km(order), abs=TOLERANCE_KM)
+    assert orders == sorted(orders, key=expected_km)
+
+    inside = client.get(
+        "/orders",
+        params={"latitude": latitude, "longitude": longitude, "radius_km": 10},
+    ).json()
+    assert {order["id"] for order in inside} == {
+        order["id"] for order in orders if expected_km(order) <= 10
+    }
+    assert 0 < len(inside) < 40
@@ -0,0 +1,56 @@
+from src.cache import MISSING
+from src.entity_cache import order_cache, user_cache
+
+
+def test_cached_order_is_not_served_after_a_write(client, make_user, make_order):
+    senior, volunteer = make_user(), make_user(type="volunteer")
+    order = make_order(senior["id"])
+    first = client.get(f"/orders/{order['id']}")
+    assert first.json() == order
+    etag = first.headers["etag"]
+    assert order_cache.get(order["id"]) is not MISSING
+    assert (
+        client.get(f"/orders/{order['id']}", headers={"If-None-Match": etag})
+    ).status_code == 304
+
+    writes = [
+        ("put", f"/orders/{order['id']}", {"description": {"note": "bez laktozy"}}),
+        ("post", f"/orders/{order['id']}/accept", {"volunteer_id": volunteer["id"]}),
+        ("post", f"/orders/{order['id']}/complete", None),
+    ]
+    for method, url, body in writes:
+        written = getattr(client, method)(url, json=body)
+        assert written.status_code == 200, written.text
+        response = client.get(f"/orders/{order['id']}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json() == written.json()
+        assert response.headers["etag"] != etag
+        etag = response.headers["etag"]
+
+
+def test_cached_user_is_not_served_after_a_write(client, make_user, make_order):
+    user = make_user()
+    order = make_order(user["id"])
+    assert client.get(f"/users/{user['id']}").json() == user
+    client.get(f"/orders/{order['id']}")
+
+    client.put(f"/users/{user['id']}", json={"first_name": "Zofia"})
+    assert client.get(f"/users/{user['id']}").json()["first_name"] == "Zofia"
+
+    # The user's orders go with them through ON DELETE CASCADE.
+    client.delete(f"/users/{user['id']}")
+    assert client.get(f"/users/{user['id']}").status_code == 404
+    assert client.get(f"/orders/{order['id']}").status_code == 404
+
+
+def test_row_read_during_a_write_is_not_cached(client, make_user):
+    user = make_user()
+
+    def fetch_racing_a_write():
+        row = dict(user)
+        user_cache.invalidate(user["id"])
+        return row
+
+    entry = user_cache.load(user["id"], fetch_racing_a_write)
+    assert entry is not None
+    assert user_cache.get(user["id"]) is MISSING
@@ -0,0 +1,173 @@
+import asyncio
+
+import orjson
+import pytest
+
+from src import database, events
+from src.events import RESYNC_FRAME, OrderEventFilter, order_events
+from src.models import OrderCategory, OrderStatus
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    # Requested before client, so the app starts the memory backend.
+    monkeypatch.setattr(order_events, "backend", events.MemoryBackend())
+    return order_events
+
+
+def received(client, subscription):
+    # Read on the app's event loop, after the deliveries already scheduled.
+    async def drain():
+        await asyncio.sleep(0)
+        frames = []
+        while not subscription.queue.empty():
+            frames.append(subscription.queue.get_nowait())
+        return frames
+
+    return [parse(frame) for frame in client.portal.call(drain)]
+
+
+def parse(frame):
+    if frame == RESYNC_FRAME:
+        return "resync", None
+    head, data = frame.split("\n")[:2]
+    return head.removeprefix("event: "), orjson.loads(data.removeprefix("data: "))["id"]
+
+
+def test_filters(broker, client, make_user, make_order):
+    near = make_user()
+    far = make_user(latitude=52.23, longitude=21.01)
+    subscriptions = {
+        "all": OrderEventFilter(),
+        "groceries": OrderEventFilter(category=OrderCategory.GROCERIES),
+        "pending": OrderEventFilter(status=OrderStatus.PENDING),
+        "nearby": OrderEventFilter(latitude=50.06, longitude=19.94, radius_km=5),
+    }
+    subscriptions = {name: broker.subscribe(f) for name, f in subscriptions.items()}
+    try:
+        groceries = make_order(near["id"])
+        walk = make_order(far["id"], category="pet_walking")
+        accepted = make_order(near["id"], category="other", status="accepted")
+        volunteer = make_user(type="volunteer")
+        client.post(
+            f"/orders/{groceries['id']}/accept", json={"volunteer_id": volunteer["id"]}
+        )
+        frames = {
+            name: received(client, subscription)
+            for name, subscription in subscriptions.items()
+        }
+    finally:
+        for subscription in subscriptions.values():
+            broker.unsubscribe(subscription)
+
+    assert frames["all"] == [
+        ("created", groceries["id"]),
+        ("created", walk["id"]),
+        ("created", accepted["id"]),
+        ("updated", groceries["id"]),
+    ]
+    assert frames["groceries"] == [
+        ("created", groceries["id"]),
+        ("updated", groceries["id"]),
+    ]
+    # The accepted order leaving the filter is still sent.
+    assert frames["pending"] == [
+        ("created", groceries["id"]),
+        ("created", walk["id"]),
+        ("updated", groceries["id"]),
+    ]
+    assert frames["nearby"] == [
+        ("created", groceries["id"]),
+        ("created", accepted["id"]),
+        ("updated", groceries["id"]),
+    ]
+
+
+def test_slow_subscriber_is_told_to_resync(broker, client, make_user, make_order):
+    senior = make_user()
+    fast = broker.subscribe(OrderEventFilter())
+    slow = events.Subscription(OrderEventFilter(), maxsize=3)
+    broker.subscriptions.add(slow)
+    try:
+        orders = []
+        fast_frames = []
+        for _ in range(5):
+            orders.append(make_order(senior["id"]))
+            fast_frames += received(client, fast)
+        slow_frames = received(client, slow)
+    finally:
+        broker.unsubscribe(fast)
+        broker.unsubscribe(slow)
+
+    assert fast_frames == [("created", order["id"]) for order in orders]
+    # The first three never went out; the client refetches instead.
+    assert slow_frames == [
+        ("resync", None),
+        ("created", orders[3]["id"]),
+        ("created", orders[4]["id"]),
+    ]
+    assert slow.dropped == 3 and fast.dropped == 0
+
+
+def test_delete_events(broker, client, make_user, make_order):
+    senior = make_user()
+    volunteer = make_user(type="volunteer")
+    order = make_order(senior["id"])
+    client.post(f"/orders/{order['id']}/accept", json={"volunteer_id": volunteer["id"]})
+    subscription = broker.subscribe(
+        OrderEventFilter(
+            category=OrderCategory.GROCERIES,
+            status=OrderStatus.PENDING,
+            latitude=50.06,
+            longitude=19.94,
+            radius_km=1,
+        )
+    )
+    try:
+        assert client.delete(f"/orders/{order['id']}").status_code == 200
+        frames = received(client, subscription)
+        # Deleting every order of a user sends an event for each.
+        orders = [make_order(senior["id"]) for _ in range(2)]
+        received(client, subscription)
+        assert client.delete(f"/users/{senior['id']}").status_code == 200
+        user_frames = received(client, subscription)
+    finally:
+        broker.unsubscribe(subscription)
+
+    assert frames == [("deleted", order["id"])]
+    assert sorted(user_frames) == [("deleted", o["id"]) for o in orders]
+
+
+def test_listen_connection_is_reopened(monkeypatch):
+    if database.engine.dialect.name != "postgresql":
+        pytest.skip("needs DATABASE_URL pointing to Postgres")
+    import asyncpg
+
+    monkeypatch.setattr(events, "ORDER_EVENTS_RECONNECT_DELAY", 0.05)
+    backend = events.PostgresBackend(database.DATABASE_URL, "test_order_events")
+    broker = events.OrderEventBroker(backend)
+    subscription = broker.subscribe(OrderEventFilter())
+    dsn = backend.dsn.render_as_string(hide_password=False)
+    payload = orjson.dumps(
+        {"type": "created", "order": {"id": 7, "category": "groceries"}}
+    ).decode()
+
+    async def run():
+        await broker.start()
+        other = await asyncpg.connect(dsn)
+        try:
+            first = backend.connection
+            await other.execute(
+                "SELECT pg_terminate_backend($1)", first.get_server_pid()
+            )
+            frame = await asyncio.wait_for(subscription.queue.get(), 10)
+            assert frame == RESYNC_FRAME
+            assert backend.connection is not first
+            await other.execute("SELECT pg_notify('test_order_events', $1)", payload)
+            return await asyncio.wait_for(subscription.queue.get(), 10)
+        finally:
+            await other.close()
+            await broker.stop()
+
+    assert parse(asyncio.run(run())) == ("created", 7)
+    assert backend.connection is None and backend.task is None
@@ -0,0 +1,79 @@
+import pytest
+
+from src import archive
+
+
+@pytest.fixture
+def orders(client, make_user, make_order):
+    # Every order has its own senior, and every other one a volunteer.
+    orders = []
+    for index in range(60):
+        order = make_order(make_user(50.0 + index / 100, 20.0)["id"])
+        if index % 2:
+            volunteer = make_user(type="volunteer")
+            response = client.post(
+                f"/orders/{order['id']}/accept", json={"volunteer_id": volunteer["id"]}
+            )
+            order = response.json()
+        orders.append(order)
+    return orders
+
+
+@pytest.mark.parametrize("limit", [5, 50])
+def test_expanding_a_page_adds_one_statement(client, orders, statements, limit):
+    params = {"limit": limit, "sort_by": "id"}
+    response = client.get("/orders", params=params)
+    assert response.status_code == 200 and len(response.json()) == limit
+    plain, executed = response.json(), len(statements)
+    assert executed == 1
+
+    statements.clear()
+    response = client.get("/orders", params={**params, "expand": "senior,volunteer"})
+    assert response.status_code == 200
+    assert len(statements) == executed + 1
+    users = {user["id"]: user for user in client.get("/users").json()}
+    for order, expanded in zip(plain, response.json()):
+        assert expanded == {
+            **order,
+            "senior": users[order["senior_id"]],
+            "volunteer": users.get(order["volunteer_id"]),
+        }
+
+
+def test_expanding_one_order(client, orders):
+    order = orders[1]
+    response = client.get(f"/orders/{order['id']}", params={"expand": "volunteer"})
+    assert response.status_code == 200
+    expanded = response.json()
+    assert expanded.pop("volunteer")["id"] == order["volunteer_id"]
+    assert expanded == order
+
+    # Archived orders expand the same way.
+    client.post(f"/orders/{order['id']}/complete")
+    assert archive.archive_orders(after_hours=0) == 1
+    response = client.get(f"/orders/{order['id']}", params={"expand": "volunteer"})
+    assert response.status_code == 200
+    assert response.json()["volunteer"]["id"] == order["volunteer_id"]
+    assert client.get("/orders/0", params={"expand": "senior"}).status_code == 404
+
+
+def test_unknown_expand_is_rejected(client):
+    for path in ("/orders", "/orders/1"):
+        response = client.get(path, params={"expand": "senior,driver"})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Unknown expand: driver"
+
+
+def test_ids_lookups(client, orders):
+    wanted = [orders[3]["id"], orders[0]["id"], orders[3]["id"]]
+    response = client.get("/orders", params={"ids": ",".join(map(str, wanted))})
+    assert response.status_code == 200
+    assert [order["id"] for order in response.json()] == sorted(set(wanted))
+
+    user_ids = [orders[0]["senior_id"], orders[1]["volunteer_id"]]
+    response = client.get("/users", params={"ids": f"{user_ids[0]},{user_ids[1]},0"})
+    assert [user["id"] for user in response.json()] == sorted(user_ids)
+
+    for ids in ("1,x", ",".join(map(str, range(1000)))):
+        assert client.get("/orders", params={"ids": ids}).status_code == 400
+        assert client.get("/users", params={"ids": ids}).status_code == 400
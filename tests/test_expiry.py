@@ -0,0 +1,74 @@
+import pytest
+
+from src import crud, database, expiry, metrics, order_counts
+from src.query_cache import orders_query_cache
+
+PAST = {"valid_since": "2019-12-01T00:00:00", "valid_until": "2020-01-01T00:00:00"}
+
+
+@pytest.fixture
+def orders(client, make_user, make_order):
+    senior = make_user()["id"]
+    volunteer = make_user(type="volunteer")["id"]
+    open_past = [make_order(senior, **PAST) for _ in range(5)] + [
+        make_order(senior, status="accepted", volunteer_id=volunteer, **PAST)
+        for _ in range(2)
+    ]
+    untouched = [
+        make_order(senior),
+        make_order(senior, status="accepted", volunteer_id=volunteer),
+        make_order(senior, status="completed", volunteer_id=volunteer, **PAST),
+        make_order(senior, status="cancelled", **PAST),
+        make_order(senior, status="expired", **PAST),
+    ]
+    return open_past, untouched
+
+
+def expired_total(status):
+    return metrics._counters.get(("orders_expired_total", (("status", status),)), 0)
+
+
+def test_open_orders_past_valid_until_expire_in_batches(client, orders, monkeypatch):
+    open_past, untouched = orders
+    expire_orders_batch = crud.expire_orders_batch
+    batches = []
+
+    def record(*args, **kwargs):
+        expired = expire_orders_batch(*args, **kwargs)
+        batches.append(len(expired))
+        return expired
+
+    monkeypatch.setattr(crud, "expire_orders_batch", record)
+    before = {status: expired_total(status) for status in ("pending", "accepted")}
+    assert expiry.expire_orders(batch_size=3) == 7
+    assert batches == [3, 3, 1]
+    assert expired_total("pending") == before["pending"] + 5
+    assert expired_total("accepted") == before["accepted"] + 2
+
+    for order in open_past:
+        response = client.get(f"/orders/{order['id']}")
+        assert response.json() == {**order, "status": "expired"}
+    for order in untouched:
+        assert client.get(f"/orders/{order['id']}").json() == order
+    assert expiry.expire_orders(batch_size=3) == 0
+
+
+def test_counters_and_caches_follow_expiry(client, orders, monkeypatch):
+    monkeypatch.setattr(orders_query_cache, "enabled", True)
+    monkeypatch.setattr(orders_query_cache.entries, "ttl", 60)
+    open_past, untouched = orders
+    # Cached before the sweep: one order and the lists it is in.
+    client.get(f"/orders/{open_past[0]['id']}")
+    pending = client.get("/orders", params={"status": "pending", "with_total": True})
+    assert pending.json()["total"] == 6
+
+    assert expiry.expire_orders() == 7
+    response = client.get(f"/orders/{open_past[0]['id']}")
+    assert response.json()["status"] == "expired"
+    pending = client.get("/orders", params={"status": "pending", "with_total": True})
+    assert pending.json()["total"] == 1
+    assert [order["id"] for order in pending.json()["items"]] == [untouched[0]["id"]]
+    expired = client.get("/orders", params={"status": "expired", "with_total": True})
+    assert expired.json()["total"] == 8
+    with database.SessionLocal() as db:
+        assert not order_counts.drift(db)
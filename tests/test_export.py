@@ -0,0 +1,143 @@
+import asyncio
+import json
+import tracemalloc
+from datetime import datetime
+from urllib.parse import urlencode
+
+import pytest
+from sqlalchemy import event, insert
+
+from src import crud, database
+from src.models import Order, OrderCategory, OrderStatus
+
+# Enough that holding every row would take several times the memory bound
+# below (about 27 MiB against 3 MiB streamed), while still quick to run.
+EXPORTED_ORDERS = 20000
+
+
+def test_export_streams_every_order(client, make_user, make_order):
+    senior = make_user()
+    orders = [make_order(senior["id"]) for _ in range(3)]
+    response = client.get("/orders/export", params={"sort_by": "created_at"})
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [order["id"] for order in orders]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"sort_by": "bogus"},
+        {"sort_by": "distance"},
+        {"sort_by": "distance", "latitude": "50.06"},
+        {"fields": "id,bogus"},
+    ],
+)
+def test_bad_parameters_fail_before_streaming(client, make_user, make_order, params):
+    make_order(make_user()["id"])
+    response = client.get("/orders/export", params=params)
+    assert response.status_code == 400, response.text
+
+
+def test_export_sorts_by_distance(client, make_user, make_order):
+    near = make_order(make_user(50.07, 19.94)["id"])
+    far = make_order(make_user(52.23, 21.01)["id"])
+    response = client.get(
+        "/orders/export",
+        params={
+            "sort_by": "distance",
+            "sort_direction": "desc",
+            "latitude": "50.06",
+            "longitude": "19.94",
+            "format": "csv",
+            "fields": "id",
+        },
+    )
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "id,distance"
+    assert [line.split(",")[0] for line in lines[1:]] == [
+        str(far["id"]),
+        str(near["id"]),
+    ]
+
+
+async def stream_lines(app, path: str, params: dict) -> int:
+    # Drives the ASGI app directly and counts the body's lines without
+    # keeping them; test clients buffer the whole response.
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "server": ("test", 80),
+        "client": ("test", 1),
+        "root_path": "",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(params).encode(),
+        "headers": [],
+    }
+    requested = False
+    lines = 0
+
+    async def receive() -> dict:
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # The client stays connected until the body has been sent.
+        await asyncio.Event().wait()
+
+    async def send(message: dict) -> None:
+        nonlocal lines
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200
+        elif message["type"] == "http.response.body":
+            lines += message.get("body", b"").count(b"\n")
+
+    await app(scope, receive, send)
+    return lines
+
+
+def test_large_export_memory_stays_bounded(client, make_user):
+    from src.main import app
+
+    senior = make_user()
+    rows = {
+        "category": OrderCategory.GROCERIES,
+        "description": {"data": [{"id": 1, "text": "Chleb", "completed": False}]},
+        "status": OrderStatus.PENDING,
+        "senior_id": senior["id"],
+        "created_at": datetime(2024, 12, 1),
+    }
+    with database.engine.begin() as connection:
+        for _ in range(EXPORTED_ORDERS // 10000):
+            connection.execute(insert(Order), [rows] * 10000)
+
+    tracemalloc.start()
+    try:
+        lines = asyncio.run(stream_lines(app, "/orders/export", {"sort_by": "id"}))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert lines == EXPORTED_ORDERS
+    assert peak < 10 * 1024 * 1024, f"{peak / 2**20:.1f} MiB"
+
+
+def test_export_reads_rows_in_batches(client, make_user, make_order, monkeypatch):
+    make_order(make_user()["id"])
+    monkeypatch.setattr(crud, "EXPORT_BATCH_SIZE", 50)
+    options = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM orders" in statement:
+            options.append(context.execution_options)
+
+    event.listen(database.engine, "before_cursor_execute", record)
+    try:
+        assert client.get("/orders/export").status_code == 200
+    finally:
+        event.remove(database.engine, "before_cursor_execute", record)
+    (executed,) = options
+    assert executed["yield_per"] == 50 and executed["stream_results"]
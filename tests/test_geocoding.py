@@ -0,0 +1,144 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+
+from src import crud, database, geocoding, metrics
+from src.geocoding_queue import geocoding_queue
+from src.models import GeocodeCache, GeocodeStatus, User, UserType
+
+KRAKOW = (50.0647, 19.945)
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    # Stands in for the geocoding service; any real HTTP request fails the
+    # test.
+    calls = []
+
+    def lookup(address):
+        calls.append(address)
+        return None if "nowhere" in address else KRAKOW
+
+    def no_http(*args, **kwargs):
+        raise AssertionError("geocoding left the process")
+
+    monkeypatch.setattr(geocoding, "lookup", lookup)
+    monkeypatch.setattr(geocoding.http, "get", no_http)
+    monkeypatch.setattr(geocoding_queue, "retry_backoff", 0.01)
+    return calls
+
+
+def register(client, token, address):
+    response = client.post(
+        "/register",
+        json={
+            "phone_number": f"+48 600 000 {token}",
+            "first_name": "Jan",
+            "last_name": "Kowalski",
+            "type": "senior",
+            "token": token,
+            "address": address,
+        },
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_register_geocodes_in_background(client, lookups):
+    user = register(client, "001", "Rynek Główny 1, Kraków")
+    assert user["geocode_status"] == "pending" and user["latitude"] is None
+
+    assert geocoding_queue.drain(5)
+    user = client.get(f"/users/{user['id']}").json()
+    assert user["geocode_status"] == "done"
+    assert (user["latitude"], user["longitude"]) == KRAKOW
+    assert lookups == ["Rynek Główny 1, Kraków"]
+
+
+def test_repeat_addresses_are_looked_up_once(client, lookups):
+    register(client, "001", "Rynek Główny 1, Kraków")
+    assert geocoding_queue.drain(5)
+
+    # Spelled differently, but the same address once normalized; answered
+    # from memory while registering.
+    for token, address in (
+        ("002", "  rynek główny 1 ,kraków"),
+        ("003", "RYNEK GŁÓWNY 1,Kraków "),
+    ):
+        user = register(client, token, address)
+        assert user["geocode_status"] == "done"
+        assert (user["latitude"], user["longitude"]) == KRAKOW
+
+    # After a restart the memory cache is empty; the stored result is used.
+    geocoding.memory_cache.clear()
+    db_hits = metrics._counters.get(("geocode_db_hits_total", ()), 0)
+    user = register(client, "004", "rynek główny 1, kraków")
+    assert geocoding_queue.drain(5)
+    assert client.get(f"/users/{user['id']}").json()["latitude"] == KRAKOW[0]
+    assert metrics._counters[("geocode_db_hits_total", ())] == db_hits + 1
+
+    assert lookups == ["Rynek Główny 1, Kraków"]
+
+
+def test_unknown_address_fails_and_is_not_stored(client, lookups):
+    user = register(client, "001", "nowhere in particular")
+    assert geocoding_queue.drain(5)
+    assert client.get(f"/users/{user['id']}").json()["geocode_status"] == "failed"
+
+    with database.SessionLocal() as db:
+        assert db.query(GeocodeCache).count() == 0
+
+
+def test_lookup_errors_are_retried(client, lookups, monkeypatch):
+    failures = [RuntimeError("503"), RuntimeError("503")]
+    lookup = geocoding.lookup
+
+    def flaky(address):
+        if failures:
+            raise failures.pop()
+        return lookup(address)
+
+    monkeypatch.setattr(geocoding, "lookup", flaky)
+    user = register(client, "001", "Floriańska 3, Kraków")
+    assert geocoding_queue.drain(5)
+    assert client.get(f"/users/{user['id']}").json()["geocode_status"] == "done"
+    assert not failures and lookups == ["Floriańska 3, Kraków"]
+
+
+def test_pending_users_are_queued_on_startup(empty_database, lookups):
+    # Left pending by a worker that went down before geocoding them.
+    with database.SessionLocal() as db:
+        db.add(
+            User(
+                phone_number="+48 600 000 001",
+                first_name="Jan",
+                last_name="Kowalski",
+                type=UserType.SENIOR,
+                address="Rynek Główny 1, Kraków",
+                geocode_status=GeocodeStatus.PENDING,
+            )
+        )
+        db.commit()
+
+    from src.main import app
+
+    with TestClient(app) as client:
+        assert geocoding_queue.drain(5)
+        (user,) = client.get("/users").json()
+    assert user["geocode_status"] == "done" and user["latitude"] == KRAKOW[0]
+
+
+def test_failed_writes_are_retried(client, lookups, monkeypatch):
+    store = crud.set_geocoded_coordinates
+    failures = [OperationalError("UPDATE users", {}, Exception("connection lost"))]
+
+    def flaky(db, results):
+        if failures:
+            raise failures.pop()
+        store(db, results)
+
+    monkeypatch.setattr(crud, "set_geocoded_coordinates", flaky)
+    user = register(client, "001", "Rynek Główny 1, Kraków")
+    assert geocoding_queue.drain(5)
+    assert client.get(f"/users/{user['id']}").json()["geocode_status"] == "done"
+    assert not failures and lookups == ["Rynek Główny 1, Kraków"]
@@ -0,0 +1,59 @@
+from src import matching
+
+
+def test_matches_pending_orders_to_nearest_volunteers(client, make_user, make_order):
+    near, farther = make_user(50.0, 20.0), make_user(50.05, 20.0)
+    elsewhere = make_user(52.0, 21.0)
+    first = make_user(50.001, 20.0, type="volunteer")
+    second = make_user(50.06, 20.0, type="volunteer")
+    orders = [make_order(senior["id"]) for senior in (near, farther, elsewhere)]
+    # Neither of these is open for matching.
+    make_order(near["id"], valid_until="2020-01-01T00:00:00")
+    make_order(near["id"], status="accepted")
+
+    response = client.get("/orders/matches")
+    assert response.status_code == 200
+    assert {(m["order_id"], m["volunteer_id"]) for m in response.json()} == {
+        (orders[0]["id"], first["id"]),
+        (orders[1]["id"], second["id"]),
+    }
+    response = client.get("/orders/matches", params={"volunteer_id": first["id"]})
+    assert [m["order_id"] for m in response.json()] == [orders[0]["id"]]
+    response = client.get("/orders/matches", params={"radius_km": 1})
+    assert [m["order_id"] for m in response.json()] == [orders[0]["id"]]
+
+
+def test_requests_share_the_last_matching(client, make_user, make_order, monkeypatch):
+    senior = make_user(50.0, 20.0)
+    volunteer = make_user(50.001, 20.0, type="volunteer")
+    order = make_order(senior["id"])
+    loads = []
+    load = matching.load
+
+    def counting_load(db, *args, **kwargs):
+        loads.append(1)
+        return load(db, *args, **kwargs)
+
+    monkeypatch.setattr(matching, "load", counting_load)
+    for _ in range(3):
+        response = client.get(
+            "/orders/matches", params={"volunteer_id": volunteer["id"]}
+        )
+        assert [m["order_id"] for m in response.json()] == [order["id"]]
+        assert int(response.headers["age"]) >= 0
+    assert len(loads) == 1
+
+    # New orders show up once the job has run again.
+    other = make_order(make_user(50.2, 20.0)["id"])
+    make_user(50.201, 20.0, type="volunteer")
+    assert len(client.get("/orders/matches").json()) == 1
+    matching.latest_matches.refresh()
+    assert len(loads) == 2
+    matches = client.get("/orders/matches").json()
+    assert {m["order_id"] for m in matches} == {order["id"], other["id"]}
+
+
+def test_radius_is_capped_at_the_jobs_radius(client):
+    for radius_km in (0, matching.MATCHING_MAX_RADIUS_KM + 1):
+        response = client.get("/orders/matches", params={"radius_km": radius_km})
+        assert response.status_code == 422
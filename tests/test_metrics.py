@@ -0,0 +1,24 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src import metrics
+
+
+def test_failed_statement_leaves_nothing_behind(client):
+    # The client fixture imports the app, which installs the listeners.
+    engine = create_engine("sqlite://")
+    stats = metrics.RequestStats()
+    token = metrics.current.set(stats)
+    try:
+        with engine.connect() as connection:
+            info = dict(connection.info)
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    connection.execute(text("SELECT * FROM missing"))
+            assert connection.info == info
+            assert connection.execute(text("SELECT 1")).scalar() == 1
+    finally:
+        metrics.current.reset(token)
+    assert stats.statements == 1
+    assert 0 < stats.db_seconds < 1
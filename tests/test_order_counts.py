@@ -0,0 +1,107 @@
+import random
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from src import archive, crud, database, order_counts, schemas
+
+
+def total(client, **params):
+    response = client.get("/orders", params={"with_total": True, **params})
+    assert response.status_code == 200, response.text
+    assert response.json()["total_exact"]
+    return response.json()["total"]
+
+
+def test_totals_follow_order_writes(client, make_user, make_order, monkeypatch):
+    monkeypatch.setattr(order_counts, "ORDER_COUNT_SHARDS", 3)
+    senior = make_user()
+    volunteer = make_user(type="volunteer")
+    orders = [make_order(senior["id"]) for _ in range(5)]
+    for order in orders[:3]:
+        client.post(
+            f"/orders/{order['id']}/accept", json={"volunteer_id": volunteer["id"]}
+        )
+    # Orders written before the change stay counted in their old shards.
+    monkeypatch.setattr(order_counts, "ORDER_COUNT_SHARDS", 4)
+    client.post(f"/orders/{orders[0]['id']}/complete")
+    client.post(f"/orders/{orders[3]['id']}/cancel")
+    client.put(f"/orders/{orders[4]['id']}", json={"category": "conversation"})
+    assert archive.archive_orders(after_hours=0) == 2
+    client.delete(f"/orders/{orders[1]['id']}")
+
+    assert total(client) == 2
+    assert total(client, include_archived=True) == 4
+    assert total(client, status="accepted") == 1
+    assert total(client, category="conversation") == 1
+    assert total(client, senior_id=senior["id"], include_archived=True) == 4
+    assert total(client, volunteer_id=volunteer["id"], include_archived=True) == 2
+    with database.SessionLocal() as db:
+        assert not order_counts.drift(db)
+
+
+def test_concurrent_writes_keep_counters_consistent(
+    client, make_user, make_order, monkeypatch
+):
+    if database.engine.dialect.name != "postgresql":
+        # SQLite runs one writer at a time, so nothing here would race.
+        pytest.skip("needs DATABASE_URL pointing to Postgres")
+    # Few shards, so that writers do meet on the same counter rows.
+    monkeypatch.setattr(order_counts, "ORDER_COUNT_SHARDS", 2)
+    seniors = [make_user()["id"] for _ in range(3)]
+    volunteers = [make_user(type="volunteer")["id"] for _ in range(3)]
+    order_ids = [make_order(random.choice(seniors))["id"] for _ in range(20)]
+    start = threading.Barrier(8)
+    errors = []
+
+    def create(db, rng):
+        order = schemas.OrderCreate(
+            category="groceries",
+            senior_id=rng.choice(seniors),
+            description={"data": []},
+            valid_since=datetime.now(),
+            valid_until=datetime.now() + timedelta(days=1),
+        )
+        crud.create_order(db, order)
+
+    writes = [
+        create,
+        lambda db, rng: crud.accept_order(
+            db, rng.choice(order_ids), rng.choice(volunteers)
+        ),
+        lambda db, rng: crud.complete_order(db, rng.choice(order_ids)),
+        lambda db, rng: crud.cancel_order(db, rng.choice(order_ids)),
+        lambda db, rng: crud.update_order(
+            db,
+            rng.choice(order_ids),
+            schemas.OrderUpdate(category=rng.choice(["groceries", "conversation"])),
+        ),
+        lambda db, rng: crud.delete_order(db, rng.choice(order_ids)),
+        lambda db, rng: archive.archive_batch(db, datetime.now(), 5),
+    ]
+
+    def writer(seed):
+        rng = random.Random(seed)
+        start.wait()
+        try:
+            for _ in range(100):
+                with database.SessionLocal() as db:
+                    try:
+                        rng.choice(writes)(db, rng)
+                    except HTTPException:
+                        # Lost a race for the same order: taken, or finished.
+                        pass
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=writer, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    with database.SessionLocal() as db:
+        assert not order_counts.drift(db)
@@ -0,0 +1,35 @@
+import pytest
+
+
+def test_delete_returns_the_order_like_get(client, make_user, make_order):
+    order = make_order(make_user()["id"])
+    response = client.delete(f"/orders/{order['id']}")
+    assert response.status_code == 200
+    assert response.json() == order
+    assert client.get(f"/orders/{order['id']}").status_code == 404
+    assert client.delete(f"/orders/{order['id']}").status_code == 404
+
+
+def test_radius_keeps_nearby_orders(client, make_user, make_order):
+    near = make_order(make_user(50.06, 19.94)["id"])
+    make_order(make_user(50.20, 19.94)["id"])
+    response = client.get(
+        "/orders", params={"latitude": "50.06", "longitude": "19.95", "radius_km": 2}
+    )
+    assert response.status_code == 200
+    assert [order["id"] for order in response.json()] == [near["id"]]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"latitude": "", "longitude": "", "radius_km": 2},
+        {"latitude": "50.06", "radius_km": 2},
+        {"radius_km": 2},
+        {"latitude": "north", "longitude": "19.94"},
+    ],
+)
+@pytest.mark.parametrize("path", ["/orders", "/orders/export"])
+def test_radius_needs_coordinates(client, path, params):
+    response = client.get(path, params=params)
+    assert response.status_code == 400, response.text
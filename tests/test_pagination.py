@@ -0,0 +1,144 @@
+import pytest
+
+from src import pagination
+
+LIMIT = 4
+SORT_KEYS = [
+    "id",
+    "category",
+    "created_at",
+    "valid_since",
+    "valid_until",
+    "status",
+    "senior_id",
+    "volunteer_id",
+    "distance",
+]
+# Keys whose JSON values sort like the database sorts them; enums follow
+# declaration order on Postgres and name order on SQLite.
+COMPARABLE = {
+    "id",
+    "created_at",
+    "valid_since",
+    "valid_until",
+    "senior_id",
+    "volunteer_id",
+    "distance",
+}
+LOCATION = {"latitude": "50.06", "longitude": "19.94"}
+
+
+@pytest.fixture
+def orders(client, make_user, make_order):
+    # Two seniors at the same spot tie on distance, and one without
+    # coordinates has none. Categories, statuses and dates repeat, and some
+    # dates and volunteers are missing.
+    seniors = [
+        make_user(50.06, 19.94),
+        make_user(50.06, 19.94),
+        make_user(50.10, 19.94),
+        make_user(None, None),
+    ]
+    volunteer = make_user(type="volunteer")
+    categories = ["groceries", "pet_walking", "conversation"]
+    orders = []
+    for index in range(23):
+        fields = {
+            "category": categories[index % 3],
+            "valid_since": None if index % 4 == 0 else f"2024-12-{index % 3 + 1:02d}",
+            "valid_until": f"2030-01-{index % 5 + 1:02d}T00:00:00",
+        }
+        if index % 3 == 1:
+            fields.update(status="accepted", volunteer_id=volunteer["id"])
+        orders.append(make_order(seniors[index % 4]["id"], **fields))
+    return orders
+
+
+def walk(client, **params):
+    # Follows next_cursor from the first page to the last.
+    pages, cursor = [], ""
+    while cursor is not None:
+        response = client.get(
+            "/orders", params={**params, "limit": LIMIT, "cursor": cursor}
+        )
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page["items"]) <= LIMIT
+        pages.append(page["items"])
+        cursor = page["next_cursor"]
+    return pages
+
+
+def assert_sorted(rows, key, descending):
+    values = [row[key] for row in rows]
+    present = [value for value in values if value is not None]
+    nulls = [None] * (len(values) - len(present))
+    assert present == sorted(present, reverse=descending)
+    assert values == (nulls + present if descending else present + nulls)
+
+
+@pytest.mark.parametrize("sort_direction", ["asc", "desc"])
+@pytest.mark.parametrize("sort_by", SORT_KEYS)
+def test_cursor_walk_returns_every_order_once(client, orders, sort_by, sort_direction):
+    params = {"sort_by": sort_by, "sort_direction": sort_direction, **LOCATION}
+    rows = [row for page in walk(client, **params) for row in page]
+
+    ids = [row["id"] for row in rows]
+    assert sorted(ids) == sorted(order["id"] for order in orders)
+    # The same order as offset paging, which has no cursor to get wrong.
+    listed = client.get("/orders", params={**params, "limit": 1000}).json()
+    assert ids == [row["id"] for row in listed]
+    if sort_by in COMPARABLE:
+        assert_sorted(rows, sort_by, sort_direction == "desc")
+    # Ties are broken by id.
+    for previous, row in zip(rows, rows[1:]):
+        if previous[sort_by] == row[sort_by]:
+            assert (previous["id"] < row["id"]) == (sort_direction == "asc")
+
+
+def test_cursor_walk_without_sort_by(client, orders):
+    rows = [row for page in walk(client) for row in page]
+    assert [row["id"] for row in rows] == sorted(order["id"] for order in orders)
+
+
+def test_deep_pages_cost_the_same(client, orders, statements):
+    walk(client, sort_by="valid_until", sort_direction="desc")
+    queries = [
+        (statement, parameters)
+        for statement, parameters in statements
+        if "FROM orders" in statement
+    ]
+    assert len(queries) == -(-len(orders) // LIMIT)
+    # Every page after the first seeks from its cursor with the same query,
+    # and none skips rows with OFFSET (SQLite always renders OFFSET 0).
+    assert all(
+        "OFFSET" not in statement or parameters[-1] == 0
+        for statement, parameters in queries
+    )
+    queries = [statement for statement, _ in queries]
+    assert len(set(queries[1:])) == 1
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"cursor": "not a cursor"},
+        {"cursor": pagination.encode_cursor("id", 1, 1), "sort_by": "created_at"},
+        {
+            "cursor": pagination.encode_cursor("created_at", "soon", 1),
+            "sort_by": "created_at",
+        },
+        {"cursor": pagination.encode_cursor("status", "LOST", 1), "sort_by": "status"},
+        {"cursor": pagination.encode_cursor(None, None, "1")},
+    ],
+)
+def test_bad_cursor_is_rejected(client, orders, params):
+    response = client.get("/orders", params=params)
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_unknown_sort_by_is_rejected(client):
+    for params in ({"sort_by": "bogus"}, {"sort_by": "distance", "cursor": ""}):
+        response = client.get("/orders", params=params)
+        assert response.status_code == 400, response.text
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from src import crud, database, metrics, schemas
+from src.query_cache import orders_query_cache
+
+NEARBY = {"latitude": 50.06, "longitude": 19.94, "radius_km": 5}
+
+
+@pytest.fixture
+def query_cache(monkeypatch):
+    monkeypatch.setattr(orders_query_cache, "enabled", True)
+    monkeypatch.setattr(orders_query_cache.entries, "ttl", 60)
+    return orders_query_cache
+
+
+def order_queries(statements):
+    return [s for s, _ in statements if "FROM orders" in s]
+
+
+def test_concurrent_identical_gets_run_one_query(
+    query_cache, client, make_user, make_order, statements
+):
+    from src.main import app
+
+    senior = make_user()
+    orders = [make_order(senior["id"]) for _ in range(3)]
+    coalesced = metrics._counters.get(("orders_query_coalesced_total", ()), 0)
+    statements.clear()
+
+    async def get_all():
+        # On the app's event loop, so every request meets the first one's
+        # query in flight.
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as async_client:
+            return await asyncio.gather(
+                *(async_client.get("/orders", params=NEARBY) for _ in range(20))
+            )
+
+    responses = client.portal.call(get_all)
+    assert {response.status_code for response in responses} == {200}
+    assert {response.content for response in responses} == {responses[0].content}
+    assert [order["id"] for order in responses[0].json()] == [o["id"] for o in orders]
+    assert len(order_queries(statements)) == 1
+    assert metrics._counters[("orders_query_coalesced_total", ())] > coalesced
+
+
+def test_writes_evict_only_their_area(
+    query_cache, client, make_user, make_order, statements
+):
+    near = make_user()
+    far = make_user(latitude=52.23, longitude=21.01)
+    make_order(near["id"])
+    nearby = client.get("/orders", params=NEARBY).json()
+    everywhere = client.get("/orders").json()
+    statements.clear()
+    assert client.get("/orders", params=NEARBY).json() == nearby
+    assert client.get("/orders").json() == everywhere
+    assert not order_queries(statements)
+
+    far_order = make_order(far["id"])
+    statements.clear()
+    assert client.get("/orders", params=NEARBY).json() == nearby
+    assert not order_queries(statements)
+    # A list without a radius can change with any order.
+    assert client.get("/orders").json() == everywhere + [far_order]
+    assert len(order_queries(statements)) == 1
+
+    near_order = make_order(near["id"])
+    statements.clear()
+    response = client.get("/orders", params=NEARBY)
+    assert [order["id"] for order in response.json()] == [
+        order["id"] for order in nearby + [near_order]
+    ]
+    assert len(order_queries(statements)) == 1
+
+
+def test_result_of_a_query_overtaken_by_a_write_is_not_cached(
+    query_cache, client, make_user, make_order, monkeypatch
+):
+    senior = make_user()
+    first = make_order(senior["id"])
+    get_orders_page = crud.get_orders_page
+    written = []
+
+    def write():
+        with database.SessionLocal() as db:
+            order = schemas.OrderCreate(
+                category="groceries",
+                senior_id=senior["id"],
+                valid_since=datetime.now(),
+                valid_until=datetime.now() + timedelta(days=1),
+            )
+            written.append(crud.create_order(db, order).id)
+
+    def racing_write(*args, **kwargs):
+        page = get_orders_page(*args, **kwargs)
+        if not written:
+            # Committed from elsewhere after the rows were read, before the
+            # result is stored.
+            thread = threading.Thread(target=write)
+            thread.start()
+            thread.join()
+        return page
+
+    monkeypatch.setattr(crud, "get_orders_page", racing_write)
+    stale = client.get("/orders", params=NEARBY).json()
+    assert [order["id"] for order in stale] == [first["id"]]
+    fresh = client.get("/orders", params=NEARBY).json()
+    assert [order["id"] for order in fresh] == [first["id"], written[0]]
@@ -0,0 +1,129 @@
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from src import database, metrics, models
+from src.models import User, UserType
+
+
+@pytest.fixture
+def replica_url(tmp_path):
+    # A second database standing in for a replica; it only holds what the
+    # test writes to it, so reads tell which database answered.
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    replica = database.Replica(0, url)
+    models.Base.metadata.create_all(replica.engine)
+    with Session(replica.engine) as db:
+        db.add(
+            User(
+                phone_number="+48 700 000 001",
+                first_name="Replika",
+                last_name="Nowak",
+                type=UserType.SENIOR,
+            )
+        )
+        db.commit()
+    replica.engine.dispose()
+    return url
+
+
+@pytest.fixture
+def use_replicas(monkeypatch):
+    def use_replicas(*urls):
+        replicas = [database.Replica(index, url) for index, url in enumerate(urls)]
+        monkeypatch.setattr(database, "replicas", replicas)
+        return replicas
+
+    return use_replicas
+
+
+def names(response):
+    assert response.status_code == 200, response.text
+    return [user["first_name"] for user in response.json()]
+
+
+def test_list_reads_go_to_the_replica(client, make_user, replica_url, use_replicas):
+    user = make_user(first_name="Primary")
+    use_replicas(replica_url)
+    assert names(client.get("/users")) == ["Replika"]
+    # Single records are always read from the primary.
+    assert client.get(f"/users/{user['id']}").json()["first_name"] == "Primary"
+
+
+def test_clients_that_just_wrote_read_the_primary(
+    client, make_user, replica_url, use_replicas
+):
+    make_user(first_name="Primary")
+    use_replicas(replica_url)
+    client.cookies.set(database.PRIMARY_COOKIE, f"{time.time() + 5:.3f}")
+    assert names(client.get("/users")) == ["Primary"]
+    client.cookies.set(database.PRIMARY_COOKIE, f"{time.time() - 5:.3f}")
+    assert names(client.get("/users")) == ["Replika"]
+
+
+def test_unreachable_replica_is_skipped(
+    client, make_user, replica_url, use_replicas, tmp_path
+):
+    make_user(first_name="Primary")
+    unreachable = f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+    down, up = use_replicas(unreachable, replica_url)
+    failures = metrics._counters.get(
+        ("db_replica_failures_total", (("replica", 0),)), 0
+    )
+
+    # Round-robin would reach the broken replica within two requests.
+    for _ in range(2):
+        assert names(client.get("/users")) == ["Replika"]
+    assert down.down_until > time.monotonic() and up.down_until == 0
+    assert metrics._counters[("db_replica_failures_total", (("replica", 0),))] == (
+        failures + 1
+    )
+    # Marked down, so it isn't tried again until REPLICA_RETRY_SECONDS pass.
+    for _ in range(4):
+        assert names(client.get("/users")) == ["Replika"]
+    assert metrics._counters[("db_replica_failures_total", (("replica", 0),))] == (
+        failures + 1
+    )
+
+
+def test_primary_answers_when_every_replica_is_down(
+    client, make_user, use_replicas, tmp_path
+):
+    make_user(first_name="Primary")
+    use_replicas(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    assert names(client.get("/users")) == ["Primary"]
+    assert names(client.get("/users")) == ["Primary"]
+
+
+def test_successful_writes_pin_the_client_to_the_primary():
+    app = FastAPI()
+
+    @app.post("/write")
+    def write(fail: bool = False):
+        if fail:
+            raise HTTPException(status_code=400)
+        return {}
+
+    @app.get("/read")
+    def read():
+        return {}
+
+    client = TestClient(database.ReadYourWritesMiddleware(app))
+    assert database.PRIMARY_COOKIE not in client.get("/read").cookies
+    assert database.PRIMARY_COOKIE not in client.post("/write?fail=1").cookies
+    until = float(client.post("/write").cookies[database.PRIMARY_COOKIE])
+    assert time.time() < until <= time.time() + database.READ_YOUR_WRITES_SECONDS
+
+
+def test_stats_from_a_replica_leave_the_user_cache_alone(
+    client, make_user, replica_url, use_replicas
+):
+    user = make_user(first_name="Primary")
+    use_replicas(replica_url)
+    response = client.get(f"/users/{user['id']}/stats")
+    assert response.status_code == 200, response.text
+    assert client.get(f"/users/{user['id']}").json()["first_name"] == "Primary"
+    assert client.get(f"/users/{user['id'] + 1}/stats").status_code == 404
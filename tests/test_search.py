@@ -0,0 +1,59 @@
+import pytest
+
+from src import archive
+
+
+def items(*texts):
+    return {
+        "data": [
+            {"id": index, "text": text, "completed": False}
+            for index, text in enumerate(texts)
+        ]
+    }
+
+
+@pytest.fixture
+def orders(client, make_user, make_order):
+    senior = make_user()
+    return {
+        "bread": make_order(
+            senior["id"], description=items("Mleko 100%", "Chleb razowy")
+        ),
+        "pasta": make_order(senior["id"], description=items("MAKARON", "Pomidory")),
+        "other": make_order(senior["id"], description={"note": "mleko"}),
+        "pills": make_order(senior["id"], description=items("Leki_na_serce")),
+    }
+
+
+def found(client, **params):
+    response = client.get("/orders", params=params)
+    assert response.status_code == 200, response.text
+    return [order["id"] for order in response.json()]
+
+
+def test_every_word_must_appear_in_some_item(client, orders):
+    assert found(client, q="mleko") == [orders["bread"]["id"]]
+    assert found(client, q="makaron") == [orders["pasta"]["id"]]
+    assert found(client, q="chleb mle") == [orders["bread"]["id"]]
+    assert found(client, q="chleb pomidory") == []
+
+
+def test_like_wildcards_are_matched_literally(client, orders):
+    assert found(client, q="mleko 100%") == [orders["bread"]["id"]]
+    assert found(client, q="i_na") == [orders["pills"]["id"]]
+    assert found(client, q="i%na") == []
+
+
+@pytest.mark.parametrize("q", ["ab cd", "mleko z", "chleb 100%  ab"])
+def test_short_words_are_rejected(client, orders, q):
+    # The trigram index can't serve them; the search would scan every order.
+    for path in ("/orders", "/orders/export"):
+        response = client.get(path, params={"q": q})
+        assert response.status_code == 400, response.text
+
+
+def test_archived_orders_are_searched_on_request(client, orders):
+    client.put(f"/orders/{orders['bread']['id']}", json={"status": "completed"})
+    archive.archive_orders(after_hours=0)
+    assert found(client, q="mleko") == []
+    assert found(client, q="mleko", include_archived=True) == [orders["bread"]["id"]]
@@ -0,0 +1,7 @@
+def test_delete_returns_the_user_like_get(client, make_user):
+    user = make_user()
+    response = client.delete(f"/users/{user['id']}")
+    assert response.status_code == 200
+    assert response.json() == user
+    assert client.get(f"/users/{user['id']}").status_code == 404
+    assert client.delete(f"/users/{user['id']}").status_code == 404